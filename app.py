@@ -1,11 +1,13 @@
 #!/usr/bin/env python3
 
 import argparse
+import atexit
 import locale
 import logging
 
 import requests
 import sentry_sdk
+from sentry_sdk.integrations.logging import LoggingIntegration
 
 from src import consts
 from src.bot import SysBlokBot
@@ -35,8 +37,20 @@ def get_bot():
         raise ValueError("Could not load config, can't go on")
 
     sentry_dsn = config.get("sentry_dsn", None)
+    sentry_config = config_manager.get_sentry_config()
     if sentry_dsn:
-        sentry_sdk.init(dsn=sentry_dsn, traces_sample_rate=1.0)
+        sentry_sdk.init(
+            dsn=sentry_dsn,
+            sample_rate=sentry_config.get(
+                consts.SENTRY_SAMPLE_RATE, consts.DEFAULT_SENTRY_SAMPLE_RATE
+            ),
+            traces_sample_rate=sentry_config.get(
+                consts.SENTRY_TRACES_SAMPLE_RATE,
+                consts.DEFAULT_SENTRY_TRACES_SAMPLE_RATE,
+            ),
+            # error events are captured by ErrorBroadcastHandler, rate-limited
+            integrations=[LoggingIntegration(event_level=None)],
+        )
 
     scheduler = JobScheduler()
 
@@ -46,9 +60,13 @@ def get_bot():
 
     args = parser.parse_args()
 
+    def signal_handler(signum, frame):
+        scheduler.stop_running()
+        flush_logs()
+
     bot = SysBlokBot(
         config_manager,
-        signal_handler=lambda signum, frame: scheduler.stop_running(),
+        signal_handler=signal_handler,
         skip_db_update=args.skip_db_update,
     )
     bot.init_handlers()
@@ -65,7 +83,8 @@ def get_bot():
 
     for handler in logging.getLogger().handlers:
         logging.getLogger().removeHandler(handler)
-    logging.getLogger().addHandler(ErrorBroadcastHandler(tg_sender))
+    logging.getLogger().addHandler(ErrorBroadcastHandler(tg_sender, sentry_config))
+    atexit.register(flush_logs)
 
     # Scheduler must be run after clients initialized
     scheduler.run()
@@ -81,7 +100,17 @@ def get_bot():
     return bot
 
 
+def flush_logs():
+    """
+    Sends logs buffered for telegram, so that the last ones are not lost on exit.
+    """
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, ErrorBroadcastHandler):
+            handler.flush_logs(timeout=consts.LOG_SHIPPER_SHUTDOWN_TIMEOUT_SEC)
+
+
 def report_critical_error(e: BaseException):
+    flush_logs()
     sentry_sdk.capture_exception(e)
     requests.post(
         url=f"https://api.telegram.org/bot{consts.TELEGRAM_TOKEN}/sendMessage",
@@ -1,14 +1,13 @@
 import logging
 import os
 from collections import defaultdict
-from typing import Callable
+from typing import Callable, List
 
 from telegram.ext import (
     CallbackQueryHandler,
     CommandHandler,
     Filters,
     MessageHandler,
-    PicklePersistence,
     Updater,
 )
 from telegram.ext.dispatcher import run_async
@@ -19,12 +18,18 @@ from .consts import (
     APP_SOURCE,
     COMMIT_HASH,
     COMMIT_URL,
+    REPORT_CACHE_FORCE_REFRESH_ARG,
+    REPORT_CACHE_TTL_MINUTES,
+    TELEGRAM_REPORT_CACHE_TTL_MINUTES,
     USAGE_LOG_LEVEL,
     CommandCategories,
 )
+from .db.db_client import DBClient
 from .jobs.utils import get_job_runnable
 from .tg import handlers, sender
 from .tg.handlers.utils import admin_only, direct_message_only, manager_only
+from .tg.persistence import DBPersistence
+from .utils.report_cache import ReportCache
 
 logging.addLevelName(USAGE_LOG_LEVEL, "USAGE")
 
@@ -50,12 +55,20 @@ class SysBlokBot:
             tg_config["token"],
             use_context=True,
             user_sig_handler=signal_handler,
-            persistence=PicklePersistence(filename="persistent_storage.pickle"),
+            persistence=DBPersistence(
+                DBClient(db_config=config_manager.get_db_config()),
+                legacy_pickle_filename="persistent_storage.pickle",
+            ),
         )
         self.dp = self.updater.dispatcher
         self.telegram_sender = sender.TelegramSender(
             bot=self.dp.bot, tg_config=tg_config
         )
+        self.report_cache = ReportCache(
+            ttl_minutes=tg_config.get(
+                TELEGRAM_REPORT_CACHE_TTL_MINUTES, REPORT_CACHE_TTL_MINUTES
+            )
+        )
         try:
             self.app_context = AppContext(config_manager, skip_db_update)
         except BaseException as e:
@@ -85,7 +98,7 @@ class SysBlokBot:
         self.add_manager_handler(
             "get_trello_board_state",
             CommandCategories.SUMMARY,
-            self.manager_reply_handler("trello_board_state_job"),
+            self.manager_reply_handler("trello_board_state_job", cached=True),
             "получить сводку о состоянии доски",
         )
         self.add_manager_handler(
@@ -109,7 +122,7 @@ class SysBlokBot:
         self.add_manager_handler(
             "get_publication_plans",
             CommandCategories.SUMMARY,
-            self.manager_reply_handler("publication_plans_job"),
+            self.manager_reply_handler("publication_plans_job", cached=True),
             "получить сводку о публикуемых на неделе постах",
         )
         self.add_manager_handler(
@@ -163,13 +176,13 @@ class SysBlokBot:
         self.add_manager_handler(
             "get_illustrative_report_members",
             CommandCategories.SUMMARY,
-            self.manager_reply_handler("illustrative_report_members_job"),
+            self.manager_reply_handler("illustrative_report_members_job", cached=True),
             "получить сводку с папками для иллюстраторов (группы по иллюстраторам)",
         )
         self.add_manager_handler(
             "get_illustrative_report_columns",
             CommandCategories.SUMMARY,
-            self.manager_reply_handler("illustrative_report_columns_job"),
+            self.manager_reply_handler("illustrative_report_columns_job", cached=True),
             "получить сводку с папками для иллюстраторов (группы по колонкам)",
         )
         self.add_manager_handler(
@@ -558,15 +571,12 @@ class SysBlokBot:
         """
         return admin_only(self._create_reply_handler(job_name))
 
-    def manager_reply_handler(self, job_name: str) -> Callable:
+    def manager_reply_handler(self, job_name: str, cached: bool = False) -> Callable:
         """
         Handler that replies if manager invokes it (DM or chat).
+        If cached, repeated calls are answered from ReportCache.
         """
-        return manager_only(
-            self._create_reply_handler(
-                job_name,
-            )
-        )
+        return manager_only(self._create_reply_handler(job_name, cached=cached))
 
     def user_handler(self, job_name: str) -> Callable:
         """
@@ -574,16 +584,60 @@ class SysBlokBot:
         """
         return self._create_reply_handler(job_name)
 
-    def _create_reply_handler(self, job_name: str) -> Callable:
+    def _create_reply_handler(self, job_name: str, cached: bool = False) -> Callable:
         """
         Creates a handler that replies to a message of given user.
+        If cached, job messages are stored and replayed for the same args
+        while the board state is unchanged and TTL is not expired.
+        Passing "force" argument recalculates the report.
         """
-        return lambda update, tg_context: get_job_runnable(job_name)(
-            app_context=self.app_context,
-            send=self.telegram_sender.create_reply_send(update),
-            called_from_handler=True,
-            args=update.message.text.split()[1:],
-        )
+        if not cached:
+            return lambda update, tg_context: get_job_runnable(job_name)(
+                app_context=self.app_context,
+                send=self.telegram_sender.create_reply_send(update),
+                called_from_handler=True,
+                args=update.message.text.split()[1:],
+                progress_send=self.telegram_sender.create_reply_status(update),
+            )
+
+        def handler(update, tg_context):
+            send = self.telegram_sender.create_reply_send(update)
+            args = update.message.text.split()[1:]
+            force_refresh = REPORT_CACHE_FORCE_REFRESH_ARG in args
+            args = [arg for arg in args if arg != REPORT_CACHE_FORCE_REFRESH_ARG]
+            cache_key = self._get_report_cache_key(job_name, args)
+            if cache_key is not None and not force_refresh:
+                cached_messages = self.report_cache.get(cache_key)
+                if cached_messages is not None:
+                    logger.info(f"Replying with cached report for {job_name}")
+                    for message in cached_messages:
+                        send(message)
+                    return
+            messages = []
+            is_successful = get_job_runnable(job_name)(
+                app_context=self.app_context,
+                send=ReportCache.recording_send(send, messages),
+                called_from_handler=True,
+                args=args,
+                progress_send=self.telegram_sender.create_reply_status(update),
+            )
+            if is_successful and cache_key is not None and messages:
+                self.report_cache.set(cache_key, messages)
+
+        return handler
+
+    def _get_report_cache_key(self, job_name: str, args: List[str]):
+        """
+        Returns report cache key or None if board state version is unknown.
+        """
+        try:
+            board_version = self.app_context.trello_client.get_board_last_activity()
+        except Exception as e:
+            logger.warning(f"Could not get board version for {job_name}: {e}")
+            return None
+        if board_version is None:
+            return None
+        return ReportCache.make_key(job_name, args, board_version)
 
     def _create_broadcast_handler(self, job_name: str) -> Callable:
         """
@@ -97,6 +97,12 @@ class ConfigManager(Singleton):
             )
         return config[job_key]
 
+    def get_scheduler_config(self):
+        return self.get_latest_config().get(consts.SCHEDULER_CONFIG, {})
+
+    def get_sentry_config(self):
+        return self.get_latest_config().get(consts.SENTRY_CONFIG, {})
+
     def get_db_config(self):
         return self.get_latest_config().get(consts.DB_CONFIG, {})
 
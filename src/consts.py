@@ -9,8 +9,25 @@ import telegram
 LOG_FORMAT = "%(asctime)s - %(name)s\t- %(levelname)s\t- %(message)s"
 USAGE_LOG_LEVEL = (WARNING + INFO) / 2
 
-# Delay to ensure telegram messages come in right order.
-MESSAGE_DELAY_SEC = 0.1
+# Telegram rate limits for outbound messages, see core.telegram.org/bots/faq
+SEND_QUEUE_GLOBAL_MESSAGES_PER_SEC = 30
+SEND_QUEUE_CHAT_MESSAGES_PER_SEC = 1
+SEND_QUEUE_GROUP_MESSAGES_PER_MIN = 20
+# Messages which can be sent to a chat back to back before the limit applies.
+SEND_QUEUE_CHAT_BURST = 3
+# How many times to retry a message after Telegram flood control.
+SEND_QUEUE_MAX_RETRIES = 5
+# Changed telegram chat data is written to DB that often
+PERSISTENCE_FLUSH_INTERVAL_SEC = 5
+# Usage and error logs are sent to telegram in batches
+LOG_SHIPPER_FLUSH_INTERVAL_SEC = 5
+LOG_SHIPPER_MAX_BATCH_SIZE = 50
+# distinct log lines kept while telegram is slow, others are dropped
+LOG_SHIPPER_MAX_BUFFER_SIZE = 500
+# On shutdown, buffered logs are given that long to reach telegram
+LOG_SHIPPER_SHUTDOWN_TIMEOUT_SEC = 10
+# Different spreadsheets are read in parallel, up to that many at once
+SHEETS_MAX_CONCURRENT_READS = 4
 
 COMMIT_URL = (
     f'https://github.com/sysblok/sysblokbot/commit/{os.environ.get("COMMIT_HASH")}'
@@ -32,6 +49,16 @@ CONFIG_PATH = os.path.join(ROOT_DIR, "config.json")
 CONFIG_OVERRIDE_PATH = os.path.join(ROOT_DIR, "config_override.json")
 
 CONFIG_RELOAD_MINUTES = 15
+# Sheet-backed DB tables are checked for sheet changes that often.
+DB_SYNC_MINUTES = 15
+# Min interval between edits of a job progress message.
+JOB_PROGRESS_REPORT_INTERVAL_SEC = 3
+# Checkpoints of failed job runs older than that are not resumed.
+JOB_CHECKPOINT_MAX_AGE_HOURS = 24
+# How long cached "get_*" reports stay valid unless the board changes.
+REPORT_CACHE_TTL_MINUTES = 10
+# Passing this argument to a cached command forces report recalculation.
+REPORT_CACHE_FORCE_REFRESH_ARG = "force"
 MSK_TIMEZONE = timezone(timedelta(hours=3))
 
 # Upper level config keys
@@ -44,15 +71,57 @@ VK_CONFIG = "vk"
 DB_CONFIG = "db"
 STRINGS_DB_CONFIG = "strings"
 JOBS_CONFIG_FILE_KEY = "jobs_config_key"
+SCHEDULER_CONFIG = "scheduler"
+SENTRY_CONFIG = "sentry"
 
 # Jobs-related keys
 EVERY = "every"
 AT = "at"
 SEND_TO = "send_to"
 KWARGS = "kwargs"
+MISFIRE_POLICY = "misfire_policy"
+MISFIRE_GRACE_MINUTES = "misfire_grace_minutes"
+# can also be set globally in scheduler config
+JITTER_SECONDS = "jitter_seconds"
+STAGGER_SECONDS = "stagger_seconds"
+STAGGER_ORDER = "stagger_order"
+
+# Runs late by more than that are considered stale
+DEFAULT_MISFIRE_GRACE_MINUTES = 180
+
+
+class MisfirePolicy(Enum):
+    """
+    What to do with a scheduled job run that was missed while the bot was down
+    or delayed because scheduler thread was busy.
+    """
+
+    # drop missed runs and runs late by more than grace time
+    SKIP = "skip"
+    # run once if the latest missed run is within grace time
+    RUN_ONCE = "run_once"
+    # always collapse all missed runs into a single run
+    COALESCE = "coalesce"
+
+
+# Sentry keys
+SENTRY_SAMPLE_RATE = "sample_rate"
+SENTRY_TRACES_SAMPLE_RATE = "traces_sample_rate"
+SENTRY_EVENTS_PER_MINUTE = "events_per_minute"
+SENTRY_DEDUP_WINDOW_MINUTES = "dedup_window_minutes"
+DEFAULT_SENTRY_SAMPLE_RATE = 1.0
+DEFAULT_SENTRY_TRACES_SAMPLE_RATE = 0.1
+# Error events captured by log handler, above that they are dropped
+DEFAULT_SENTRY_EVENTS_PER_MINUTE = 30
+# Errors logged from the same place are captured once per window
+DEFAULT_SENTRY_DEDUP_WINDOW_MINUTES = 10
 
 # Telegram keys
 TELEGRAM_MANAGER_IDS = "manager_chat_ids"
+TELEGRAM_REPORT_CACHE_TTL_MINUTES = "report_cache_ttl_minutes"
+TELEGRAM_GLOBAL_MESSAGES_PER_SEC = "global_messages_per_second"
+TELEGRAM_CHAT_MESSAGES_PER_SEC = "chat_messages_per_second"
+TELEGRAM_GROUP_MESSAGES_PER_MIN = "group_messages_per_minute"
 
 # Trello keys
 TRELLO_BOARD_ID = "board_id"
@@ -2,14 +2,16 @@ import json
 import logging
 import re
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import requests
-from sqlalchemy import create_engine, desc
+from sqlalchemy import MetaData, Table, create_engine, desc
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.schema import DropTable
 
 from .. import consts
+from ..sheets.batch_reader import SheetValues
 from ..sheets.sheets_client import GoogleSheetsClient
 from ..utils.singleton import Singleton
 from .db_objects import (
@@ -17,9 +19,13 @@ from .db_objects import (
     Base,
     Chat,
     Curator,
+    JobCheckpoint,
+    JobRun,
     Reminder,
     Rubric,
+    SheetCursor,
     TeamMember,
+    TelegramData,
     TrelloAnalytics,
 )
 
@@ -49,89 +55,196 @@ class DBClient(Singleton):
         session_factory = sessionmaker(bind=self.engine)
         self.Session = scoped_session(session_factory)
         Base.metadata.create_all(self.engine)
+        # table name -> revision of the spreadsheet it was filled from
+        self._sheet_revisions: Dict[str, Optional[str]] = {}
 
     def fetch_all(self, sheets_client: GoogleSheetsClient):
-        self.fetch_authors_sheet(sheets_client)
-        self.fetch_curators_sheet(sheets_client)
-        self.fetch_team_sheet(sheets_client)
-        self.fetch_rubrics_sheet(sheets_client)
+        # downloaded together, tables that failed are fetched again one by one
+        tables = sheets_client.fetch_tables(
+            [
+                sheets_client.authors_tab,
+                sheets_client.curators_tab,
+                sheets_client.hr_team_tab,
+                sheets_client.rubrics_tab,
+            ],
+            columns={sheets_client.authors_tab: Author.get_sheet_columns()},
+        )
+        self.fetch_authors_sheet(sheets_client, tables.get(sheets_client.authors_tab))
+        self.fetch_curators_sheet(sheets_client, tables.get(sheets_client.curators_tab))
+        self.fetch_team_sheet(sheets_client, tables.get(sheets_client.hr_team_tab))
+        self.fetch_rubrics_sheet(sheets_client, tables.get(sheets_client.rubrics_tab))
 
-    def fetch_authors_sheet(self, sheets_client: GoogleSheetsClient):
-        session = self.Session()
+    def fetch_authors_sheet(
+        self, sheets_client: GoogleSheetsClient, authors: SheetValues = None
+    ):
         try:
-            # clean this table
-            session.query(Author).delete()
-            # re-download it
-            authors = sheets_client.fetch_authors()
-            for item in authors:
-                author = Author.from_sheetfu_item(item)
-                session.add(author)
-            session.commit()
+            if authors is None:
+                authors = sheets_client.fetch_authors(
+                    columns=Author.get_sheet_columns()
+                )
+            self._replace_table(
+                Author,
+                [Author.from_sheetfu_item(item) for item in authors],
+                authors.revision,
+            )
         except Exception as e:
             logger.warning(f"Failed to update authors table from sheet: {e}")
-            session.rollback()
             return 0
         return len(authors)
 
-    def fetch_curators_sheet(self, sheets_client: GoogleSheetsClient):
-        session = self.Session()
+    def fetch_curators_sheet(
+        self, sheets_client: GoogleSheetsClient, curators: SheetValues = None
+    ):
         try:
-            # clean this table
-            session.query(Curator).delete()
-            # re-download it
-            curators = sheets_client.fetch_curators()
-            for item in curators:
-                curator = Curator.from_sheetfu_item(item)
-                session.add(curator)
-            session.commit()
+            if curators is None:
+                curators = sheets_client.fetch_curators()
+            self._replace_table(
+                Curator,
+                [Curator.from_sheetfu_item(item) for item in curators],
+                curators.revision,
+            )
         except Exception as e:
             logger.warning(f"Failed to update curators table from sheet: {e}")
-            session.rollback()
             return 0
         return len(curators)
 
-    def fetch_team_sheet(self, sheets_client: GoogleSheetsClient):
-        session = self.Session()
+    def fetch_team_sheet(
+        self,
+        sheets_client: GoogleSheetsClient,
+        team: SheetValues = None,
+        get_roles: Callable[[TeamMember], List[str]] = None,
+    ):
+        """
+        With get_roles given, members are stored together with their roles,
+        which are calculated only for new and changed members.
+        """
         try:
-            # clean this table
-            session.query(TeamMember).delete()
-            # re-download it
-            team = sheets_client.fetch_hr_team()
-            for item in team:
-                member = TeamMember.from_sheetfu_item(item)
-                session.add(member)
-            session.commit()
+            if team is None:
+                team = sheets_client.fetch_hr_team()
+            members = [TeamMember.from_sheetfu_item(item) for item in team]
+            if get_roles is not None:
+                self._fill_changed_roles(members, get_roles)
+            self._replace_table(TeamMember, members, team.revision)
         except Exception as e:
             logger.warning(f"Failed to update team table from sheet: {e}")
-            session.rollback()
             return 0
         return len(team)
 
-    def fetch_rubrics_sheet(self, sheets_client: GoogleSheetsClient):
-        session = self.Session()
+    def fetch_rubrics_sheet(
+        self, sheets_client: GoogleSheetsClient, rubrics: SheetValues = None
+    ):
         try:
-            # clean this table
-            session.query(Rubric).delete()
-            # re-download it
-            rubrics = sheets_client.fetch_rubrics()
-            for item in rubrics:
-                rubric = Rubric.from_sheetfu_item(item)
-                if rubric is None:
-                    continue
-                session.add(rubric)
-            session.commit()
+            if rubrics is None:
+                rubrics = sheets_client.fetch_rubrics()
+            self._replace_table(
+                Rubric,
+                [
+                    rubric
+                    for rubric in map(Rubric.from_sheetfu_item, rubrics)
+                    if rubric is not None
+                ],
+                rubrics.revision,
+            )
         except Exception as e:
             logger.warning(f"Failed to update rubric table from sheet: {e}")
-            session.rollback()
             return 0
         return len(rubrics)
 
+    def get_sheet_revision(self, model) -> Optional[str]:
+        """
+        Revision of the spreadsheet the model table was last filled from,
+        None if unknown.
+        """
+        return self._sheet_revisions.get(model.__tablename__)
+
+    def _fill_changed_roles(
+        self, members: List[TeamMember], get_roles: Callable[[TeamMember], List[str]]
+    ):
+        """
+        Members whose sheet rows didn't change keep their current roles.
+        """
+        # sheet row -> roles, rows as read back from the DB
+        current_roles = {
+            self._get_sheet_row(member): member.roles
+            for member in self.get_all_members()
+        }
+        num_calculated = 0
+        for member in members:
+            member.roles = current_roles.get(self._get_sheet_row(member))
+            if member.roles is None:
+                member.roles = json.dumps(get_roles(member))
+                num_calculated += 1
+        logger.info(f"Calculated roles of {num_calculated} new or changed members")
+
+    @staticmethod
+    def _get_sheet_row(member: TeamMember) -> Tuple[str, ...]:
+        values = (
+            getattr(member, column.key)
+            for column in TeamMember.__table__.columns
+            if column.key != "roles"
+        )
+        # the DB stores values of string columns as text
+        return tuple("" if value is None else str(value) for value in values)
+
+    def _replace_table(self, model, items: List[Base], revision: str = None):
+        """
+        Replaces all rows of the model table so that readers on other threads
+        see either the old rows or the new ones, never an empty or half-filled
+        table. Rows are loaded into a staging table, which takes the place of
+        the old one in the same transaction. On failure the old table is kept.
+        revision is the one of the spreadsheet the rows come from.
+        """
+        table = model.__table__
+        staging_table = self._make_staging_table(table)
+        rows = [
+            {column.name: getattr(item, column.key) for column in table.columns}
+            for item in items
+        ]
+        preparer = self.engine.dialect.identifier_preparer
+        session = self.Session()
+        try:
+            connection = session.connection()
+            staging_table.drop(connection, checkfirst=True)
+            staging_table.create(connection)
+            # pysqlite opens a transaction on DML only, so it goes before the swap
+            session.execute(staging_table.delete())
+            if rows:
+                session.execute(staging_table.insert(), rows)
+            # the old table is dropped rather than renamed: sqlite would
+            # point foreign keys of other tables to its new name
+            session.execute(DropTable(table))
+            session.execute(
+                f"ALTER TABLE {preparer.format_table(staging_table)} "
+                f"RENAME TO {preparer.quote(table.name)}"
+            )
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        self._sheet_revisions[table.name] = revision
+        logger.info(f"Replaced {table.name} table with {len(rows)} rows")
+
+    @staticmethod
+    def _make_staging_table(table: Table) -> Table:
+        """
+        Copy of the table under another name, with the same columns and keys.
+        """
+        metadata = MetaData()
+        # foreign keys of the copy need the tables they refer to
+        for foreign_key in table.foreign_keys:
+            foreign_key.column.table.tometadata(metadata)
+        return table.tometadata(metadata, name=f"{table.name}_staging")
+
     def fill_team_roles(self, member_roles: Dict[str, List[str]]):
-        # Set roles for users
+        # Set roles for users, all rows in one executemany update
         session = self.Session()
-        for member_id, roles in member_roles.items():
-            update = {TeamMember.roles: json.dumps(roles)}
-            session.query(TeamMember).filter(TeamMember.id == member_id).update(update)
+        session.bulk_update_mappings(
+            TeamMember,
+            [
+                {"id": member_id, "roles": json.dumps(roles)}
+                for member_id, roles in member_roles.items()
+            ],
+        )
         session.commit()
 
     def find_author_telegram_by_trello(self, trello_id: str):
@@ -283,11 +396,12 @@ class DBClient(Singleton):
         reminders = (
             session.query(Reminder).filter(Reminder.next_reminder_datetime <= now).all()
         )
-        # if there's more than 3 hours lag then don't send
+        # if there's too much lag then don't send
         reminders_to_send = [
             reminder
             for reminder in reminders
-            if reminder.next_reminder_datetime >= now - timedelta(hours=3)
+            if reminder.next_reminder_datetime
+            >= now - timedelta(minutes=consts.DEFAULT_MISFIRE_GRACE_MINUTES)
         ]
         for reminder in reminders:
             next_date = reminder.next_reminder_datetime + timedelta(
@@ -378,6 +492,99 @@ class DBClient(Singleton):
             logger.warning(f"Failed to add statistic: {e}")
             session.rollback()
 
+    def get_job_checkpoint(self, job_name: str, max_age: timedelta) -> Dict[str, Any]:
+        """
+        Returns results of items processed by unfinished run of the job.
+        Items older than max_age are considered stale and ignored.
+        """
+        session = self.Session()
+        checkpoint_items = (
+            session.query(JobCheckpoint)
+            .filter(JobCheckpoint.job_name == job_name)
+            .filter(JobCheckpoint.created_at >= datetime.now() - max_age)
+            .all()
+        )
+        return {item.item_id: json.loads(item.result) for item in checkpoint_items}
+
+    def add_job_checkpoint_item(self, job_name: str, item_id: str, result: Any):
+        session = self.Session()
+        try:
+            session.merge(
+                JobCheckpoint(
+                    job_name=job_name,
+                    item_id=item_id,
+                    result=json.dumps(result),
+                    created_at=datetime.now(),
+                )
+            )
+            session.commit()
+        except Exception as e:
+            logger.warning(f"Failed to checkpoint {item_id} for {job_name}: {e}")
+            session.rollback()
+
+    def clear_job_checkpoint(self, job_name: str):
+        session = self.Session()
+        session.query(JobCheckpoint).filter(JobCheckpoint.job_name == job_name).delete()
+        session.commit()
+
+    def get_job_last_runs(self) -> Dict[str, datetime]:
+        session = self.Session()
+        return {
+            job_run.schedule_key: job_run.last_run
+            for job_run in session.query(JobRun).all()
+        }
+
+    def set_job_last_run(self, schedule_key: str, last_run: datetime):
+        session = self.Session()
+        try:
+            session.merge(JobRun(schedule_key=schedule_key, last_run=last_run))
+            session.commit()
+        except Exception as e:
+            logger.warning(f"Failed to save last run of {schedule_key}: {e}")
+            session.rollback()
+
+    def get_sheet_cursor(self, sheet_key: str, sheet_name: Optional[str]) -> int:
+        """
+        Last processed row of the sheet, 1 (the header) if none yet.
+        """
+        session = self.Session()
+        cursor = session.query(SheetCursor).get((sheet_key, sheet_name or ""))
+        return cursor.last_row if cursor else 1
+
+    def set_sheet_cursor(
+        self, sheet_key: str, sheet_name: Optional[str], last_row: int
+    ):
+        session = self.Session()
+        try:
+            session.merge(
+                SheetCursor(
+                    sheet_key=sheet_key, sheet_name=sheet_name or "", last_row=last_row
+                )
+            )
+            session.commit()
+        except Exception as e:
+            logger.warning(f"Failed to save cursor of {sheet_key} {sheet_name}: {e}")
+            session.rollback()
+
+    def get_telegram_data(self) -> Dict[Tuple[str, str], bytes]:
+        session = self.Session()
+        return {
+            (item.kind, item.key): item.data for item in session.query(TelegramData)
+        }
+
+    def set_telegram_data(self, items: Dict[Tuple[str, str], bytes]):
+        """
+        Saves changed records in a single transaction.
+        """
+        session = self.Session()
+        try:
+            for (kind, key), data in items.items():
+                session.merge(TelegramData(kind=kind, key=key, data=data))
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+
     def get_latest_trello_analytics(self) -> TrelloAnalytics:
         session = self.Session()
         return (
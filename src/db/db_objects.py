@@ -1,4 +1,14 @@
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String
+from typing import List
+
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    ForeignKey,
+    Integer,
+    LargeBinary,
+    String,
+)
 from sqlalchemy.ext.declarative import declarative_base
 
 from ..strings import load
@@ -37,14 +47,27 @@ class Author(Base):
             "trello": self.trello,
         }
 
+    # attribute -> string id of the sheet column
+    sheet_field_alias = {
+        "name": "sheets__what_is_your_name",
+        "curator": "sheets__curator_as_author",
+        "status": "sheets__status",
+        "telegram": "sheets__telegram",
+        "trello": "sheets__trello",
+    }
+
+    @classmethod
+    def get_sheet_columns(cls) -> List[str]:
+        """
+        Sheet columns read by from_sheetfu_item, others need not be downloaded.
+        """
+        return [load(alias) for alias in cls.sheet_field_alias.values()]
+
     @classmethod
     def from_sheetfu_item(cls, item):
         author = cls()
-        author.name = item.get_field_value(load("sheets__what_is_your_name"))
-        author.curator = item.get_field_value(load("sheets__curator_as_author"))
-        author.status = item.get_field_value(load("sheets__status"))
-        author.telegram = item.get_field_value(load("sheets__telegram"))
-        author.trello = item.get_field_value(load("sheets__trello"))
+        for name, alias in cls.sheet_field_alias.items():
+            setattr(author, name, item.get_field_value(load(alias)))
         return author
 
 
@@ -196,6 +219,58 @@ class TrelloAnalytics(Base):
     ready_to_issue = Column(Integer)
 
 
+class JobCheckpoint(Base):
+    __tablename__ = "job_checkpoints"
+
+    job_name = Column(String, primary_key=True)
+    item_id = Column(String, primary_key=True)  # e.g. trello card id
+    result = Column(String)  # json-serialized result of item processing
+    created_at = Column(DateTime)
+
+    def __repr__(self):
+        return f"JobCheckpoint {self.job_name} item={self.item_id}"
+
+
+class JobRun(Base):
+    __tablename__ = "job_runs"
+
+    schedule_key = Column(String, primary_key=True)  # job id and its schedule
+    last_run = Column(DateTime)  # run time the job was scheduled for, local time
+
+    def __repr__(self):
+        return f"JobRun {self.schedule_key} last_run={self.last_run}"
+
+
+class TelegramData(Base):
+    """
+    Telegram bot persistence: chat, user and bot data and conversation states.
+    """
+
+    __tablename__ = "telegram_data"
+
+    kind = Column(String, primary_key=True)  # e.g. chat_data
+    key = Column(String, primary_key=True)  # e.g. chat id
+    data = Column(LargeBinary)  # pickled
+
+    def __repr__(self):
+        return f"TelegramData {self.kind} key={self.key}"
+
+
+class SheetCursor(Base):
+    """
+    Last row of a sheet processed by a job, for sheets only appended to.
+    """
+
+    __tablename__ = "sheet_cursors"
+
+    sheet_key = Column(String, primary_key=True)
+    sheet_name = Column(String, primary_key=True)  # "" for the first tab
+    last_row = Column(Integer)  # counting from 1, header included
+
+    def __repr__(self):
+        return f"SheetCursor {self.sheet_key} {self.sheet_name} row={self.last_row}"
+
+
 class Rubric(Base):
     __tablename__ = "rubrics"
     name = Column(String, primary_key=True)
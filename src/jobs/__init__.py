@@ -13,6 +13,7 @@ from .db_fetch_authors_sheet_job import DBFetchAuthorsSheetJob
 from .db_fetch_curators_sheet_job import DBFetchCuratorsSheetJob
 from .db_fetch_strings_sheet_job import DBFetchStringsSheetJob
 from .db_fetch_team_sheet_job import DBFetchTeamSheetJob
+from .db_sync_job import DBSyncJob
 from .editorial_board_stats_job import EditorialBoardStatsJob
 from .editorial_board_visual_stats_job import EditorialBoardVisualStatsJob
 from .editorial_report_job import EditorialReportJob
@@ -2,6 +2,7 @@ import logging
 from typing import Callable
 
 from ..app_context import AppContext
+from .job_progress import JobProgress
 
 logger = logging.getLogger(__name__)
 
@@ -15,10 +16,13 @@ class BaseJob:
         called_from_handler=False,
         args=None,
         kwargs=None,
+        progress_send: Callable[[str], None] = None,
     ):
         """
         Not intended to be overridden.
         Default send function does nothing with all send(...) statements.
+        progress_send is used by jobs tracking progress to report it.
+        Returns True if the job finished without exceptions.
         """
         module = cls.__name__
         if cls._usage_muted():
@@ -26,6 +30,16 @@ class BaseJob:
         else:
             logging_func = logger.usage
 
+        kwargs = dict(kwargs) if kwargs else {}
+        progress = None
+        if cls._tracks_progress():
+            progress = JobProgress(
+                module,
+                app_context.db_client if cls._resumes_progress() else None,
+                progress_send,
+            )
+            kwargs["progress"] = progress
+
         try:
             logging_func(f"Job {module} started...")
             cls._execute(
@@ -33,12 +47,16 @@ class BaseJob:
                 send,
                 called_from_handler,
                 *args if args else [],
-                **kwargs if kwargs else {},
+                **kwargs,
             )
+            if progress is not None:
+                progress.finish()
             logging_func(f"Job {module} finished")
+            return True
         except Exception as e:
             # should not raise exception, so that schedule module won't go mad retrying
             logging.exception(f"Could not run job {module}", exc_info=e)
+            return False
 
     @staticmethod
     def _execute(
@@ -62,3 +80,20 @@ class BaseJob:
     @staticmethod
     def _usage_muted():
         return False
+
+    @staticmethod
+    def _tracks_progress():
+        """
+        Such jobs receive JobProgress as progress kwarg to report their progress.
+        """
+        return False
+
+    @staticmethod
+    def _resumes_progress():
+        """
+        Such jobs checkpoint processed items to DB via JobProgress,
+        so that a retry after failure does not redo them.
+        Only meant for jobs with side effects: results of read-only jobs
+        would go stale between the runs.
+        """
+        return False
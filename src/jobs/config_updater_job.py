@@ -6,9 +6,11 @@ from typing import Callable
 from deepdiff import DeepDiff
 
 from ..app_context import AppContext
+from ..consts import REPORT_CACHE_TTL_MINUTES, TELEGRAM_REPORT_CACHE_TTL_MINUTES
 from ..scheduler import JobScheduler
 from ..strings import load
 from ..tg.sender import TelegramSender
+from ..utils.report_cache import ReportCache
 from .base_job import BaseJob
 
 logger = logging.getLogger(__name__)
@@ -51,6 +53,11 @@ class ConfigUpdaterJob(BaseJob):
                 # update config['telegram']
                 tg_config = job_scheduler.config_manager.get_telegram_config()
                 job_scheduler.telegram_sender.update_config(tg_config)
+                ReportCache().set_ttl(
+                    tg_config.get(
+                        TELEGRAM_REPORT_CACHE_TTL_MINUTES, REPORT_CACHE_TTL_MINUTES
+                    )
+                )
                 app_context.tg_client.update_config(tg_config)
                 # update admins and managers
                 app_context.set_access_rights(tg_config)
@@ -8,6 +8,7 @@ from ..consts import TrelloCardColor, TrelloCustomFieldTypeAlias, TrelloListAlia
 from ..strings import load
 from ..tg.sender import pretty_send
 from .base_job import BaseJob
+from .job_progress import JobProgress
 
 logger = logging.getLogger(__name__)
 
@@ -21,7 +22,10 @@ class IllustratorFolderState(IntEnum):
 class CreateFoldersForIllustratorsJob(BaseJob):
     @staticmethod
     def _execute(
-        app_context: AppContext, send: Callable[[str], None], called_from_handler=False
+        app_context: AppContext,
+        send: Callable[[str], None],
+        called_from_handler=False,
+        progress: JobProgress = None,
     ):
         paragraphs = []  # list of paragraph strings
 
@@ -33,6 +37,7 @@ class CreateFoldersForIllustratorsJob(BaseJob):
                 TrelloListAlias.EDITED_NEXT_WEEK,
                 TrelloListAlias.TO_SEO_EDITOR,
             ),
+            progress=progress or JobProgress(__name__),
         )
 
         if len(result) == 0:
@@ -56,6 +61,7 @@ class CreateFoldersForIllustratorsJob(BaseJob):
     def _create_folders(
         app_context: AppContext,
         list_aliases: List[TrelloListAlias],
+        progress: JobProgress,
     ) -> List[Tuple[IllustratorFolderState, str]]:
         logger.info("Started counting:")
         list_ids = app_context.trello_client.get_list_id_from_aliases(list_aliases)
@@ -63,11 +69,20 @@ class CreateFoldersForIllustratorsJob(BaseJob):
 
         parse_failure_counter = 0
         result = []
-        for card in cards:
+        for processed, card in enumerate(cards):
+            progress.report_count(processed, len(cards))
             if not card:
                 parse_failure_counter += 1
                 continue
 
+            if progress.is_processed(card.id):
+                # folder was handled by previous failed run
+                checkpointed = progress.get_result(card.id)
+                if checkpointed:
+                    folder_state, card_text = checkpointed
+                    result.append((IllustratorFolderState(folder_state), card_text))
+                continue
+
             card_fields = app_context.trello_client.get_custom_fields(card.id)
 
             label_names = [
@@ -78,6 +93,7 @@ class CreateFoldersForIllustratorsJob(BaseJob):
             is_archive_card = load("common_trello_label__archive") in label_names
 
             if is_archive_card:
+                progress.checkpoint(card.id)
                 continue
 
             folder_state = IllustratorFolderState.INCORRECT_URL
@@ -131,7 +147,9 @@ class CreateFoldersForIllustratorsJob(BaseJob):
                 cover=cover,
             )
             result.append((folder_state, card_text))
+            progress.checkpoint(card.id, (folder_state, card_text))
 
+        progress.report_count(len(cards), len(cards))
         if parse_failure_counter > 0:
             logger.error(f"Unparsed cards encountered: {parse_failure_counter}")
         return result
@@ -149,3 +167,11 @@ class CreateFoldersForIllustratorsJob(BaseJob):
     @staticmethod
     def _usage_muted():
         return True
+
+    @staticmethod
+    def _tracks_progress():
+        return True
+
+    @staticmethod
+    def _resumes_progress():
+        return True
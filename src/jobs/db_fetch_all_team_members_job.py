@@ -2,6 +2,7 @@ import logging
 from typing import Callable
 
 from ..app_context import AppContext
+from ..db.db_objects import Author
 from ..strings import load
 from .base_job import BaseJob
 
@@ -13,20 +14,30 @@ class DBFetchAllTeamMembersJob(BaseJob):
     def _execute(
         app_context: AppContext, send: Callable[[str], None], called_from_handler=False
     ):
+        sheets_client = app_context.sheets_client
+        # all three tables are downloaded at once
+        tables = sheets_client.fetch_tables(
+            [
+                sheets_client.authors_tab,
+                sheets_client.curators_tab,
+                sheets_client.hr_team_tab,
+            ],
+            columns={sheets_client.authors_tab: Author.get_sheet_columns()},
+        )
         num_authors = app_context.db_client.fetch_authors_sheet(
-            app_context.sheets_client
+            sheets_client, tables.get(sheets_client.authors_tab)
         )
         logger.info(f"Fetched {num_authors} authors")
         send(load("db_fetch_authors_sheet_job__success", num_authors=num_authors))
 
         num_curators = app_context.db_client.fetch_curators_sheet(
-            app_context.sheets_client
+            sheets_client, tables.get(sheets_client.curators_tab)
         )
         logger.info(f"Fetched {num_curators} curators")
         send(load("db_fetch_curators_sheet_job__success", num_curators=num_curators))
 
         team_size = app_context.db_client.fetch_team_sheet(
-            app_context.sheets_client
+            sheets_client, tables.get(sheets_client.hr_team_tab)
         )
         # after we fetch the team, we need to recalculate the roles
         app_context.role_manager.calculate_db_roles()
@@ -0,0 +1,93 @@
+import logging
+from typing import Callable, Dict, Optional
+
+from ..app_context import AppContext
+from ..db.db_objects import Author, Curator, Rubric, TeamMember
+from ..roles.roles import RoleRules
+from ..sheets.sheets_client import GoogleSheetsClient
+from .base_job import BaseJob
+
+logger = logging.getLogger(__name__)
+
+
+class DBSyncJob(BaseJob):
+    """
+    Refreshes sheet-backed DB tables whose spreadsheets changed since
+    they were fetched, checking a spreadsheet revision takes one request.
+    """
+
+    @staticmethod
+    def _execute(
+        app_context: AppContext, send: Callable[[str], None], called_from_handler=False
+    ):
+        sheets_client = app_context.sheets_client
+        db_client = app_context.db_client
+        revisions = {}
+        strings_changed = DBSyncJob._is_changed(
+            sheets_client,
+            revisions,
+            sheets_client.strings_sheet_key,
+            app_context.strings_db_client.get_sheet_revision(),
+        )
+        if strings_changed:
+            num_strings = app_context.strings_db_client.fetch_strings_sheet(
+                sheets_client
+            )
+            logger.info(f"Fetched {num_strings} strings")
+
+        tabs = {
+            Author: sheets_client.authors_tab,
+            Curator: sheets_client.curators_tab,
+            TeamMember: sheets_client.hr_team_tab,
+            Rubric: sheets_client.rubrics_tab,
+        }
+        changed_tabs = {
+            model: tab
+            for model, tab in tabs.items()
+            if DBSyncJob._is_changed(
+                sheets_client, revisions, tab[0], db_client.get_sheet_revision(model)
+            )
+        }
+        if not changed_tabs and not strings_changed:
+            logger.info("Sheet-backed tables are up to date")
+            return
+        logger.info(f"Refreshing {[model.__tablename__ for model in changed_tabs]}")
+
+        tables = sheets_client.fetch_tables(
+            list(changed_tabs.values()),
+            columns={sheets_client.authors_tab: Author.get_sheet_columns()},
+        )
+        if Author in changed_tabs:
+            db_client.fetch_authors_sheet(sheets_client, tables.get(tabs[Author]))
+        if Curator in changed_tabs:
+            db_client.fetch_curators_sheet(sheets_client, tables.get(tabs[Curator]))
+        if TeamMember in changed_tabs:
+            db_client.fetch_team_sheet(
+                sheets_client,
+                tables.get(tabs[TeamMember]),
+                get_roles=RoleRules().get_roles,
+            )
+        if Rubric in changed_tabs:
+            db_client.fetch_rubrics_sheet(sheets_client, tables.get(tabs[Rubric]))
+        if strings_changed:
+            # role rules compare sheet values to strings
+            app_context.role_manager.calculate_db_roles()
+
+    @staticmethod
+    def _is_changed(
+        sheets_client: GoogleSheetsClient,
+        revisions: Dict[str, Optional[str]],
+        sheet_key: str,
+        fetched_revision: Optional[str],
+    ) -> bool:
+        """
+        Unknown revisions count as changed.
+        revisions are shared by checks, so that each spreadsheet is asked once.
+        """
+        if sheet_key not in revisions:
+            revisions[sheet_key] = sheets_client.get_revision(sheet_key)
+        return revisions[sheet_key] is None or revisions[sheet_key] != fetched_revision
+
+    @staticmethod
+    def _usage_muted():
+        return True
@@ -1,21 +1,22 @@
 ﻿import datetime
+import io
 import logging
-from typing import Callable, Tuple
+from typing import Callable, List, Tuple
 
-import matplotlib as mpl
-import matplotlib.pyplot as plt
 import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 
 from ..app_context import AppContext
 from ..consts import TrelloListAlias
 from ..db.db_objects import TrelloAnalytics
 from ..strings import load
+from ..tg.sender import ImageMessage
 from ..utils import card_checks
 from . import utils
 from .base_job import BaseJob
 
 logger = logging.getLogger(__name__)
-mpl.use("Agg")
 
 DEFAULT_BAR_HEIGHT = 0.4
 
@@ -110,10 +111,17 @@ class EditorialBoardVisualStatsJob(BaseJob):
             new_analytics.date = today_db_str
             app_context.db_client.add_item_to_statistics_table(new_analytics)
 
-        fig, ax = plt.subplots()
+        send(ImageMessage(EditorialBoardVisualStatsJob._render_chart(stats)))
+
+    @staticmethod
+    def _render_chart(stats: List[dict]) -> io.BytesIO:
+        # Figure API instead of pyplot, which keeps global state not safe for threads
+        fig = Figure()
+        FigureCanvasAgg(fig)
+        ax = fig.subplots()
         labels = [x["title"] for x in stats]
         x = np.arange(len(labels))
-        plt.xticks(rotation=90)
+        ax.tick_params(axis="x", labelrotation=90)
         last_week = [x["previous_period"] for x in stats]
         ax.barh(x, last_week, height=DEFAULT_BAR_HEIGHT, label="Предыдущая неделя")
         # Same thing, but for the current week
@@ -131,8 +139,9 @@ class EditorialBoardVisualStatsJob(BaseJob):
         handles, labels = ax.get_legend_handles_labels()
         ax.legend(reversed(handles), reversed(labels))
 
-        plt.savefig("foo.png", bbox_inches="tight")
-        send("foo.png")
+        chart = io.BytesIO()
+        fig.savefig(chart, format="png", bbox_inches="tight")
+        return chart
 
     @staticmethod
     def _card_deadline_is_next_week(card, app_context) -> bool:
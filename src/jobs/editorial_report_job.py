@@ -10,6 +10,7 @@ from ..strings import load
 from ..tg.sender import pretty_send
 from ..trello.trello_client import TrelloClient
 from .base_job import BaseJob
+from .job_progress import JobProgress
 from .utils import (
     check_trello_card,
     format_errors,
@@ -23,10 +24,14 @@ logger = logging.getLogger(__name__)
 class EditorialReportJob(BaseJob):
     @staticmethod
     def _execute(
-        app_context: AppContext, send: Callable[[str], None], called_from_handler=False
+        app_context: AppContext,
+        send: Callable[[str], None],
+        called_from_handler=False,
+        progress: JobProgress = None,
     ):
         paragraphs = []  # list of paragraph strings
         errors = {}
+        progress = progress or JobProgress(__name__)
         paragraphs.append(load("editorial_report_job__intro"))
 
         paragraphs += EditorialReportJob._retrieve_cards_for_paragraph(
@@ -38,6 +43,7 @@ class EditorialReportJob(BaseJob):
                 TrelloListAlias.TO_CHIEF_EDITOR,
             ),
             errors=errors,
+            progress=progress,
             need_title=True,
             strict_archive_rules=False,
         )
@@ -48,6 +54,7 @@ class EditorialReportJob(BaseJob):
             title=load("editorial_report_job__title_revision"),
             list_aliases=(TrelloListAlias.IN_PROGRESS,),
             errors=errors,
+            progress=progress,
             moved_from_exclusive=(
                 TrelloListAlias.EDITED_NEXT_WEEK,
                 TrelloListAlias.TO_SEO_EDITOR,
@@ -64,6 +71,7 @@ class EditorialReportJob(BaseJob):
                 TrelloListAlias.TO_SEO_EDITOR,
             ),
             errors=errors,
+            progress=progress,
             strict_archive_rules=False,
         )
 
@@ -85,6 +93,10 @@ class EditorialReportJob(BaseJob):
 
         pretty_send(paragraphs, send)
 
+    @staticmethod
+    def _tracks_progress():
+        return True
+
     @staticmethod
     def _card_is_urgent(card):
         return load("common_trello_label__urgent") in [
@@ -98,6 +110,7 @@ class EditorialReportJob(BaseJob):
         title: str,
         list_aliases: List[TrelloListAlias],
         errors: dict,
+        progress: JobProgress,
         moved_from_exclusive: List[TrelloListAlias] = (),
         show_post_title=False,
         need_editor=True,
@@ -163,14 +176,17 @@ class EditorialReportJob(BaseJob):
             )
         ]
 
-        for card in sorted(
-            cards_filtered,
-            key=lambda card: (
-                not EditorialReportJob._card_is_urgent(card),
-                card.due is None,
-                card.due,
-            ),
+        for processed, card in enumerate(
+            sorted(
+                cards_filtered,
+                key=lambda card: (
+                    not EditorialReportJob._card_is_urgent(card),
+                    card.due is None,
+                    card.due,
+                ),
+            )
         ):
+            progress.report_count(processed, len(cards_filtered), stage=title)
             if not card:
                 parse_failure_counter += 1
                 continue
@@ -190,25 +206,23 @@ class EditorialReportJob(BaseJob):
                 continue
 
             url = card_fields.google_doc or card.url
-            paragraphs.append(
-                load(
-                    "editorial_report_job__card_2",
-                    date=card.due.strftime("%d.%m").lower() if card.due else "??.??",
-                    urgent="(Срочно!)"
-                    if EditorialReportJob._card_is_urgent(card)
-                    else "",
-                    no_file_access=get_no_access_marker(url, drive_client),
-                    url=url,
-                    name=card_fields.title or card.name,
-                    authors=format_possibly_plural(
-                        load("common_role__author"), card_fields.authors
-                    ),
-                    editors=format_possibly_plural(
-                        load("common_role__editor"), card_fields.editors
-                    ),
-                )
+            card_paragraph = load(
+                "editorial_report_job__card_2",
+                date=card.due.strftime("%d.%m").lower() if card.due else "??.??",
+                urgent="(Срочно!)" if EditorialReportJob._card_is_urgent(card) else "",
+                no_file_access=get_no_access_marker(url, drive_client),
+                url=url,
+                name=card_fields.title or card.name,
+                authors=format_possibly_plural(
+                    load("common_role__author"), card_fields.authors
+                ),
+                editors=format_possibly_plural(
+                    load("common_role__editor"), card_fields.editors
+                ),
             )
+            paragraphs.append(card_paragraph)
 
+        progress.report_count(len(cards_filtered), len(cards_filtered), stage=title)
         if parse_failure_counter > 0:
             logger.error(f"Unparsed cards encountered: {parse_failure_counter}")
         return paragraphs
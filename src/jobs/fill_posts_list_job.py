@@ -10,6 +10,7 @@ from ..strings import load
 from ..tg.sender import pretty_send
 from ..trello.trello_client import TrelloClient
 from .base_job import BaseJob
+from .job_progress import JobProgress
 from .utils import check_trello_card, format_errors
 
 logger = logging.getLogger(__name__)
@@ -18,22 +19,29 @@ logger = logging.getLogger(__name__)
 class FillPostsListJob(BaseJob):
     @staticmethod
     def _execute(
-        app_context: AppContext, send: Callable[[str], None], called_from_handler=False
+        app_context: AppContext,
+        send: Callable[[str], None],
+        called_from_handler=False,
+        progress: JobProgress = None,
     ):
         errors = {}
         registry_posts = []
         all_rubrics = app_context.db_client.get_rubrics()
+        progress = progress or JobProgress(__name__)
 
         registry_posts += FillPostsListJob._retrieve_cards_for_registry(
             trello_client=app_context.trello_client,
             list_aliases=(TrelloListAlias.PROOFREADING, TrelloListAlias.DONE),
             all_rubrics=all_rubrics,
             errors=errors,
+            progress=progress,
             show_due=True,
             strict_archive_rules=True,
         )
 
         if len(errors) == 0:
+            # registry skips already present posts, so retries are idempotent
+            progress.report(load("fill_posts_list_job__progress_registry"), force=True)
             posts_added = app_context.sheets_client.update_posts_registry(
                 registry_posts
             )
@@ -57,6 +65,7 @@ class FillPostsListJob(BaseJob):
         list_aliases: List[str],
         errors: dict,
         all_rubrics: List,
+        progress: JobProgress,
         show_due=True,
         need_illustrators=True,
         strict_archive_rules=True,
@@ -72,7 +81,8 @@ class FillPostsListJob(BaseJob):
 
         registry_posts = []
 
-        for card in cards:
+        for processed, card in enumerate(cards):
+            progress.report_count(processed, len(cards))
             label_names = [label.name for label in card.labels]
             is_main_post = load("common_trello_label__main_post") in label_names
             is_archive_post = load("common_trello_label__archive") in label_names
@@ -124,6 +134,11 @@ class FillPostsListJob(BaseJob):
                 )
             )
 
+        progress.report_count(len(cards), len(cards))
         if parse_failure_counter > 0:
             logger.error(f"Unparsed cards encountered: {parse_failure_counter}")
         return registry_posts
+
+    @staticmethod
+    def _tracks_progress():
+        return True
@@ -1,9 +1,11 @@
 import logging
-from typing import Callable, List
+from typing import Callable, List, Set
 
 from sheetfu import Table
 
 from ..app_context import AppContext
+from ..sheets.batch_reader import SheetRows
+from ..sheets.sheets_client import GoogleSheetsClient
 from ..sheets.sheets_objects import HRPersonProcessed, HRPersonRaw
 from ..strings import load
 from ..tg.sender import pretty_send
@@ -34,37 +36,81 @@ class HRAcquisitionJob(BaseJob):
     def _process_new_people(
         app_context: AppContext,
     ) -> List[HRPersonProcessed]:
-        forms_raw = app_context.sheets_client.fetch_hr_forms_raw()
-        forms_processed = app_context.sheets_client.fetch_hr_forms_processed()
-
-        new_items = HRAcquisitionJob._process_raw_forms(forms_raw, forms_processed)
+        sheets_client = app_context.sheets_client
+        last_row = app_context.db_client.get_sheet_cursor(
+            *sheets_client.hr_forms_raw_tab
+        )
+        # answers are appended to the bottom, only new ones are read,
+        # along with the last processed one to notice rows deleted above it
+        forms_raw = sheets_client.fetch_hr_forms_raw(after_row=last_row - 1)
+        if not HRAcquisitionJob._is_cursor_valid(forms_raw, last_row):
+            logger.warning("Form answers above the cursor were deleted, reading all")
+            last_row = 1
+            forms_raw = sheets_client.fetch_hr_forms_raw()
+        if forms_raw.last_row <= last_row:
+            return []
+        forms_processed = sheets_client.fetch_hr_forms_processed()
+        known_telegrams = HRAcquisitionJob._get_known_telegrams(sheets_client, last_row)
+
+        new_items = HRAcquisitionJob._process_raw_forms(
+            forms_raw, forms_processed, known_telegrams
+        )
 
         try:
-            forms_raw.commit()
-            forms_processed.commit()
+            # both tabs are in the same spreadsheet, so it's a single request
+            sheets_client.commit_tables(forms_raw, forms_processed)
+            app_context.db_client.set_sheet_cursor(
+                *sheets_client.hr_forms_raw_tab, forms_raw.last_row
+            )
         except Exception as e:
             logger.error(f"failed to export data: {e}")
 
         return new_items
 
+    @staticmethod
+    def _is_cursor_valid(forms_raw: SheetRows, last_row: int) -> bool:
+        """
+        Answer at the cursor was processed by the previous run, so it has a status.
+        Otherwise rows above it were deleted and new answers may be above the cursor.
+        """
+        if last_row <= 1:
+            return True
+        return len(forms_raw) > 0 and bool(HRPersonRaw(forms_raw[0]).status)
+
+    @staticmethod
+    def _get_known_telegrams(
+        sheets_client: GoogleSheetsClient, last_row: int
+    ) -> Set[str]:
+        """
+        Telegrams from the answers processed by previous runs,
+        only this column is read for them.
+        """
+        if last_row <= 1:
+            return set()
+        telegrams = sheets_client.fetch_columns(
+            sheets_client.hr_forms_raw_tab, [load("sheets__hr__raw__telegram")]
+        )
+        return {HRPersonRaw(item).telegram for item in telegrams[: last_row - 1]}
+
     @staticmethod
     def _process_raw_forms(
-        forms_raw: Table, forms_processed: Table
+        forms_raw: SheetRows, forms_processed: Table, known_telegrams: Set[str]
     ) -> List[HRPersonProcessed]:
         people = [HRPersonRaw(item) for item in forms_raw]
         existing_people = [person for person in people if person.status]
         new_people = [person for person in people if not person.status]
         new_items = []
+        # telegrams of existing and already accepted people, kept up to date
+        known_telegrams = known_telegrams | {
+            person.telegram for person in existing_people
+        }
 
         for person in new_people:
             # filter out incomplete responses
             if not person.telegram and not person.other_contacts:
                 person.status = load("sheets__hr__raw__status_rejection")
                 continue
-            if person.telegram and (
-                person.telegram in {person.telegram for person in existing_people}
-                or person.telegram in {person.telegram for person in new_items}
-            ):
+            if person.telegram and person.telegram in known_telegrams:
                 person.status = load("sheets__hr__raw__status_double")
                 continue
 
@@ -86,6 +132,7 @@ class HRAcquisitionJob(BaseJob):
             new_items.append(
                 HRPersonProcessed.add_one_to_table(forms_processed, person_dict)
             )
+            known_telegrams.add(person.telegram)
 
         return new_items
 
@@ -80,5 +80,7 @@ class HRStatusJob(BaseJob):
     def _get_people(app_context: AppContext) -> List[HRPersonProcessed]:
         return [
             HRPersonProcessed(item)
-            for item in app_context.sheets_client.fetch_hr_forms_processed()
+            for item in app_context.sheets_client.fetch_hr_forms_processed(
+                cached=True, columns=HRPersonProcessed.get_columns()
+            )
         ]
@@ -0,0 +1,98 @@
+import logging
+import time
+from datetime import timedelta
+from typing import Any, Callable
+
+from ..consts import JOB_CHECKPOINT_MAX_AGE_HOURS, JOB_PROGRESS_REPORT_INTERVAL_SEC
+from ..db.db_client import DBClient
+from ..strings import load
+
+logger = logging.getLogger(__name__)
+
+
+class JobProgress:
+    """
+    Progress of a single run of a long-running job.
+    Reports status updates (e.g. by editing a single telegram message)
+    and checkpoints results of processed items to DB,
+    so that a retry after failure carries on from where the run stopped.
+    """
+
+    def __init__(
+        self,
+        job_name: str,
+        db_client: DBClient = None,
+        progress_send: Callable[[str], None] = None,
+    ):
+        self.job_name = job_name
+        self._db_client = db_client
+        self._progress_send = progress_send
+        self._last_report_ts = None
+        self._checkpoint = {}
+        if db_client is not None:
+            try:
+                self._checkpoint = db_client.get_job_checkpoint(
+                    job_name, timedelta(hours=JOB_CHECKPOINT_MAX_AGE_HOURS)
+                )
+            except Exception as e:
+                logger.warning(f"Failed to load checkpoint for {job_name}: {e}")
+        if self._checkpoint:
+            logger.info(
+                f"Resuming {job_name}, {len(self._checkpoint)} items already processed"
+            )
+
+    def report(self, text: str, force: bool = False):
+        """
+        Sends progress update. Updates are throttled unless forced.
+        """
+        if self._progress_send is None:
+            return
+        now = time.monotonic()
+        if (
+            not force
+            and self._last_report_ts is not None
+            and now - self._last_report_ts < JOB_PROGRESS_REPORT_INTERVAL_SEC
+        ):
+            return
+        self._last_report_ts = now
+        try:
+            self._progress_send(text)
+        except Exception as e:
+            # progress is informational, should never break the job
+            logger.warning(f"Failed to report progress of {self.job_name}: {e}")
+
+    def report_count(self, processed: int, total: int, stage: str = ""):
+        if self._progress_send is None:
+            return
+        self.report(
+            load("common__job_progress", stage=stage, processed=processed, total=total),
+            force=processed == total,
+        )
+
+    def is_processed(self, item_id: str) -> bool:
+        return item_id in self._checkpoint
+
+    def get_result(self, item_id: str) -> Any:
+        """
+        Returns json-deserialized result of previously processed item.
+        """
+        return self._checkpoint.get(item_id)
+
+    def checkpoint(self, item_id: str, result: Any = None):
+        """
+        Saves json-serializable result of item processing.
+        """
+        self._checkpoint[item_id] = result
+        if self._db_client is not None:
+            self._db_client.add_job_checkpoint_item(self.job_name, item_id, result)
+
+    def finish(self):
+        """
+        To be called after successful run, so that next run starts from scratch.
+        """
+        self._checkpoint = {}
+        if self._db_client is not None:
+            try:
+                self._db_client.clear_job_checkpoint(self.job_name)
+            except Exception as e:
+                logger.warning(f"Failed to clear checkpoint of {self.job_name}: {e}")
@@ -5,7 +5,7 @@ from typing import Callable, List
 from ..app_context import AppContext
 from ..consts import TrelloCardColor
 from ..strings import load
-from ..tg.sender import TelegramSender, pretty_send
+from ..tg.sender import TelegramSender
 from ..trello.trello_objects import TrelloCard
 from ..utils import card_checks
 from .base_job import BaseJob
@@ -19,9 +19,10 @@ class TrelloBoardStateNotificationsJob(BaseJob):
     def _execute(
         app_context: AppContext, send: Callable[[str], None], called_from_handler=False
     ):
-        sender = TelegramSender()
-
         curator_cards = get_cards_by_curator(app_context)
+        # chat_id -> paragraphs, to notify all curators at once
+        chat_paragraphs = {}
+        chat_curator_names = {}
         for curator, curator_cards in curator_cards.items():
             curator_name, curator_tg = curator
             card_paragraphs = []
@@ -49,9 +50,8 @@ class TrelloBoardStateNotificationsJob(BaseJob):
                 try:
                     chat = app_context.db_client.get_chat_by_name(curator_tg)
                     if chat and chat.is_curator:
-                        pretty_send(
-                            paragraphs, lambda msg: sender.send_to_chat_id(msg, chat.id)
-                        )
+                        chat_paragraphs[chat.id] = paragraphs
+                        chat_curator_names[chat.id] = curator_name
                     else:
                         logger.warning(
                             f"Curator {curator_name} is not enrolled, could not send notifications"
@@ -60,6 +60,17 @@ class TrelloBoardStateNotificationsJob(BaseJob):
                     logger.error(f"Could not send to {curator_name}:")
                     logger.error(e)
 
+        delivery_report = TelegramSender().fan_out(chat_paragraphs)
+        for chat_id, is_delivered in delivery_report.items():
+            if not is_delivered:
+                logger.error(
+                    f"Notifications to {chat_curator_names[chat_id]} were not delivered"
+                )
+        logger.info(
+            f"Notified {sum(delivery_report.values())} of "
+            f"{len(delivery_report)} curators"
+        )
+
     @staticmethod
     def _format_card(
         card: TrelloCard, failure_reasons: List[str], app_context: AppContext
@@ -1,4 +1,4 @@
-from typing import Callable, List
+from typing import Callable, Iterator
 
 from ..app_context import AppContext
 from ..consts import TrelloListAlias
@@ -27,7 +27,6 @@ class TrelloGetArticlesRubricJob(BaseJob):
         *args,
         **kwargs
     ):
-        paragraphs = []
         if called_from_handler:
             if len(args) == 0:
                 send("Please type in rubric name after get_articles_rubric")
@@ -36,11 +35,18 @@ class TrelloGetArticlesRubricJob(BaseJob):
                 rubric_name = args[0]
         else:
             rubric_name = kwargs["rubric_name"]
-        paragraphs.append(load("rubric_report_job__intro", rubric=rubric_name))
+        # sections are sent as soon as each list is processed
+        pretty_send(
+            TrelloGetArticlesRubricJob._iter_paragraphs(app_context, rubric_name),
+            send,
+        )
 
+    @staticmethod
+    def _iter_paragraphs(app_context: AppContext, rubric_name: str) -> Iterator[str]:
+        yield load("rubric_report_job__intro", rubric=rubric_name)
         for alias in TrelloListAlias:
             if alias is not TrelloListAlias.BACK_BURNER:
-                paragraphs += TrelloGetArticlesRubricJob._get_rubric_paragraphs(
+                yield from TrelloGetArticlesRubricJob._get_rubric_paragraphs(
                     app_context=app_context,
                     trello_client=app_context.trello_client,
                     rubric_title=load(alias.value),
@@ -48,8 +54,6 @@ class TrelloGetArticlesRubricJob(BaseJob):
                     rubric_name=rubric_name,
                 )
 
-        pretty_send(paragraphs, send)
-
     @staticmethod
     def _format_card(card: TrelloCard, app_context: AppContext) -> str:
         card_fields = app_context.trello_client.get_custom_fields(card.id)
@@ -63,13 +67,14 @@ class TrelloGetArticlesRubricJob(BaseJob):
             ),
         )
 
+    @staticmethod
     def _get_rubric_paragraphs(
         app_context: AppContext,
         trello_client: TrelloClient,
         rubric_title: str,
         rubric_alias: str,
         rubric_name: str,
-    ) -> List[str]:
+    ) -> Iterator[str]:
         list_ids = trello_client.get_list_id_from_aliases([rubric_alias])
         cards = trello_client.get_cards(list_ids)
         cards_filtered = []
@@ -77,14 +82,10 @@ class TrelloGetArticlesRubricJob(BaseJob):
             if rubric_name in [label.name for label in card.labels]:
                 cards_filtered.append(card)
 
-        paragraphs = [
-            load(
-                "common_report__list_title_and_size",
-                title=rubric_title,
-                length=len(cards_filtered),
-            )
-        ]
+        yield load(
+            "common_report__list_title_and_size",
+            title=rubric_title,
+            length=len(cards_filtered),
+        )
         for card in cards_filtered:
-            formatted_card = TrelloGetArticlesRubricJob._format_card(card, app_context)
-            paragraphs.append(formatted_card)
-        return paragraphs
+            yield TrelloGetArticlesRubricJob._format_card(card, app_context)
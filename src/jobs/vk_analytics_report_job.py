@@ -35,7 +35,9 @@ class VkAnalyticsReportJob(BaseJob):
         recent_posts_stats = app_context.vk_client.get_post_stats(
             group.id, recent_posts, ReportPeriod.WEEK
         )
-        registry_table = app_context.sheets_client.fetch_posts_registry()
+        registry_table = app_context.sheets_client.fetch_posts_registry(
+            columns=PostRegistryItem.get_columns()
+        )
         # sorted in reverse, because recent posts are added to the bottom
         post_registry_items = [PostRegistryItem(item) for item in registry_table][::-1]
         top_reach_post_stats = _get_top_reach_post_stats(recent_posts_stats)
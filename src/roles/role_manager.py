@@ -8,7 +8,7 @@ from src.db.db_objects import TeamMember
 from src.strings import load
 from src.utils.singleton import Singleton
 
-from .roles import Role, Roles, all_roles
+from .roles import RoleRules, Roles
 
 logger = logging.getLogger(__name__)
 
@@ -20,11 +20,11 @@ class RoleManager(Singleton):
         self.db_client = db_client
 
     def calculate_db_roles(self):
-        members = self.db_client.get_all_members()
-        member_roles = {}
-        for member in members:
-            roles = [role.get_name() for role in all_roles if role.fits(member)]
-            member_roles[member.id] = roles
+        rules = RoleRules()
+        member_roles = {
+            member.id: rules.get_roles(member)
+            for member in self.db_client.get_all_members()
+        }
         self.db_client.fill_team_roles(member_roles)
 
     def get_member(self, member_name: str) -> Optional[TeamMember]:
@@ -1,5 +1,6 @@
 import logging
 from enum import Enum
+from typing import Any, Dict, List, Optional, Tuple, Type
 
 from src.db.db_objects import TeamMember
 from src.strings import load
@@ -20,105 +21,67 @@ class Roles(str, Enum):
 
 
 class Role:
+    # string ids of the status and the manager a member must have, if any
+    _status = None
+    _manager = None
+    _needs_curator = False
+
     @classmethod
     def get_name(cls) -> str:
         if not cls._name:
             raise NotImplementedError("")
         return cls._name
 
-    @staticmethod
-    def fits(member: TeamMember) -> bool:
-        raise NotImplementedError("")
-
 
 class RoleNewbie(Role):
     _name = Roles.NEWBIE
-
-    @staticmethod
-    def fits(member: TeamMember) -> bool:
-        return member.status.lower() == load("sheets__team__status__newbie").lower()
+    _status = "sheets__team__status__newbie"
 
 
 class RoleActiveMember(Role):
     _name = Roles.ACTIVE_MEMBER
-
-    @staticmethod
-    def fits(member: TeamMember) -> bool:
-        return member.status.lower() == load("sheets__team__status__active").lower()
+    _status = "sheets__team__status__active"
 
 
 class RoleFrozenMember(Role):
     _name = Roles.FROZEN_MEMBER
-
-    @staticmethod
-    def fits(member: TeamMember) -> bool:
-        return member.status.lower() == load("sheets__team__status__frozen").lower()
+    _status = "sheets__team__status__frozen"
 
 
 class RoleAuthor(Role):
     _name = Roles.AUTHOR
-
-    @staticmethod
-    def fits(member: TeamMember) -> bool:
-        return RoleActiveMember.fits(member) and member.curator
+    _status = "sheets__team__status__active"
+    _needs_curator = True
 
 
 class RoleRedactor(Role):
     _name = Roles.REDACTOR
-
-    @staticmethod
-    def fits(member: TeamMember) -> bool:
-        return (
-            RoleActiveMember.fits(member)
-            and member.manager.lower()
-            == load("sheets__team__manager__redactor").lower()
-        )
+    _status = "sheets__team__status__active"
+    _manager = "sheets__team__manager__redactor"
 
 
 class RoleIllustrator(Role):
     _name = Roles.ILLUSTRATOR
-
-    @staticmethod
-    def fits(member: TeamMember) -> bool:
-        return (
-            RoleActiveMember.fits(member)
-            and member.manager.lower()
-            == load("sheets__team__manager__illustrator").lower()
-        )
+    _status = "sheets__team__status__active"
+    _manager = "sheets__team__manager__illustrator"
 
 
 class RoleCommissioningEditor(Role):
     _name = Roles.COMMISSIONING_EDITOR
-
-    @staticmethod
-    def fits(member: TeamMember) -> bool:
-        return (
-            RoleActiveMember.fits(member)
-            and member.manager.lower() == load("sheets__team__manager__editor").lower()
-        )
+    _status = "sheets__team__status__active"
+    _manager = "sheets__team__manager__editor"
 
 
 class RoleDirector(Role):
     _name = Roles.DIRECTOR
-
-    @staticmethod
-    def fits(member: TeamMember) -> bool:
-        return (
-            RoleActiveMember.fits(member)
-            and member.manager.lower()
-            == load("sheets__team__manager__director").lower()
-        )
+    _status = "sheets__team__status__active"
+    _manager = "sheets__team__manager__director"
 
 
 class RoleSoftwareEngineer(Role):
     _name = Roles.SOFTWARE_ENGINEER
-
-    @staticmethod
-    def fits(member: TeamMember) -> bool:
-        return (
-            RoleActiveMember.fits(member)
-            and member.manager.lower() == load("sheets__team__manager__swe").lower()
-        )
+    _status = "sheets__team__status__active"
+    _manager = "sheets__team__manager__swe"
 
 
 all_roles = [
@@ -132,3 +95,45 @@ all_roles = [
     RoleDirector,
     RoleSoftwareEngineer,
 ]
+
+
+class RoleRules:
+    """
+    Role rules with their strings loaded and normalized once,
+    to be made anew when strings change.
+    Members with the same status, manager and curator presence
+    get the same roles, which are looked up instead of calculated again.
+    """
+
+    def __init__(self, roles: List[Type[Role]] = None):
+        roles = all_roles if roles is None else roles
+        # normalized status -> (role name, normalized manager, needs curator)
+        self._rules_by_status: Dict[str, List[Tuple[str, Optional[str], bool]]] = {}
+        for role in roles:
+            manager = _normalize(load(role._manager)) if role._manager else None
+            rules = self._rules_by_status.setdefault(_normalize(load(role._status)), [])
+            rules.append((role.get_name(), manager, role._needs_curator))
+        # (status, manager, has curator) -> role names
+        self._roles: Dict[Tuple[str, str, bool], List[str]] = {}
+
+    def get_roles(self, member: TeamMember) -> List[str]:
+        key = (
+            _normalize(member.status),
+            _normalize(member.manager),
+            bool(member.curator),
+        )
+        if key not in self._roles:
+            status, manager, has_curator = key
+            self._roles[key] = [
+                name
+                for name, rule_manager, needs_curator in self._rules_by_status.get(
+                    status, []
+                )
+                if rule_manager in (None, manager)
+                and (has_curator or not needs_curator)
+            ]
+        return list(self._roles[key])
+
+
+def _normalize(value: Any) -> str:
+    return "" if value is None else str(value).lower()
@@ -1,15 +1,34 @@
+import functools
 import html
+import json
 import logging
+import random
 import threading
 import time
-from typing import List
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
 
 import schedule
 import telegram
 
 from .app_context import AppContext
 from .config_manager import ConfigManager
-from .consts import AT, CONFIG_RELOAD_MINUTES, EVERY, KWARGS, SEND_TO
+from .consts import (
+    AT,
+    CONFIG_RELOAD_MINUTES,
+    DB_SYNC_MINUTES,
+    DEFAULT_MISFIRE_GRACE_MINUTES,
+    EVERY,
+    JITTER_SECONDS,
+    KWARGS,
+    MISFIRE_GRACE_MINUTES,
+    MISFIRE_POLICY,
+    SEND_TO,
+    STAGGER_ORDER,
+    STAGGER_SECONDS,
+    MisfirePolicy,
+)
 from .jobs.utils import get_job_runnable
 from .tg.sender import TelegramSender
 from .utils.singleton import Singleton
@@ -34,6 +53,8 @@ class JobScheduler(Singleton):
         self.config = config
         # use config manager to receive current config states
         self.config_manager = ConfigManager()
+        # schedule id -> scheduled job, to reschedule only changed ones
+        self._scheduled_jobs = {}
         # re-read config on schedule
 
     def run(self):
@@ -43,6 +64,9 @@ class JobScheduler(Singleton):
         schedule.every(CONFIG_RELOAD_MINUTES).minutes.do(
             get_job_runnable("config_updater_job"), self.app_context
         ).tag(TECHNICAL_JOB_TAG)
+        schedule.every(DB_SYNC_MINUTES).minutes.do(
+            get_job_runnable("db_sync_job"), self.app_context
+        ).tag(TECHNICAL_JOB_TAG)
 
         cease_continuous_run = threading.Event()
 
@@ -69,53 +93,292 @@ class JobScheduler(Singleton):
         logger.info("Starting setting job schedules...")
         jobs_config = self.config_manager.get_jobs_config()
         logger.info("Got jobs config")
-        for job_id, schedules in jobs_config.items():
+        self._scheduled_jobs = {}
+        self._add_jobs(jobs_config, list(self._iter_schedules(jobs_config)))
+        logger.info("Finished setting jobs")
+
+    def _add_jobs(self, jobs_config: dict, schedules: List[Tuple[str, str, int, dict]]):
+        """
+        Schedules given (schedule_id, job_id, schedule_index, schedule_dict) items.
+        jobs_config is needed to spread jobs sharing the same at time.
+        """
+        last_runs = self._get_job_last_runs()
+        at_offsets = self._get_at_offsets(jobs_config)
+        for schedule_id, job_id, schedule_index, schedule_dict in schedules:
             logger.info(f'Found job "{job_id}"')
+            try:
+                # E.g. ['minute'], ['sunday'] or ['10', 'minutes']
+                every_param = schedule_dict[EVERY].strip().split()
+                assert 1 <= len(every_param) <= 2
+                if len(every_param) == 2:
+                    multiplier, time_unit = every_param
+                    multiplier = int(multiplier)
+                    assert 0 < multiplier
+                    # e.g. schedule.every(10).minutes
+                    scheduled = getattr(schedule.every(multiplier), time_unit)
+                else:
+                    # e.g. schedule.every().hour
+                    scheduled = getattr(schedule.every(), every_param[0])
+                at_shift = timedelta()
+                if AT in schedule_dict:
+                    # can't set "every 10 minutes" and "at 10:00" at the same time
+                    assert len(every_param) < 2
+                    # e.g. schedule.every().wednesday.at("10:00")
+                    at_time = self._shift_at_time(
+                        schedule_dict[AT],
+                        at_offsets.get((job_id, schedule_index), 0),
+                    )
+                    at_shift = self._get_at_shift(schedule_dict[AT], at_time)
+                    scheduled = scheduled.at(at_time, "Europe/Moscow")
+                self._scheduled_jobs[schedule_id] = self._schedule_job(
+                    scheduled, job_id, schedule_dict, last_runs, at_shift
+                )
+            except Exception as e:
+                logger.error(
+                    f"Failed to schedule job {job_id} with params {schedule_dict}: {e}"
+                )
+
+    @staticmethod
+    def _iter_schedules(jobs_config: dict) -> Iterator[Tuple[str, str, int, dict]]:
+        """
+        Yields (schedule_id, job_id, schedule_index, schedule_dict) for all
+        job schedules. schedule_id is the same while job schedule is unchanged.
+        """
+        schedule_id_counter = Counter()
+        for job_id, schedules in jobs_config.items():
             if isinstance(schedules, dict):
                 schedules = [schedules]
-            for schedule_dict in schedules:
-                try:
-                    # E.g. ['minute'], ['sunday'] or ['10', 'minutes']
-                    every_param = schedule_dict[EVERY].strip().split()
-                    assert 1 <= len(every_param) <= 2
-                    if len(every_param) == 2:
-                        multiplier, time_unit = every_param
-                        multiplier = int(multiplier)
-                        assert 0 < multiplier
-                        # e.g. schedule.every(10).minutes
-                        scheduled = getattr(schedule.every(multiplier), time_unit)
-                    else:
-                        # e.g. schedule.every().hour
-                        scheduled = getattr(schedule.every(), every_param[0])
-                    if AT in schedule_dict:
-                        # can't set "every 10 minutes" and "at 10:00" at the same time
-                        assert len(every_param) < 2
-                        # e.g. schedule.every().wednesday.at("10:00")
-                        scheduled = scheduled.at(schedule_dict[AT], "Europe/Moscow")
-                    scheduled.do(
-                        get_job_runnable(job_id),
-                        app_context=self.app_context,
-                        send=self.telegram_sender.create_chat_ids_send(
-                            schedule_dict.get(SEND_TO, [])
-                        ),
-                        kwargs=schedule_dict.get(KWARGS),
-                    ).tag(CUSTOM_JOB_TAG)
-                except Exception as e:
-                    logger.error(
-                        f"Failed to schedule job {job_id} with params {schedule_dict}: {e}"
+            for schedule_index, schedule_dict in enumerate(schedules):
+                schedule_id = f"{job_id}: {json.dumps(schedule_dict, sort_keys=True)}"
+                # identical schedules of the same job are still different jobs
+                schedule_id_counter[schedule_id] += 1
+                if schedule_id_counter[schedule_id] > 1:
+                    schedule_id += f" #{schedule_id_counter[schedule_id]}"
+                yield schedule_id, job_id, schedule_index, schedule_dict
+
+    def _get_at_offsets(self, jobs_config: dict) -> Dict[Tuple[str, int], int]:
+        """
+        Spreads jobs sharing the same "at" time across a window.
+        Returns offset in seconds for each (job_id, schedule index).
+        Jobs in a slot are staggered by stagger_order, then by config order,
+        so that e.g. data fetching jobs can run before reports using the data.
+        Random jitter is added on top of that. Jitter is seeded by the schedule
+        key, so that a restart or unrelated config changes don't move it.
+        """
+        scheduler_config = self.config_manager.get_scheduler_config()
+        slots = {}
+        for job_id, schedules in jobs_config.items():
+            if isinstance(schedules, dict):
+                schedules = [schedules]
+            for schedule_index, schedule_dict in enumerate(schedules):
+                if not isinstance(schedule_dict, dict):
+                    # will be reported as failed to schedule
+                    continue
+                slots.setdefault(schedule_dict.get(AT), []).append(
+                    (job_id, schedule_index, schedule_dict)
+                )
+
+        at_offsets = {}
+        for slot_schedules in slots.values():
+            # sort is stable, so config order is kept within the same stagger_order
+            slot_schedules.sort(key=lambda item: item[2].get(STAGGER_ORDER, 0))
+            for slot_index, (job_id, schedule_index, schedule_dict) in enumerate(
+                slot_schedules
+            ):
+                stagger = schedule_dict.get(
+                    STAGGER_SECONDS, scheduler_config.get(STAGGER_SECONDS, 0)
+                )
+                jitter = schedule_dict.get(
+                    JITTER_SECONDS, scheduler_config.get(JITTER_SECONDS, 0)
+                )
+                jitter_random = random.Random(
+                    self._make_schedule_key(job_id, schedule_dict)
+                )
+                at_offsets[(job_id, schedule_index)] = int(
+                    slot_index * stagger + jitter_random.randint(0, int(jitter))
+                )
+        return at_offsets
+
+    @staticmethod
+    def _shift_at_time(at_time: str, offset_sec: int) -> str:
+        """
+        Shifts "HH:MM" or "HH:MM:SS" at time by offset, not crossing midnight.
+        """
+        if offset_sec == 0:
+            return at_time
+        parsed = JobScheduler._parse_at_time(at_time)
+        if parsed is None:
+            # e.g. ":30" for hourly jobs, those don't share slots with daily ones
+            logger.warning(f"Could not shift at time {at_time}, leaving as is")
+            return at_time
+        shifted = min(
+            parsed + timedelta(seconds=offset_sec),
+            parsed.replace(hour=23, minute=59, second=59),
+        )
+        return shifted.strftime("%H:%M:%S")
+
+    @staticmethod
+    def _get_at_shift(at_time: str, shifted_at_time: str) -> timedelta:
+        if at_time == shifted_at_time:
+            return timedelta()
+        return JobScheduler._parse_at_time(
+            shifted_at_time
+        ) - JobScheduler._parse_at_time(at_time)
+
+    @staticmethod
+    def _parse_at_time(at_time: str) -> Optional[datetime]:
+        try:
+            return datetime.strptime(
+                at_time, "%H:%M:%S" if at_time.count(":") == 2 else "%H:%M"
+            )
+        except ValueError:
+            return None
+
+    def _schedule_job(
+        self,
+        scheduled: schedule.Job,
+        job_id: str,
+        schedule_dict: dict,
+        last_runs: Dict[str, datetime],
+        at_shift: timedelta = timedelta(),
+    ) -> schedule.Job:
+        """
+        Sets job runnable to the schedule, applying its misfire policy.
+        at_shift is how far stagger and jitter moved the job from its at time.
+        Last runs are saved unshifted, as the shift changes with the config.
+        """
+        job_runnable = get_job_runnable(job_id)
+        if job_runnable is None:
+            raise ValueError(f"Job {job_id} not found")
+        schedule_key = self._make_schedule_key(job_id, schedule_dict)
+        misfire_policy = MisfirePolicy(
+            schedule_dict.get(MISFIRE_POLICY, MisfirePolicy.RUN_ONCE.value)
+        )
+        misfire_grace = timedelta(
+            minutes=schedule_dict.get(
+                MISFIRE_GRACE_MINUTES, DEFAULT_MISFIRE_GRACE_MINUTES
+            )
+        )
+
+        @functools.wraps(job_runnable)
+        def run_job(*args, **kwargs):
+            # while job is running, next_run still holds the time it was scheduled for
+            run_slot = job.next_run
+            lateness = datetime.now() - run_slot
+            if misfire_policy == MisfirePolicy.SKIP:
+                if lateness > misfire_grace:
+                    logger.warning(
+                        f"Skipping run of {job_id}, it is late by {lateness}"
                     )
-        logger.info("Finished setting jobs")
+                    return
+            else:
+                # last run is only needed to catch up missed runs
+                self._save_job_last_run(schedule_key, run_slot - at_shift)
+            return job_runnable(*args, **kwargs)
+
+        job = scheduled.do(
+            run_job,
+            app_context=self.app_context,
+            send=self.telegram_sender.create_chat_ids_send(
+                schedule_dict.get(SEND_TO, [])
+            ),
+            kwargs=schedule_dict.get(KWARGS),
+        ).tag(CUSTOM_JOB_TAG)
+
+        last_run = last_runs.get(schedule_key)
+        if last_run is not None and misfire_policy != MisfirePolicy.SKIP:
+            self._catch_up_missed_run(
+                job, job_id, last_run, misfire_policy, misfire_grace, at_shift
+            )
+        return job
+
+    def _catch_up_missed_run(
+        self,
+        job: schedule.Job,
+        job_id: str,
+        last_run: datetime,
+        misfire_policy: MisfirePolicy,
+        misfire_grace: timedelta,
+        at_shift: timedelta = timedelta(),
+    ):
+        missed_slot = self._get_missed_slot(job, last_run, at_shift)
+        if missed_slot is None:
+            return
+        if (
+            misfire_policy == MisfirePolicy.RUN_ONCE
+            and datetime.now() - missed_slot > misfire_grace
+        ):
+            logger.info(f"Not catching up {job_id}, missed run {missed_slot} is stale")
+            return
+        logger.info(f"Catching up {job_id}, missed run {missed_slot}")
+        job.next_run = datetime.now()
+
+    @staticmethod
+    def _get_missed_slot(
+        job: schedule.Job, last_run: datetime, at_shift: timedelta = timedelta()
+    ) -> Optional[datetime]:
+        """
+        Returns the latest run time missed since last_run, if any.
+        last_run is unshifted, so it is compared to the unshifted slot.
+        """
+        period = timedelta(**{job.unit: job.interval})
+        now = datetime.now()
+        if job.at_time is not None:
+            # freshly scheduled job, previous run slot is one period before next one
+            latest_slot = job.next_run - period
+            if last_run < latest_slot - at_shift and latest_slot <= now:
+                return latest_slot
+            return None
+        if last_run + period > now:
+            return None
+        return last_run + (now - last_run) // period * period
+
+    @staticmethod
+    def _make_schedule_key(job_id: str, schedule_dict: dict) -> str:
+        return f"{job_id} every {schedule_dict[EVERY]} at {schedule_dict.get(AT)}"
+
+    def _get_job_last_runs(self) -> Dict[str, datetime]:
+        if self.app_context is None:
+            return {}
+        try:
+            return self.app_context.db_client.get_job_last_runs()
+        except Exception as e:
+            logger.error(f"Failed to get last job runs: {e}")
+            return {}
+
+    def _save_job_last_run(self, schedule_key: str, run_slot: datetime):
+        if self.app_context is None:
+            return
+        self.app_context.db_client.set_job_last_run(schedule_key, run_slot)
 
     @staticmethod
     def list_jobs() -> List[str]:
         return [html.escape(str(job)) for job in schedule.jobs]
 
     def reschedule_jobs(self):
-        logger.info("Clearing all scheduled jobs...")
-        # clear only jobs originating from config
-        schedule.clear(CUSTOM_JOB_TAG)
+        """
+        Applies jobs config changes. Only added, removed or modified schedules
+        are touched, unchanged jobs keep their next run time.
+        """
+        logger.info("Rescheduling changed jobs...")
         self.config = self.config_manager.get_latest_config()
-        self.init_jobs()
+        jobs_config = self.config_manager.get_jobs_config()
+        new_schedules = list(self._iter_schedules(jobs_config))
+        new_schedule_ids = {schedule_id for schedule_id, *_ in new_schedules}
+        for schedule_id in list(self._scheduled_jobs):
+            if schedule_id not in new_schedule_ids:
+                logger.info(f"Removing job schedule {schedule_id}")
+                schedule.cancel_job(self._scheduled_jobs.pop(schedule_id))
+        added_schedules = [
+            schedule_item
+            for schedule_item in new_schedules
+            if schedule_item[0] not in self._scheduled_jobs
+        ]
+        self._add_jobs(jobs_config, added_schedules)
+        logger.info(
+            f"Finished rescheduling jobs: {len(added_schedules)} added or modified, "
+            f"{len(self._scheduled_jobs) - len(added_schedules)} kept"
+        )
 
     def stop_running(self):
         """Set a stopping event so we can finish last job gracefully"""
@@ -0,0 +1,382 @@
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sheetfu.parsers import CellParsers
+
+from ..consts import SHEETS_MAX_CONCURRENT_READS
+
+logger = logging.getLogger(__name__)
+
+# (spreadsheet key, tab name), None name stands for the first tab
+SheetTab = Tuple[str, Optional[str]]
+
+
+class SheetItem:
+    """
+    Read-only row, a lightweight replacement of sheetfu Item.
+    """
+
+    def __init__(self, header: List[str], index: Dict[str, int], values: List[Any]):
+        self.header = header
+        self.values = values
+        self._index = index
+
+    def get_index(self, field_name: str) -> int:
+        try:
+            return self._index[field_name]
+        except KeyError:
+            # same as sheetfu, which looks the field up in a list
+            raise ValueError(f"{field_name!r} is not in header")
+
+    def get_field_value(self, target_field: str) -> Any:
+        return self.values[self.get_index(target_field)]
+
+
+class SheetValues:
+    """
+    Read-only table, a lightweight replacement of sheetfu Table.
+    Cells are parsed the same way: empty cells are "", dates are serial numbers.
+    """
+
+    def __init__(self, rows: List[List[Any]]):
+        width = max((len(row) for row in rows), default=0)
+        rows = [row + [""] * (width - len(row)) for row in rows]
+        self.header = rows[0] if rows else []
+        index = self._make_index(self.header)
+        self.items = [SheetItem(self.header, index, row) for row in rows[1:]]
+        # revision of the spreadsheet the values were read at, if known
+        self.revision: Optional[str] = None
+
+    def __len__(self):
+        return len(self.items)
+
+    @staticmethod
+    def _make_index(header: List[Any]) -> Dict[Any, int]:
+        index = {}
+        for i, field_name in enumerate(header):
+            # duplicate columns resolve to the first one, as in sheetfu
+            index.setdefault(field_name, i)
+        return index
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __getitem__(self, index):
+        return self.items[index]
+
+
+class SheetRowItem(SheetItem):
+    """
+    Row which remembers its position, so that changed cells can be written back.
+    """
+
+    def __init__(
+        self,
+        header: List[str],
+        index: Dict[str, int],
+        values: List[Any],
+        table: "SheetRows",
+        row_number: int,
+    ):
+        super().__init__(header, index, values)
+        self.table = table
+        self.row_number = row_number
+
+    def set_field_value(self, target_field: str, value: Any):
+        column_index = self.get_index(target_field)
+        self.values[column_index] = value
+        self.table.changes[(self.row_number, column_index)] = value
+
+
+class SheetRows(SheetValues):
+    """
+    Some consecutive rows of a tab with its header.
+    Changes are kept until sent with GoogleSheetsClient.commit_tables.
+    """
+
+    def __init__(
+        self,
+        sheet_key: str,
+        sheet_id: int,
+        header: List[Any],
+        rows: List[List[Any]],
+        first_row: int,
+    ):
+        super().__init__([header])
+        self.sheet_key = sheet_key
+        self.sheet_id = sheet_id
+        self.first_row = first_row
+        # (row number, column index) -> new value
+        self.changes: Dict[Tuple[int, int], Any] = {}
+        width = len(self.header)
+        index = self._make_index(self.header)
+        self.items = [
+            SheetRowItem(
+                self.header,
+                index,
+                (row + [""] * (width - len(row)))[:width],
+                self,
+                first_row + i,
+            )
+            for i, row in enumerate(rows)
+        ]
+
+    @property
+    def last_row(self) -> int:
+        """
+        Number of the last row read, or the one above the first row if none.
+        """
+        return self.first_row + len(self.items) - 1
+
+    @property
+    def batches(self) -> List[dict]:
+        """
+        Changes as batchUpdate requests, same as sheetfu Table.batches.
+        """
+        return [
+            {
+                "updateCells": {
+                    "range": {
+                        "sheetId": self.sheet_id,
+                        "startRowIndex": row_number - 1,
+                        "endRowIndex": row_number,
+                        "startColumnIndex": column_index,
+                        "endColumnIndex": column_index + 1,
+                    },
+                    "fields": "userEnteredValue",
+                    "rows": [{"values": [CellParsers.set_value(value)]}],
+                }
+            }
+            for (row_number, column_index), value in self.changes.items()
+        ]
+
+
+class BatchSheetsReader:
+    """
+    Reads tabs with spreadsheets.values.batchGet:
+    all requested tabs of a spreadsheet take one request
+    (plus one if the first tab is requested without a name
+    and one if some tabs are projected to a few columns),
+    and different spreadsheets are read concurrently.
+    """
+
+    def __init__(
+        self,
+        sheet_service,
+        make_http: Callable = None,
+        max_workers: int = SHEETS_MAX_CONCURRENT_READS,
+    ):
+        self._sheet_service = sheet_service
+        # httplib2 connections can't be shared between threads
+        self._make_http = make_http
+        self.max_workers = max_workers
+
+    def read(
+        self,
+        sheet_key: str,
+        sheet_names: List[Optional[str]],
+        columns: Dict[Optional[str], Sequence[str]] = None,
+    ) -> Dict[Optional[str], SheetValues]:
+        """
+        Tabs listed in columns are projected: only the named columns are
+        downloaded, which takes one more request to read their headers.
+        """
+        columns = columns or {}
+        titles = {
+            name: self._get_first_sheet_title(sheet_key) if name is None else name
+            for name in sheet_names
+        }
+        projected_names = [name for name in sheet_names if columns.get(name)]
+        # tab name -> indexes of its projected columns
+        column_indexes = {}
+        if projected_names:
+            headers = self._batch_get(
+                sheet_key,
+                [self._quote(titles[name]) + "!1:1" for name in projected_names],
+            )
+            for name, header_rows in zip(projected_names, headers):
+                header = header_rows[0] if header_rows else []
+                column_indexes[name] = self._get_column_indexes(header, columns[name])
+
+        ranges = []
+        for name in sheet_names:
+            if name in column_indexes:
+                ranges += [
+                    f"{self._quote(titles[name])}!{letter}:{letter}"
+                    for letter in map(self._column_letter, column_indexes[name])
+                ]
+            else:
+                ranges.append(self._quote(titles[name]))
+        value_ranges = iter(self._batch_get(sheet_key, ranges))
+
+        result = {}
+        for name in sheet_names:
+            if name not in column_indexes:
+                result[name] = SheetValues(next(value_ranges))
+                continue
+            column_values = [
+                [row[0] if row else "" for row in next(value_ranges)]
+                for _ in column_indexes[name]
+            ]
+            num_rows = max(map(len, column_values), default=0)
+            result[name] = SheetValues(
+                [
+                    [
+                        values[row] if row < len(values) else ""
+                        for values in column_values
+                    ]
+                    for row in range(num_rows)
+                ]
+            )
+        return result
+
+    def read_many(
+        self,
+        tabs: Iterable[SheetTab],
+        read: Callable[..., Dict] = None,
+        columns: Dict[SheetTab, Sequence[str]] = None,
+    ) -> Dict[SheetTab, SheetValues]:
+        """
+        Reads tabs grouped by spreadsheet, calling read once per spreadsheet.
+        Tabs of spreadsheets that failed are missing from the result.
+        """
+        read = read or self.read
+        columns = columns or {}
+        names_by_key = OrderedDict()
+        for sheet_key, sheet_name in tabs:
+            names = names_by_key.setdefault(sheet_key, [])
+            if sheet_name not in names:
+                names.append(sheet_name)
+        if not names_by_key:
+            return {}
+
+        result = {}
+        with ThreadPoolExecutor(
+            max_workers=min(self.max_workers, len(names_by_key)),
+            thread_name_prefix="sheets-reader",
+        ) as executor:
+            futures = {
+                sheet_key: executor.submit(
+                    read,
+                    sheet_key,
+                    names,
+                    {
+                        name: columns[(sheet_key, name)]
+                        for name in names
+                        if (sheet_key, name) in columns
+                    },
+                )
+                for sheet_key, names in names_by_key.items()
+            }
+            for sheet_key, future in futures.items():
+                try:
+                    values_by_name = future.result()
+                except Exception as e:
+                    logger.error(f"Failed to read sheet {sheet_key}: {e}")
+                    continue
+                for sheet_name, values in values_by_name.items():
+                    result[(sheet_key, sheet_name)] = values
+        return result
+
+    def _batch_get(self, sheet_key: str, ranges: List[str]) -> List[List[List[Any]]]:
+        if not ranges:
+            return []
+        response = self._execute(
+            self._sheet_service.spreadsheets()
+            .values()
+            .batchGet(
+                spreadsheetId=sheet_key,
+                ranges=ranges,
+                valueRenderOption="UNFORMATTED_VALUE",
+                dateTimeRenderOption="SERIAL_NUMBER",
+            )
+        )
+        return [
+            value_range.get("values", []) for value_range in response["valueRanges"]
+        ]
+
+    def read_rows(
+        self, sheet_key: str, sheet_name: Optional[str], first_row: int
+    ) -> "SheetRows":
+        """
+        Reads the header and the rows starting from first_row (counting from 1),
+        so that the cost doesn't depend on the rows above.
+        """
+        properties = self._get_sheet_properties(sheet_key, sheet_name)
+        title = self._quote(properties["title"])
+        grid = properties.get("gridProperties", {})
+        row_count = grid.get("rowCount", first_row)
+        ranges = [f"{title}!1:1"]
+        first_row = max(first_row, 2)
+        if first_row <= row_count:
+            last_column = self._column_letter(grid.get("columnCount", 1) - 1)
+            ranges.append(f"{title}!A{first_row}:{last_column}{row_count}")
+        value_ranges = self._batch_get(sheet_key, ranges) + [[]]
+        header_rows, rows = value_ranges[:2]
+        return SheetRows(
+            sheet_key,
+            properties.get("sheetId", 0),
+            header_rows[0] if header_rows else [],
+            rows,
+            first_row,
+        )
+
+    def _get_first_sheet_title(self, sheet_key: str) -> str:
+        return self._get_sheet_properties(sheet_key)["title"]
+
+    def _get_sheet_properties(
+        self, sheet_key: str, sheet_name: Optional[str] = None
+    ) -> dict:
+        """
+        Properties of the named tab, or of the tab with id 0,
+        the one sheetfu opens by default.
+        """
+        response = self._execute(
+            self._sheet_service.spreadsheets().get(
+                spreadsheetId=sheet_key,
+                fields="sheets.properties(sheetId,title,gridProperties)",
+            )
+        )
+        sheets = [sheet["properties"] for sheet in response["sheets"]]
+        if sheet_name is not None:
+            return next(sheet for sheet in sheets if sheet["title"] == sheet_name)
+        return next(
+            (sheet for sheet in sheets if sheet.get("sheetId", 0) == 0), sheets[0]
+        )
+
+    def _execute(self, request) -> dict:
+        if self._make_http is None:
+            return request.execute()
+        return request.execute(http=self._make_http())
+
+    @staticmethod
+    def _get_column_indexes(header: List[Any], field_names: Sequence[str]) -> List[int]:
+        """
+        Indexes of the named columns in sheet order, unknown names are skipped
+        and fail on access, as in a full table.
+        """
+        indexes = {}
+        for i, field_name in enumerate(header):
+            indexes.setdefault(field_name, i)
+        return sorted({indexes[name] for name in field_names if name in indexes})
+
+    @staticmethod
+    def _column_letter(index: int) -> str:
+        """
+        0 -> A, 25 -> Z, 26 -> AA
+        """
+        letters = ""
+        index += 1
+        while index:
+            index, remainder = divmod(index - 1, 26)
+            letters = chr(ord("A") + remainder) + letters
+        return letters
+
+    @staticmethod
+    def _quote(sheet_name: str) -> str:
+        """
+        Whole tab in A1 notation.
+        """
+        return "'{}'".format(sheet_name.replace("'", "''"))
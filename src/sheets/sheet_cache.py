@@ -0,0 +1,78 @@
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class SheetCache:
+    """
+    Keeps fetched sheet tabs in memory together with the revision
+    of the spreadsheet they were read at (Drive modifiedTime).
+    A tab is downloaded again only once the spreadsheet has changed,
+    checking the revision is a single cheap metadata request.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (sheet key, tab name or any other tab id) -> (revision, value)
+        self._entries: Dict[Hashable, Tuple[str, Any]] = {}
+
+    def get_or_fetch(
+        self,
+        sheet_key: str,
+        sheet_name: Hashable,
+        revision: Optional[str],
+        fetch: Callable[[], Any],
+    ) -> Any:
+        """
+        Returns cached value if it was read at the given revision,
+        otherwise calls fetch and caches the result.
+        Unknown revision (None) always means fetching.
+        """
+        return self.get_or_fetch_many(
+            sheet_key, [sheet_name], revision, lambda _: {sheet_name: fetch()}
+        )[sheet_name]
+
+    def get_or_fetch_many(
+        self,
+        sheet_key: str,
+        sheet_names: List[Hashable],
+        revision: Optional[str],
+        fetch: Callable[[List[Hashable]], Dict[Hashable, Any]],
+    ) -> Dict[Hashable, Any]:
+        """
+        Same for several tabs of one spreadsheet,
+        fetch is called once with the names of tabs missing from cache.
+        """
+        result = {}
+        with self._lock:
+            for sheet_name in sheet_names:
+                entry = self._entries.get((sheet_key, sheet_name))
+                if revision is not None and entry is not None and entry[0] == revision:
+                    result[sheet_name] = entry[1]
+        if result:
+            logger.debug(f"Serving {list(result)} of {sheet_key} from cache")
+        missing_names = [name for name in sheet_names if name not in result]
+        if not missing_names:
+            return result
+        fetched = fetch(missing_names)
+        with self._lock:
+            for sheet_name, value in fetched.items():
+                if revision is None:
+                    self._entries.pop((sheet_key, sheet_name), None)
+                else:
+                    self._entries[(sheet_key, sheet_name)] = (revision, value)
+        result.update(fetched)
+        return result
+
+    def invalidate(self, sheet_key: str = None):
+        """
+        Drops cached tabs of the given spreadsheet or all of them.
+        """
+        with self._lock:
+            if sheet_key is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[0] == sheet_key]:
+                del self._entries[key]
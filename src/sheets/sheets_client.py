@@ -1,13 +1,23 @@
 import logging
+from collections import OrderedDict
 from pprint import pprint
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Sequence, Set, Union
 
+from httplib2 import Http
+from oauth2client.service_account import ServiceAccountCredentials
 from sheetfu import SpreadsheetApp, Table
 from sheetfu.model import Sheet
 
 from ..utils.singleton import Singleton
+from .batch_reader import BatchSheetsReader, SheetRows, SheetTab, SheetValues
+from .sheet_cache import SheetCache
+from .utils import find_trello_urls, normalize_trello_url
 
 logger = logging.getLogger(__name__)
+SCOPES = [
+    "https://www.googleapis.com/auth/drive",
+    "https://www.googleapis.com/auth/spreadsheets",
+]
 
 
 class GoogleSheetsClient(Singleton):
@@ -16,6 +26,7 @@ class GoogleSheetsClient(Singleton):
             return
 
         self._sheets_config = sheets_config
+        self._cache = SheetCache()
         self._update_from_config()
         logger.info("GoogleSheetsClient successfully initialized")
 
@@ -35,54 +46,160 @@ class GoogleSheetsClient(Singleton):
             "rubrics_registry_sheet_key"
         ]
         self.strings_sheet_key = self._sheets_config["strings_sheet_key"]
+        self._cache.invalidate()
         self._authorize()
 
     def _authorize(self):
         self.client = SpreadsheetApp(self._sheets_config["api_key_path"])
+        credentials = ServiceAccountCredentials.from_json_keyfile_name(
+            self._sheets_config["api_key_path"], scopes=SCOPES
+        )
+        self._make_http = lambda: credentials.authorize(Http())
+        self._batch_reader = BatchSheetsReader(
+            self.client.sheet_service, make_http=self._make_http
+        )
+
+    @property
+    def authors_tab(self) -> SheetTab:
+        return self.authors_sheet_key, "Кураторы и контакты"
+
+    @property
+    def curators_tab(self) -> SheetTab:
+        return self.curators_sheet_key, None
+
+    @property
+    def rubrics_tab(self) -> SheetTab:
+        return self.rubrics_registry_sheet_key, None
+
+    @property
+    def strings_tab(self) -> SheetTab:
+        return self.strings_sheet_key, None
+
+    @property
+    def hr_team_tab(self) -> SheetTab:
+        return self.hr_sheet_key, "Команда (с заморозкой)"
 
-    def fetch_authors(self) -> Table:
-        return self._fetch_table(self.authors_sheet_key, "Кураторы и контакты")
+    @property
+    def hr_forms_raw_tab(self) -> SheetTab:
+        return self.hr_sheet_key, "Ответы на форму"
 
-    def fetch_curators(self) -> Table:
-        return self._fetch_table(self.curators_sheet_key)
+    @property
+    def hr_pt_forms_raw_tab(self) -> SheetTab:
+        return self.hr_pt_sheet_key, "Ответы Главный сайт"
 
-    def fetch_rubrics(self) -> Table:
-        return self._fetch_table(self.rubrics_registry_sheet_key)
+    @property
+    def posts_registry_tab(self) -> SheetTab:
+        return self.post_registry_sheet_key, None
 
-    def fetch_strings(self) -> Table:
-        return self._fetch_table(self.strings_sheet_key)
+    def fetch_authors(self, columns: Sequence[str] = None) -> SheetValues:
+        return self._read_table(*self.authors_tab, columns=columns)
 
-    def fetch_hr_forms_raw(self) -> Table:
-        return self._fetch_table(self.hr_sheet_key, "Ответы на форму")
+    def fetch_curators(self) -> SheetValues:
+        return self._read_table(*self.curators_tab)
 
-    def fetch_hr_forms_processed(self) -> Table:
+    def fetch_rubrics(self) -> SheetValues:
+        return self._read_table(*self.rubrics_tab)
+
+    def fetch_strings(self) -> SheetValues:
+        return self._read_table(*self.strings_tab)
+
+    def fetch_hr_forms_raw(self, after_row: int = 1) -> SheetRows:
+        """
+        Form answers below the given row, new ones are appended to the bottom.
+        """
+        return self._batch_reader.read_rows(*self.hr_forms_raw_tab, after_row + 1)
+
+    def fetch_hr_forms_processed(
+        self, cached: bool = False, columns: Sequence[str] = None
+    ) -> Union[Table, SheetValues]:
+        """
+        Use cached=True only for reading, cached tables are read-only.
+        Columns projection applies to cached tables only.
+        """
+        if cached:
+            return self._read_table(self.hr_sheet_key, "Анкеты", columns=columns)
         return self._fetch_table(self.hr_sheet_key, "Анкеты")
 
-    def fetch_hr_pt_forms_raw(self) -> Table:
-        return self._fetch_table(self.hr_pt_sheet_key, "Ответы Главный сайт")
+    def fetch_hr_pt_forms_raw(self, after_row: int = 1) -> SheetRows:
+        return self._batch_reader.read_rows(*self.hr_pt_forms_raw_tab, after_row + 1)
 
     def fetch_hr_pt_forms_processed(self) -> Table:
         return self._fetch_table(self.hr_pt_sheet_key, "Анкеты")
 
-    def fetch_hr_team(self) -> Table:
-        return self._fetch_table(self.hr_sheet_key, "Команда (с заморозкой)")
+    def fetch_hr_team(self) -> SheetValues:
+        return self._read_table(*self.hr_team_tab)
+
+    def fetch_posts_registry(self, columns: Sequence[str] = None) -> SheetValues:
+        return self._read_table(*self.posts_registry_tab, columns=columns)
+
+    def fetch_tables(
+        self,
+        tabs: List[SheetTab],
+        columns: Dict[SheetTab, Sequence[str]] = None,
+    ) -> Dict[SheetTab, SheetValues]:
+        """
+        Reads several read-only tables at once, which takes a request
+        per spreadsheet, and spreadsheets are read in parallel.
+        Tables with columns given contain only those columns.
+        Tables which failed to download are missing from the result.
+        """
+        return self._batch_reader.read_many(
+            tabs, read=self._read_tables, columns=columns
+        )
+
+    def fetch_columns(self, tab: SheetTab, columns: Sequence[str]) -> SheetValues:
+        """
+        Read-only table with only the named columns, found by header.
+        Missing columns fail on access, as in a full table.
+        """
+        return self._read_table(*tab, columns=columns)
 
-    def fetch_posts_registry(self) -> Table:
-        return self._fetch_table(self.post_registry_sheet_key)
+    def commit_tables(self, *tables: Union[Table, SheetRows]):
+        """
+        Writes pending changes of several tables with one batchUpdate
+        per spreadsheet, instead of one per table.
+        Repeated writes to the same cells are squashed into the last one.
+        """
+        requests_by_spreadsheet = OrderedDict()
+        for table in tables:
+            if isinstance(table, SheetRows):
+                spreadsheet_id = table.sheet_key
+            else:
+                spreadsheet_id = table.full_range.sheet.spreadsheet.id
+            requests_by_spreadsheet.setdefault(spreadsheet_id, []).extend(table.batches)
+        for spreadsheet_id, requests in requests_by_spreadsheet.items():
+            requests = self._squash_requests(requests)
+            if not requests:
+                continue
+            self.client.sheet_service.spreadsheets().batchUpdate(
+                spreadsheetId=spreadsheet_id, body={"requests": requests}
+            ).execute()
+            logger.info(f"Sent {len(requests)} changes to sheet {spreadsheet_id}")
+            self._cache.invalidate(spreadsheet_id)
+        for table in tables:
+            if isinstance(table, SheetRows):
+                table.changes.clear()
+            else:
+                table.batches = []
 
     def update_posts_registry(self, entries):
         sheet = self._open_by_key(self.post_registry_sheet_key)
-        data = sheet.get_sheet_by_id(0).get_data_range()
-        table = Table(data)
+        table = Table(sheet.get_sheet_by_id(0).get_data_range())
         new_posts = []
         try:
+            # built once and kept up to date, instead of scanning the sheet per entry
+            registry_trello_urls = self._make_trello_url_index(table)
             for entry in entries:
-                if self._has_string(data, entry.trello_url):
+                trello_url = normalize_trello_url(entry.trello_url)
+                if trello_url in registry_trello_urls:
                     logger.info(f"Card {entry.trello_url} already present in registry")
                     continue
                 table.add_one(entry.to_dict())
+                registry_trello_urls.add(trello_url)
                 new_posts.append(entry.title)
+            # all new rows are appended with a single batch update
             table.commit()
+            self._cache.invalidate(self.post_registry_sheet_key)
         except Exception as e:
             logger.error(f"Failed to update post registry: {e}")
         return new_posts
@@ -95,13 +212,105 @@ class GoogleSheetsClient(Singleton):
             else sheet.get_sheet_by_id(0)
         )
 
-    def _has_string(self, data, string: str):
-        return string in str(data.get_values())
+    @staticmethod
+    def _make_trello_url_index(table: Table) -> Set[str]:
+        """
+        Normalized urls of all trello cards mentioned in the table.
+        """
+        return {
+            trello_url
+            for item in table
+            for value in item.values
+            for trello_url in find_trello_urls(value)
+        }
+
+    @staticmethod
+    def _squash_requests(requests: List[dict]) -> List[dict]:
+        """
+        Drops cell updates overwritten later by an update of the same range.
+        The last update keeps its place, so overlapping updates stay ordered.
+        """
+
+        def get_target(request: dict) -> Optional[tuple]:
+            update = request.get("updateCells")
+            if update is None:
+                return None
+            return tuple(sorted(update["range"].items())), update["fields"]
+
+        last_positions = {get_target(request): i for i, request in enumerate(requests)}
+        return [
+            request
+            for i, request in enumerate(requests)
+            if get_target(request) is None or last_positions[get_target(request)] == i
+        ]
 
     def _fetch_table(self, sheet_key: str, sheet_name: Optional[str] = None) -> Table:
         worksheet = self.fetch_sheet(sheet_key, sheet_name)
         return Table(worksheet.get_data_range())
 
+    def _read_table(
+        self,
+        sheet_key: str,
+        sheet_name: Optional[str] = None,
+        columns: Sequence[str] = None,
+    ) -> SheetValues:
+        return self._read_tables(
+            sheet_key, [sheet_name], {sheet_name: columns} if columns else None
+        )[sheet_name]
+
+    def _read_tables(
+        self,
+        sheet_key: str,
+        sheet_names: List[Optional[str]],
+        columns: Dict[Optional[str], Sequence[str]] = None,
+    ) -> Dict[Optional[str], SheetValues]:
+        """
+        Tabs are downloaded only if the spreadsheet has changed
+        since the previous read, otherwise they are served from cache.
+        """
+        columns = columns or {}
+        # projections of the same tab are cached separately
+        cache_keys = {
+            name: (name, tuple(columns.get(name) or ())) for name in sheet_names
+        }
+
+        revision = self.get_revision(sheet_key)
+
+        def fetch(missing_keys):
+            names = [name for name, _ in missing_keys]
+            values = self._batch_reader.read(
+                sheet_key,
+                names,
+                {name: columns[name] for name in names if name in columns},
+            )
+            for name in names:
+                values[name].revision = revision
+            return {cache_keys[name]: values[name] for name in names}
+
+        cached = self._cache.get_or_fetch_many(
+            sheet_key, list(cache_keys.values()), revision, fetch
+        )
+        return {name: cached[cache_key] for name, cache_key in cache_keys.items()}
+
+    def get_revision(self, sheet_key: str) -> Optional[str]:
+        """
+        Drive modifiedTime of the spreadsheet, changes on every edit.
+        Returns None if unknown, so that the sheet is fetched anyway.
+        """
+        drive_service = getattr(self.client, "drive_service", None)
+        if drive_service is None:
+            return None
+        try:
+            return (
+                drive_service.files()
+                .get(fileId=sheet_key, fields="modifiedTime")
+                .execute(http=self._make_http())
+                .get("modifiedTime")
+            )
+        except Exception as e:
+            logger.warning(f"Failed to get revision of sheet {sheet_key}: {e}")
+            return None
+
     def _open_by_key(self, sheet_key: str):
         try:
             return self.client.open_by_id(sheet_key)
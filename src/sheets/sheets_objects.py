@@ -197,13 +197,21 @@ class SheetsItem:
 
     def __setattr__(self, name, value):
         if name in self.field_alias:
-            return self.item.set_field_value(
-                load(self.field_alias[name]),
-                value,
-            )
+            field_name = load(self.field_alias[name])
+            # only changed cells are sent to the sheet
+            if self.item.get_field_value(field_name) == value:
+                return None
+            return self.item.set_field_value(field_name, value)
         else:
             return super().__setattr__(name, value)
 
+    @classmethod
+    def get_columns(cls) -> List[str]:
+        """
+        Sheet columns behind field_alias, for reading only those.
+        """
+        return [load(alias) for alias in cls.field_alias.values()]
+
     @classmethod
     def add_one_to_table(cls, table: Table, item_dict_alias: dict) -> Item:
         """
@@ -1,9 +1,30 @@
+import re
 from datetime import datetime
+from typing import List
 
 TIME_FORMAT = "%d.%m.%Y %H:%M:%S"
+TRELLO_CARD_URL_RE = re.compile(r"trello\.com/c/([A-Za-z0-9]+)")
 
 
 def convert_excel_datetime_to_string(excel_datetime: float) -> str:
     # https://stackoverflow.com/questions/981655/how-to-represent-a-datetime-in-excel
     seconds = (excel_datetime - 25569) * 86400.0
     return datetime.utcfromtimestamp(seconds).strftime(TIME_FORMAT)
+
+
+def normalize_trello_url(url: str) -> str:
+    """
+    Returns card short link, e.g. "AbCd1234" for https://trello.com/c/AbCd1234/1-name,
+    so that urls of the same card with different name slug match.
+    """
+    match = TRELLO_CARD_URL_RE.search(url)
+    return match.group(1) if match else url.strip().lower().rstrip("/")
+
+
+def find_trello_urls(value) -> List[str]:
+    """
+    Returns normalized urls of trello cards mentioned in a cell value.
+    """
+    if not isinstance(value, str):
+        return []
+    return TRELLO_CARD_URL_RE.findall(value)
@@ -1,6 +1,6 @@
 import logging
 from collections import defaultdict
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 from sqlalchemy import Column, String, create_engine
 from sqlalchemy.ext.declarative import declarative_base
@@ -47,6 +47,8 @@ class StringsDBClient(Singleton):
         session_factory = sessionmaker(bind=self.engine)
         self.Session = scoped_session(session_factory)
         Base.metadata.create_all(self.engine)
+        # revision of the spreadsheet the strings were fetched from
+        self._sheet_revision: Optional[str] = None
 
     def fetch_strings_sheet(self, sheets_client: GoogleSheetsClient):
         session = self.Session()
@@ -75,8 +77,16 @@ class StringsDBClient(Singleton):
             logger.warning(f"Failed to update string table from sheet: {e}")
             session.rollback()
             return 0
+        self._sheet_revision = strings.revision
         return len(strings)
 
+    def get_sheet_revision(self) -> Optional[str]:
+        """
+        Revision of the spreadsheet strings were last fetched from,
+        None if unknown.
+        """
+        return self._sheet_revision
+
     def get_string(self, string_id: str) -> str:
         session = self.Session()
         message = session.query(DBString).filter(DBString.id == string_id).first()
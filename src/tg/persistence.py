@@ -0,0 +1,147 @@
+"""Keeps telegram bot state in the bot DB"""
+
+import json
+import logging
+import os
+import pickle
+import threading
+from collections import defaultdict
+from typing import Any, DefaultDict, Dict, Hashable, Tuple
+
+from telegram.ext import BasePersistence
+
+from ..consts import PERSISTENCE_FLUSH_INTERVAL_SEC
+from ..db.db_client import DBClient
+
+logger = logging.getLogger(__name__)
+
+USER_DATA = "user_data"
+CHAT_DATA = "chat_data"
+BOT_DATA = "bot_data"
+CONVERSATION_PREFIX = "conversation:"
+
+
+class DBPersistence(BasePersistence):
+    """
+    Stores user, chat and bot data and conversation states in the DB,
+    one record per user or chat, instead of rewriting a whole pickle file.
+    Changed records are buffered and written by a background thread,
+    so that handlers don't wait for the disk.
+    """
+
+    def __init__(
+        self,
+        db_client: DBClient,
+        legacy_pickle_filename: str = None,
+        flush_interval_sec: float = PERSISTENCE_FLUSH_INTERVAL_SEC,
+    ):
+        super().__init__(
+            store_user_data=True, store_chat_data=True, store_bot_data=True
+        )
+        self._db_client = db_client
+        self.flush_interval_sec = flush_interval_sec
+        self._lock = threading.Lock()
+        # (kind, key) -> last pickled data, to skip writing unchanged records
+        self._payloads: Dict[Tuple[str, str], bytes] = db_client.get_telegram_data()
+        # (kind, key) -> pickled data not written yet
+        self._pending: Dict[Tuple[str, str], bytes] = {}
+        if not self._payloads and legacy_pickle_filename:
+            self._import_pickle(legacy_pickle_filename)
+        self._stop_event = threading.Event()
+        self._writer = threading.Thread(
+            target=self._write_forever, name="tg-persistence", daemon=True
+        )
+        self._writer.start()
+
+    def get_user_data(self) -> DefaultDict[int, dict]:
+        return defaultdict(dict, self._load(USER_DATA, int))
+
+    def get_chat_data(self) -> DefaultDict[int, dict]:
+        return defaultdict(dict, self._load(CHAT_DATA, int))
+
+    def get_bot_data(self) -> dict:
+        return self._load(BOT_DATA, str).get("", {})
+
+    def get_conversations(self, name: str) -> Dict[Tuple, Any]:
+        conversations = self._load(
+            CONVERSATION_PREFIX + name, lambda key: tuple(json.loads(key))
+        )
+        return {key: state for key, state in conversations.items() if state is not None}
+
+    def update_user_data(self, user_id: int, data: dict):
+        self._stage(USER_DATA, str(user_id), data)
+
+    def update_chat_data(self, chat_id: int, data: dict):
+        self._stage(CHAT_DATA, str(chat_id), data)
+
+    def update_bot_data(self, data: dict):
+        self._stage(BOT_DATA, "", data)
+
+    def update_conversation(self, name: str, key: Tuple, new_state: Any):
+        self._stage(CONVERSATION_PREFIX + name, json.dumps(list(key)), new_state)
+
+    def flush(self):
+        """
+        Called by Updater on shutdown.
+        """
+        self._stop_event.set()
+        self._write_pending()
+
+    def _load(self, kind: str, parse_key) -> Dict[Hashable, Any]:
+        with self._lock:
+            return {
+                parse_key(key): pickle.loads(payload)
+                for (payload_kind, key), payload in self._payloads.items()
+                if payload_kind == kind
+            }
+
+    def _stage(self, kind: str, key: str, data: Any):
+        # pickled right away, handlers may keep changing data from other threads
+        payload = pickle.dumps(data)
+        with self._lock:
+            if self._payloads.get((kind, key)) == payload:
+                return
+            self._payloads[(kind, key)] = payload
+            self._pending[(kind, key)] = payload
+
+    def _write_forever(self):
+        while not self._stop_event.wait(self.flush_interval_sec):
+            self._write_pending()
+
+    def _write_pending(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        try:
+            self._db_client.set_telegram_data(pending)
+        except Exception as e:
+            logger.error(f"Failed to save {len(pending)} telegram data records: {e}")
+            with self._lock:
+                # retry next time, unless there is a newer version already
+                for record_key, payload in pending.items():
+                    self._pending.setdefault(record_key, payload)
+
+    def _import_pickle(self, filename: str):
+        """
+        Moves state from PicklePersistence file used before.
+        """
+        if not os.path.exists(filename):
+            return
+        try:
+            with open(filename, "rb") as f:
+                data = pickle.load(f)
+        except Exception as e:
+            logger.error(f"Could not import {filename}: {e}")
+            return
+        for user_id, user_data in data.get(USER_DATA, {}).items():
+            self.update_user_data(user_id, user_data)
+        for chat_id, chat_data in data.get(CHAT_DATA, {}).items():
+            self.update_chat_data(chat_id, chat_data)
+        if data.get(BOT_DATA):
+            self.update_bot_data(data[BOT_DATA])
+        for name, conversations in data.get("conversations", {}).items():
+            for key, state in conversations.items():
+                self.update_conversation(name, key, state)
+        self._write_pending()
+        logger.info(f"Imported telegram data from {filename}")
@@ -0,0 +1,245 @@
+"""Outbound message queue respecting Telegram rate limits"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+import telegram
+
+from ..consts import (
+    SEND_QUEUE_CHAT_BURST,
+    SEND_QUEUE_CHAT_MESSAGES_PER_SEC,
+    SEND_QUEUE_GLOBAL_MESSAGES_PER_SEC,
+    SEND_QUEUE_GROUP_MESSAGES_PER_MIN,
+    SEND_QUEUE_MAX_RETRIES,
+)
+
+logger = logging.getLogger(__name__)
+
+# buckets of idle chats are dropped once there are more than that
+MAX_IDLE_BUCKETS = 1000
+WAIT_EMPTY_POLL_SEC = 0.1
+
+
+class TokenBucket:
+    """
+    Allows up to `capacity` actions at once, refilling at `rate` per second.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_ts = time.monotonic()
+        self._blocked_until_ts = 0.0
+
+    def ready_at(self, now: float) -> float:
+        """
+        Returns monotonic time when the next action is allowed.
+        """
+        self._refill(now)
+        ready_ts = now
+        if self._tokens < 1:
+            ready_ts = now + (1 - self._tokens) / self.rate
+        return max(ready_ts, self._blocked_until_ts)
+
+    def consume(self, now: float):
+        self._refill(now)
+        self._tokens -= 1
+
+    def block_until(self, ts: float):
+        """
+        E.g. when Telegram asks to retry after some time.
+        """
+        self._blocked_until_ts = max(self._blocked_until_ts, ts)
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self._tokens >= self.capacity and now >= self._blocked_until_ts
+
+    def _refill(self, now: float):
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated_ts) * self.rate
+        )
+        self._updated_ts = now
+
+
+class SendQueue:
+    """
+    Sends messages from a background thread, so that callers only enqueue them.
+    Keeps per-chat order, enforces per-chat and global rate limits
+    and retries requests Telegram asked to repeat later (RetryAfter).
+    """
+
+    def __init__(
+        self,
+        global_messages_per_sec: float = SEND_QUEUE_GLOBAL_MESSAGES_PER_SEC,
+        chat_messages_per_sec: float = SEND_QUEUE_CHAT_MESSAGES_PER_SEC,
+        group_messages_per_min: float = SEND_QUEUE_GROUP_MESSAGES_PER_MIN,
+        chat_burst: int = SEND_QUEUE_CHAT_BURST,
+        max_retries: int = SEND_QUEUE_MAX_RETRIES,
+    ):
+        self._cond = threading.Condition()
+        # chat_id -> pending (send function, future, attempt) items.
+        # Ordered to serve chats round-robin.
+        self._chat_queues: Dict[int, Deque[Tuple[Callable, Future, int]]]
+        self._chat_queues = OrderedDict()
+        self._chat_buckets: Dict[int, TokenBucket] = {}
+        self._dispatcher: Optional[threading.Thread] = None
+        self.set_limits(
+            global_messages_per_sec,
+            chat_messages_per_sec,
+            group_messages_per_min,
+            chat_burst,
+            max_retries,
+        )
+
+    def set_limits(
+        self,
+        global_messages_per_sec: float = SEND_QUEUE_GLOBAL_MESSAGES_PER_SEC,
+        chat_messages_per_sec: float = SEND_QUEUE_CHAT_MESSAGES_PER_SEC,
+        group_messages_per_min: float = SEND_QUEUE_GROUP_MESSAGES_PER_MIN,
+        chat_burst: int = SEND_QUEUE_CHAT_BURST,
+        max_retries: int = SEND_QUEUE_MAX_RETRIES,
+    ):
+        with self._cond:
+            self._global_bucket = TokenBucket(
+                global_messages_per_sec, max(1, global_messages_per_sec)
+            )
+            self._chat_messages_per_sec = chat_messages_per_sec
+            self._group_messages_per_sec = group_messages_per_min / 60
+            self._chat_burst = chat_burst
+            self._max_retries = max_retries
+            # new limits apply to new buckets
+            self._chat_buckets.clear()
+            self._cond.notify()
+
+    def enqueue(self, chat_id: int, send: Callable[[], Any]) -> Future:
+        """
+        Schedules send() call for the chat. Returns a future with its result.
+        """
+        future = Future()
+        with self._cond:
+            self._chat_queues.setdefault(chat_id, deque()).append((send, future, 0))
+            self._ensure_dispatcher()
+            self._cond.notify()
+        return future
+
+    def pending_count(self) -> int:
+        with self._cond:
+            return sum(len(items) for items in self._chat_queues.values())
+
+    def wait_empty(self, timeout: float) -> bool:
+        """
+        Waits for queued messages to be picked up, e.g. before exit.
+        Returns whether the queue got empty in time.
+        """
+        deadline = time.monotonic() + timeout
+        while self.pending_count() > 0:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(WAIT_EMPTY_POLL_SEC)
+        return True
+
+    def _ensure_dispatcher(self):
+        # started lazily, so that unused queues don't spawn threads
+        if self._dispatcher is None or not self._dispatcher.is_alive():
+            self._dispatcher = threading.Thread(
+                target=self._dispatch_forever, name="tg-send-queue", daemon=True
+            )
+            self._dispatcher.start()
+
+    def _dispatch_forever(self):
+        while True:
+            chat_id, send, future, attempt = self._next_item()
+            # retried items are running already
+            if attempt == 0 and not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = send()
+            except telegram.error.RetryAfter as e:
+                if attempt >= self._max_retries:
+                    logger.error(
+                        f"Giving up sending to {chat_id} after {attempt} retries"
+                    )
+                    future.set_exception(e)
+                    continue
+                logger.warning(f"Flood control in {chat_id}, retry in {e.retry_after}s")
+                self._retry_later(chat_id, send, future, attempt + 1, e.retry_after)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+    def _next_item(self) -> Tuple[int, Callable, Future, int]:
+        """
+        Blocks until some chat is allowed to send its next message.
+        """
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                wake_ts = None
+                if self._chat_queues:
+                    wake_ts = self._global_bucket.ready_at(now)
+                if wake_ts is not None and wake_ts <= now:
+                    wake_ts = None
+                    for chat_id in self._chat_queues:
+                        chat_ready_ts = self._get_bucket(chat_id).ready_at(now)
+                        if chat_ready_ts <= now:
+                            return self._pop_item(chat_id, now)
+                        wake_ts = min(wake_ts or chat_ready_ts, chat_ready_ts)
+                self._cond.wait(None if wake_ts is None else wake_ts - now)
+
+    def _pop_item(self, chat_id: int, now: float) -> Tuple[int, Callable, Future, int]:
+        self._global_bucket.consume(now)
+        self._get_bucket(chat_id).consume(now)
+        items = self._chat_queues[chat_id]
+        send, future, attempt = items.popleft()
+        # to the end of line, so that a long broadcast doesn't starve other chats
+        if items:
+            self._chat_queues.move_to_end(chat_id)
+        else:
+            del self._chat_queues[chat_id]
+        return chat_id, send, future, attempt
+
+    def _retry_later(
+        self,
+        chat_id: int,
+        send: Callable,
+        future: Future,
+        attempt: int,
+        retry_after: float,
+    ):
+        with self._cond:
+            self._get_bucket(chat_id).block_until(time.monotonic() + retry_after)
+            # keep message order within the chat
+            self._chat_queues.setdefault(chat_id, deque()).appendleft(
+                (send, future, attempt)
+            )
+            self._cond.notify()
+
+    def _get_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) > MAX_IDLE_BUCKETS:
+                self._drop_idle_buckets()
+            # group chats have negative ids and stricter limits
+            rate = (
+                self._group_messages_per_sec
+                if chat_id < 0
+                else self._chat_messages_per_sec
+            )
+            bucket = TokenBucket(rate, self._chat_burst)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    def _drop_idle_buckets(self):
+        now = time.monotonic()
+        for chat_id in list(self._chat_buckets):
+            if chat_id not in self._chat_queues and self._chat_buckets[chat_id].is_full(
+                now
+            ):
+                del self._chat_buckets[chat_id]
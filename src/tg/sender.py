@@ -1,17 +1,63 @@
 """Sends messages"""
 
+import functools
+import hashlib
+import io
 import logging
 import re
 import time
-from typing import Callable, List
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError
+from typing import (
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 
 import telegram
 
-from ..consts import MESSAGE_DELAY_SEC
+from ..consts import (
+    SEND_QUEUE_CHAT_MESSAGES_PER_SEC,
+    SEND_QUEUE_GLOBAL_MESSAGES_PER_SEC,
+    SEND_QUEUE_GROUP_MESSAGES_PER_MIN,
+    TELEGRAM_CHAT_MESSAGES_PER_SEC,
+    TELEGRAM_GLOBAL_MESSAGES_PER_SEC,
+    TELEGRAM_GROUP_MESSAGES_PER_MIN,
+)
 from ..utils.singleton import Singleton
+from .send_queue import SendQueue
 
 logger = logging.getLogger(__name__)
 
+# file path, image bytes or binary buffer, e.g. io.BytesIO
+Photo = Union[str, bytes, BinaryIO]
+MAX_CACHED_PHOTO_FILE_IDS = 100
+# e.g. &#x1F600;
+MAX_HTML_ENTITY_LEN = 10
+# Telegram supports only paired tags, e.g. <b>, <a href="...">, </code>
+HTML_TAG_RE = re.compile(r"<(/?)([a-zA-Z][\w-]*)[^<>]*>")
+
+
+class ImageMessage:
+    """
+    Image payload, can be passed to send(...) functions instead of message text.
+    """
+
+    def __init__(self, photo: Photo, caption: str = None):
+        # read right away, so that the buffer can be reused or closed
+        self.photo = read_photo(photo)
+        self.caption = caption
+
+
+# what send(...) functions accept
+Message = Union[str, ImageMessage]
+
 
 class TelegramSender(Singleton):
     def __init__(
@@ -28,81 +74,239 @@ class TelegramSender(Singleton):
 
         self.bot = bot
         self._tg_config = tg_config
+        self.send_queue = SendQueue()
+        # image content hash -> Telegram file_id of an uploaded photo
+        self._photo_file_ids = OrderedDict()
         self._update_from_config()
         logger.info("TelegramSender successfully initialized")
 
-    def create_reply_send(self, update: telegram.Update) -> Callable[[str], None]:
+    def create_reply_send(self, update: telegram.Update) -> Callable[[Message], None]:
         """
-        Returns a function send(message_text), making reply to user.
+        Returns a function send(message), making reply to user.
+        Message is either a text or an ImageMessage.
         """
         if not isinstance(update, telegram.Update):
             logger.warning(f"Should be telegram.Update, found: {update}")
         return lambda message: self.send_to_chat_id(message, update.message.chat_id)
 
-    def create_chat_ids_send(self, chat_ids: List[int]) -> Callable[[str], None]:
+    def create_reply_status(self, update: telegram.Update) -> Callable[[str], None]:
+        """
+        Returns a function status(message_text), replying to user with
+        a single status message which is edited on consecutive calls.
+        """
+        if not isinstance(update, telegram.Update):
+            logger.warning(f"Should be telegram.Update, found: {update}")
+        return self.create_chat_id_status(update.message.chat_id)
+
+    def create_chat_id_status(self, chat_id: int) -> Callable[[str], None]:
+        """
+        Returns a function status(message_text), sending a message on first call
+        and editing the same message afterwards.
+        """
+        status_message_id = None
+
+        def status(message_text: str):
+            nonlocal status_message_id
+            try:
+                if status_message_id is None:
+                    message = self.bot.send_message(
+                        text=message_text,
+                        chat_id=chat_id,
+                        disable_notification=True,
+                        parse_mode=telegram.ParseMode.HTML,
+                    )
+                    status_message_id = message.message_id
+                else:
+                    self.bot.edit_message_text(
+                        text=message_text,
+                        chat_id=chat_id,
+                        message_id=status_message_id,
+                        parse_mode=telegram.ParseMode.HTML,
+                    )
+            except telegram.TelegramError as e:
+                # e.g. "Message is not modified"
+                logger.warning(f"Could not update status message in {chat_id}: {e}")
+
+        return status
+
+    def create_chat_ids_send(self, chat_ids: List[int]) -> Callable[[Message], None]:
         """
-        Returns a function send(message_text), sending message to all chat_ids.
+        Returns a function send(message), sending message to all chat_ids.
+        Message is either a text or an ImageMessage.
         """
         if isinstance(chat_ids, int):
             chat_ids = [chat_ids]
         return lambda message: self.send_to_chat_ids(message, chat_ids)
 
-    def send_to_chat_ids(self, message_text: str, chat_ids: List[int]):
+    def send_to_chat_ids(self, message_text: Message, chat_ids: List[int]):
         """
         Sends a message to list of chat ids.
         """
         for chat_id in chat_ids:
             self.send_to_chat_id(message_text, chat_id)
 
-    def send_to_chat_id(self, message_text: str, chat_id: int, **kwargs) -> bool:
+    def fan_out(
+        self, chat_paragraphs: Dict[int, List[str]], timeout: float = None
+    ) -> Dict[int, bool]:
         """
-        Sends a message to a single chat_id.
+        Sends paragraphs to each of the chats. Chats are served concurrently
+        by the send queue within its global rate limit.
+        Returns delivery report: chat_id -> whether all messages were delivered.
         """
-        if ".png" in message_text:
-            for pict in re.findall(r"\S*\.png", message_text):
+        chat_futures = {
+            chat_id: [
+                future
+                for message in paragraphs_to_messages(paragraphs)
+                for future in self._enqueue_to_chat_id(message, chat_id)
+            ]
+            for chat_id, paragraphs in chat_paragraphs.items()
+        }
+        deadline = None if timeout is None else time.monotonic() + timeout
+        report = {}
+        for chat_id, futures in chat_futures.items():
+            try:
+                report[chat_id] = all(
+                    future.result(
+                        None
+                        if deadline is None
+                        else max(0, deadline - time.monotonic())
+                    )
+                    for future in futures
+                )
+            except (telegram.TelegramError, TimeoutError, OSError) as e:
+                logger.error(f"Could not deliver messages to {chat_id}: {e}")
+                report[chat_id] = False
+        return report
+
+    def send_to_chat_id(
+        self, message_text: Message, chat_id: int, wait: bool = False, **kwargs
+    ) -> bool:
+        """
+        Sends a message to a single chat_id through the send queue.
+        Returns as soon as the message is queued, so True only means
+        it was queued; delivery failures are logged later.
+        If wait is set, returns whether the message was delivered.
+        """
+        futures = self._enqueue_to_chat_id(message_text, chat_id, **kwargs)
+        if not wait:
+            for future in futures:
+                future.add_done_callback(
+                    functools.partial(self._log_send_exception, chat_id)
+                )
+            return bool(futures)
+        try:
+            return all(future.result() for future in futures)
+        except (telegram.TelegramError, OSError) as e:
+            logger.error(f"Could not send a message to {chat_id}: {e}")
+            return False
+
+    @staticmethod
+    def _log_send_exception(chat_id: int, future: Future):
+        """
+        Done-callback for messages nobody waits for, so that errors are not lost.
+        """
+        if future.cancelled():
+            return
+        exception = future.exception()
+        if exception is not None:
+            logger.error(f"Could not send a message to {chat_id}: {exception}")
+
+    def _enqueue_to_chat_id(
+        self, message: Message, chat_id: int, **kwargs
+    ) -> List[Future]:
+        if isinstance(message, ImageMessage):
+            if message.caption:
+                kwargs = dict(
+                    kwargs, caption=message.caption, parse_mode=telegram.ParseMode.HTML
+                )
+            return [self._enqueue_photo(message.photo, chat_id, kwargs)]
+        return [
+            self.send_queue.enqueue(
+                chat_id,
+                functools.partial(
+                    self._send_message,
+                    message_text,
+                    chat_id,
+                    kwargs,
+                ),
+            )
+            for message_text in paragraphs_to_messages([message.strip()])
+        ]
+
+    def _enqueue_photo(self, photo_bytes: bytes, chat_id: int, kwargs: dict) -> Future:
+        return self.send_queue.enqueue(
+            chat_id,
+            functools.partial(self._send_photo, photo_bytes, chat_id, kwargs),
+        )
+
+    def _send_photo(self, photo_bytes: bytes, chat_id: int, kwargs: dict) -> bool:
+        """
+        Called from the send queue. Reuses file_id of a previously uploaded
+        identical image, uploading it otherwise.
+        """
+        photo_key = hashlib.sha1(photo_bytes).hexdigest()
+        file_id = self._photo_file_ids.get(photo_key)
+        if file_id is not None:
+            try:
                 self.bot.send_photo(
-                    photo=open(pict, "rb"),
+                    photo=file_id,
                     chat_id=chat_id,
                     disable_notification=self.is_silent,
                     **kwargs,
                 )
-            message_text = re.sub(r"\S*\.png", "", message_text)
-        if message_text != "":
-            try:
-                pretty_send(
-                    [message_text.strip()],
-                    lambda msg: self.bot.send_message(
-                        text=msg,
-                        chat_id=chat_id,
-                        disable_notification=self.is_silent,
-                        disable_web_page_preview=self.disable_web_page_preview,
-                        parse_mode=telegram.ParseMode.HTML,
-                        **kwargs,
-                    ),
-                )
                 return True
-            except telegram.TelegramError as e:
-                logger.error(f"Could not send a message to {chat_id}: {e}")
-                # HTML parse error isn't a separate class in Telegram
-                # So we need to dig into the exception message
-                if "Can't parse entities" in e.message:
-                    try:
-                        # Try sending the plain-text version
-                        pretty_send(
-                            [message_text.strip()],
-                            lambda msg: self.bot.send_message(
-                                text=msg,
-                                chat_id=chat_id,
-                                disable_notification=self.is_silent,
-                                disable_web_page_preview=self.disable_web_page_preview,
-                                **kwargs,
-                            ),
-                        )
-                        return True
-                    except telegram.TelegramError as e:
-                        logger.error(
-                            f"Could not send a plain-text message to {chat_id}: {e}"
-                        )
+            except telegram.error.BadRequest as e:
+                logger.warning(f"Could not reuse photo {file_id}, uploading: {e}")
+                del self._photo_file_ids[photo_key]
+        message = self.bot.send_photo(
+            photo=io.BytesIO(photo_bytes),
+            chat_id=chat_id,
+            disable_notification=self.is_silent,
+            **kwargs,
+        )
+        if message is not None and message.photo:
+            # largest size goes last
+            self._photo_file_ids[photo_key] = message.photo[-1].file_id
+            if len(self._photo_file_ids) > MAX_CACHED_PHOTO_FILE_IDS:
+                self._photo_file_ids.popitem(last=False)
+        return True
+
+    def _send_message(self, message_text: str, chat_id: int, kwargs: dict) -> bool:
+        """
+        Called from the send queue. RetryAfter is left for the queue to handle.
+        """
+        try:
+            self.bot.send_message(
+                text=message_text,
+                chat_id=chat_id,
+                disable_notification=self.is_silent,
+                disable_web_page_preview=self.disable_web_page_preview,
+                parse_mode=telegram.ParseMode.HTML,
+                **kwargs,
+            )
+            return True
+        except telegram.error.RetryAfter:
+            raise
+        except telegram.TelegramError as e:
+            logger.error(f"Could not send a message to {chat_id}: {e}")
+            # HTML parse error isn't a separate class in Telegram
+            # So we need to dig into the exception message
+            if "Can't parse entities" not in e.message:
+                return False
+        try:
+            # Try sending the plain-text version
+            self.bot.send_message(
+                text=message_text,
+                chat_id=chat_id,
+                disable_notification=self.is_silent,
+                disable_web_page_preview=self.disable_web_page_preview,
+                **kwargs,
+            )
+            return True
+        except telegram.error.RetryAfter:
+            raise
+        except telegram.TelegramError as e:
+            logger.error(f"Could not send a plain-text message to {chat_id}: {e}")
             return False
 
     def send_error_log(self, error_log: str):
@@ -134,64 +338,228 @@ class TelegramSender(Singleton):
         self.disable_web_page_preview = self._tg_config.get(
             "disable_web_page_preview", True
         )
+        self.send_queue.set_limits(
+            global_messages_per_sec=self._tg_config.get(
+                TELEGRAM_GLOBAL_MESSAGES_PER_SEC, SEND_QUEUE_GLOBAL_MESSAGES_PER_SEC
+            ),
+            chat_messages_per_sec=self._tg_config.get(
+                TELEGRAM_CHAT_MESSAGES_PER_SEC, SEND_QUEUE_CHAT_MESSAGES_PER_SEC
+            ),
+            group_messages_per_min=self._tg_config.get(
+                TELEGRAM_GROUP_MESSAGES_PER_MIN, SEND_QUEUE_GROUP_MESSAGES_PER_MIN
+            ),
+        )
 
 
-def pretty_send(paragraphs: List[str], send: Callable[[str], None]) -> str:
+def pretty_send(paragraphs: Iterable[str], send: Callable[[str], None]) -> str:
     """
-    Send a bunch of paragraphs grouped into messages with adequate delays.
+    Send a bunch of paragraphs grouped into messages.
+    Paragraphs can be a generator, each message is sent as soon as it is full.
+    Message order is kept by the send queue, so no delays are needed.
     Return the whole message for testing purposes.
     """
-    messages = paragraphs_to_messages(paragraphs)
-    for i, message in enumerate(messages):
-        if i > 0:
-            time.sleep(MESSAGE_DELAY_SEC)
-        if message.startswith("<code>") and "</code>" not in message:
-            message = message + "</code>"
-        elif message.endswith("</code>") and "<code>" not in message:
-            message = "<code>" + message
+    messages = []
+    for message in iter_messages(paragraphs):
         send(message)
+        messages.append(message)
+    if not messages:
+        logger.warning("No paragraphs to process, exiting")
     return "\n".join(messages)
 
 
+def read_photo(photo: Photo) -> bytes:
+    """
+    Returns image content given as file path, bytes or binary buffer.
+    """
+    if isinstance(photo, bytes):
+        return photo
+    if isinstance(photo, str):
+        with open(photo, "rb") as photo_file:
+            return photo_file.read()
+    if hasattr(photo, "getvalue"):
+        return photo.getvalue()
+    photo.seek(0)
+    return photo.read()
+
+
 def paragraphs_to_messages(
-    paragraphs: List[str],
+    paragraphs: Iterable[str],
     char_limit=telegram.constants.MAX_MESSAGE_LENGTH,
     delimiter="\n\n",
 ) -> List[str]:
     """
-    Makes as few message texts as possible from given paragraph list.
+    Makes as few message texts as possible from given paragraphs.
     """
-    if not paragraphs:
+    messages = list(iter_messages(paragraphs, char_limit, delimiter))
+    if not messages:
         logger.warning("No paragraphs to process, exiting")
-        return []
+    return messages
 
-    delimiter_len = len(delimiter)
-    messages = []
+
+def iter_messages(
+    paragraphs: Iterable[str],
+    char_limit=telegram.constants.MAX_MESSAGE_LENGTH,
+    delimiter="\n\n",
+) -> Iterator[str]:
+    """
+    Packs paragraphs into messages, yielding each one as soon as it is full.
+    Works in linear time of total text length.
+    Lengths are counted in UTF-16 code units, as Telegram does.
+    """
+    delimiter_len = utf16_len(delimiter)
     paragraphs_in_message = []
-    char_counter = char_limit  # so that we start a new message immediately
+    message_len = 0
 
     for paragraph in paragraphs:
-        if len(paragraph) + char_counter + delimiter_len < char_limit:
+        paragraph_len = utf16_len(paragraph)
+        if (
+            paragraphs_in_message
+            and message_len + delimiter_len + paragraph_len <= char_limit
+        ):
             paragraphs_in_message.append(paragraph)
-            char_counter += len(paragraph) + delimiter_len
-        else:
-            # Overflow, starting a new message
-            messages.append(delimiter.join(paragraphs_in_message))
-            # if paragraph is too long, force split it for line breaks
-            while len(paragraph) >= char_limit:
-                # last line break before limit
-                last_break_index = paragraph[:char_limit].rfind("\n")
-                if last_break_index == -1:
-                    # if no line breaks, force split
-                    last_break_index = char_limit - 1
-                messages.append(paragraph[:last_break_index])
-                paragraph = paragraph[last_break_index:].strip()
-            # start new message
-            paragraphs_in_message = [paragraph]
-            char_counter = len(paragraph)
-    # add last remaining message to the list
-    messages.append(delimiter.join(paragraphs_in_message))
-
-    # first message is empty by design.
-    assert messages[0] == ""
-    return messages[1:]
+            message_len += delimiter_len + paragraph_len
+            continue
+        # Overflow, starting a new message
+        if paragraphs_in_message:
+            message = delimiter.join(paragraphs_in_message)
+            if message:
+                yield message
+        if paragraph_len > char_limit:
+            # if paragraph is too long, force split it for line breaks.
+            # Its last chunk can be followed by next paragraphs.
+            chunk = None
+            for next_chunk in _split_long_paragraph(paragraph, char_limit):
+                if chunk is not None:
+                    yield chunk
+                chunk = next_chunk
+            paragraph = chunk or ""
+            paragraph_len = utf16_len(paragraph)
+        paragraphs_in_message = [paragraph]
+        message_len = paragraph_len
+
+    if paragraphs_in_message:
+        message = delimiter.join(paragraphs_in_message)
+        if message:
+            yield message
+
+
+def utf16_len(text: str) -> int:
+    """
+    Text length as Telegram counts it.
+    """
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _split_long_paragraph(paragraph: str, char_limit: int) -> Iterator[str]:
+    """
+    Splits paragraph into chunks fitting into char_limit, preferably by line breaks.
+    Never cuts inside an HTML tag or entity, unless it is longer than the limit.
+    Tags open at a split are closed at the end of the chunk and reopened
+    at the start of the next one, so that every chunk is valid HTML.
+    """
+    pos = 0
+    paragraph_len = len(paragraph)
+    # (tag name, opening tag) for tags open at pos
+    open_tags = []
+    while True:
+        # same as stripping the rest of paragraph, but without copying it
+        while pos < paragraph_len and paragraph[pos].isspace():
+            pos += 1
+        if pos == paragraph_len:
+            return
+        next_chunk = _next_chunk(paragraph, pos, char_limit, open_tags)
+        if next_chunk is None:
+            logger.warning("Too many open tags to fit, message may be broken")
+            next_chunk = _next_chunk(paragraph, pos, char_limit, [], balance=False)
+        chunk, pos, open_tags = next_chunk
+        yield chunk
+
+
+def _next_chunk(
+    paragraph: str,
+    start: int,
+    char_limit: int,
+    open_tags: List[Tuple[str, str]],
+    balance: bool = True,
+) -> Optional[Tuple[str, int, List[Tuple[str, str]]]]:
+    """
+    Returns (chunk, end index, tags open at the end) for the chunk starting at
+    start, or None if reopened and closed tags leave no room for text.
+    """
+    prefix = "".join(opening_tag for _, opening_tag in open_tags)
+    budget = char_limit - utf16_len(prefix)
+    while budget > 0:
+        end = _fit_end(paragraph, start, budget)
+        if end == len(paragraph):
+            # paragraph closes its own tags
+            return prefix + paragraph[start:], end, []
+        # last line break before limit
+        split = paragraph.rfind("\n", start, end)
+        if split <= start:
+            # if no line breaks, force split
+            split = _skip_markup(paragraph, start, end)
+            if split is None:
+                if balance:
+                    # reopened tags leave no room for the whole tag
+                    return None
+                # tag or entity is longer than the limit, cut it anyway
+                split = end
+        if not balance:
+            return paragraph[start:split], split, []
+        chunk_open_tags = _track_open_tags(open_tags, paragraph, start, split)
+        suffix = "".join(f"</{name}>" for name, _ in reversed(chunk_open_tags))
+        chunk = prefix + paragraph[start:split] + suffix
+        overflow = utf16_len(chunk) - char_limit
+        if overflow <= 0:
+            return chunk, split, chunk_open_tags
+        # make room for closing tags
+        budget -= overflow
+    return None
+
+
+def _track_open_tags(
+    open_tags: List[Tuple[str, str]], text: str, start: int, end: int
+) -> List[Tuple[str, str]]:
+    """
+    Returns tags open after text[start:end], given tags open before it.
+    """
+    open_tags = list(open_tags)
+    for match in HTML_TAG_RE.finditer(text, start, end):
+        is_closing, name = match.group(1), match.group(2).lower()
+        if not is_closing:
+            open_tags.append((name, match.group(0)))
+            continue
+        for i in range(len(open_tags) - 1, -1, -1):
+            if open_tags[i][0] == name:
+                del open_tags[i]
+                break
+    return open_tags
+
+
+def _fit_end(text: str, start: int, char_limit: int) -> int:
+    """
+    Returns end index of the longest text[start:end] fitting into char_limit
+    (may be one code unit shorter if it would split a surrogate pair).
+    """
+    # every character takes at least one UTF-16 code unit
+    end = min(len(text), start + char_limit)
+    excess = utf16_len(text[start:end]) - char_limit
+    while excess > 0:
+        # non-BMP characters take two code units, so never drop too much
+        end -= (excess + 1) // 2
+        excess = utf16_len(text[start:end]) - char_limit
+    return max(end, start + 1)
+
+
+def _skip_markup(text: str, start: int, split: int) -> Optional[int]:
+    """
+    Moves split index back if it falls inside an HTML tag or entity.
+    Returns None if the tag or entity starts right at start.
+    """
+    tag_start = text.rfind("<", start, split)
+    if tag_start != -1 and tag_start > text.rfind(">", tag_start, split):
+        return tag_start if tag_start > start else None
+    entity_start = text.rfind("&", max(start, split - MAX_HTML_ENTITY_LEN), split)
+    if entity_start != -1 and text.find(";", entity_start, split) == -1:
+        return entity_start if entity_start > start else None
+    return split
@@ -30,6 +30,18 @@ class TrelloClient(Singleton):
         _, data = self._make_request(f"boards/{board_id}")
         return objects.TrelloBoard.from_dict(data)
 
+    def get_board_last_activity(self, board_id=None) -> str:
+        """
+        Returns board dateLastActivity, which changes on any board update.
+        Can be used as a version of the board state.
+        """
+        if not board_id:
+            board_id = self.board_id
+        _, data = self._make_request(
+            f"boards/{board_id}", payload={"fields": "dateLastActivity"}
+        )
+        return data.get("dateLastActivity")
+
     def get_board_by_url(self, board_url):
         # Safari may copy unquoted url with cyrillic symbols
         board_url = quote(board_url, safe=":/%")
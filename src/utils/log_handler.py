@@ -1,15 +1,23 @@
-import html
 from logging import ERROR, Formatter, LogRecord, StreamHandler
 
-from sentry_sdk import capture_message
+from sentry_sdk import capture_message, push_scope
 
-from ..consts import LOG_FORMAT, USAGE_LOG_LEVEL
+from ..consts import (
+    DEFAULT_SENTRY_DEDUP_WINDOW_MINUTES,
+    DEFAULT_SENTRY_EVENTS_PER_MINUTE,
+    LOG_FORMAT,
+    SENTRY_DEDUP_WINDOW_MINUTES,
+    SENTRY_EVENTS_PER_MINUTE,
+    USAGE_LOG_LEVEL,
+)
 from ..tg.sender import TelegramSender
+from .log_shipper import LogShipper
+from .sentry_limiter import SentryLimiter
 from .singleton import Singleton
 
 
 class ErrorBroadcastHandler(StreamHandler, Singleton):
-    def __init__(self, tg_sender: TelegramSender = None):
+    def __init__(self, tg_sender: TelegramSender = None, sentry_config: dict = None):
         if self.was_initialized():
             return
         if tg_sender is None:
@@ -20,37 +28,39 @@ class ErrorBroadcastHandler(StreamHandler, Singleton):
         self.setFormatter(Formatter(LOG_FORMAT))
         self.tg_sender = tg_sender
         self.is_muted = False
+        # records are sent to telegram in batches, not to block logging calls
+        self.usage_log_shipper = LogShipper(
+            lambda text: self.tg_sender.send_usage_log(text),
+            report_error=self._emit_local_error,
+        )
+        self.error_log_shipper = LogShipper(
+            lambda text: self.tg_sender.send_error_log(text),
+            report_error=self._emit_local_error,
+        )
+        sentry_config = sentry_config or {}
+        self.sentry_limiter = SentryLimiter(
+            events_per_minute=sentry_config.get(
+                SENTRY_EVENTS_PER_MINUTE, DEFAULT_SENTRY_EVENTS_PER_MINUTE
+            ),
+            dedup_window_minutes=sentry_config.get(
+                SENTRY_DEDUP_WINDOW_MINUTES, DEFAULT_SENTRY_DEDUP_WINDOW_MINUTES
+            ),
+        )
 
     def emit(self, record: LogRecord):
         self.format(record)
         super().emit(record)
         if record.levelno == USAGE_LOG_LEVEL and not self.is_muted:
-            try:
-                usage_message = f"{record.asctime} - {record.message}"
-                if record.exc_text:
-                    usage_message += f" - {record.exc_text}"
-                self.tg_sender.send_usage_log(
-                    f"<code>{html.escape(usage_message)}</code>"
-                )
-            except Exception as e:
-                # if it can't send a message, still should log it to the stream
-                super().emit(
-                    LogRecord(
-                        name=__name__,
-                        level=ERROR,
-                        pathname=None,
-                        lineno=-1,
-                        msg=f"Could not send error to telegram: {e}",
-                        args=None,
-                        exc_info=None,
-                    )
-                )
+            usage_message = record.message
+            if record.exc_text:
+                usage_message += f" - {record.exc_text}"
+            self.usage_log_shipper.add(usage_message, record.asctime)
         if record.levelno >= ERROR and not self.is_muted:
             error_message = f"{record.levelname} - {record.module} - {record.message}"
             if record.exc_text:
                 error_message += f" - {record.exc_text}"
             try:
-                capture_message(error_message)
+                self._capture_sentry_message(record, error_message)
             except Exception as e:
                 # if it can't send a message, still should log it to the stream
                 super().emit(
@@ -64,23 +74,47 @@ class ErrorBroadcastHandler(StreamHandler, Singleton):
                         exc_info=e,
                     )
                 )
-            try:
-                self.tg_sender.send_error_log(
-                    f"<code>{html.escape(error_message)}</code>"
-                )
-            except Exception as e:
-                # if it can't send a message, still should log it to the stream
-                super().emit(
-                    LogRecord(
-                        name=__name__,
-                        level=ERROR,
-                        pathname=None,
-                        lineno=-1,
-                        msg=f"Could not send error to telegram: {e}",
-                        args=None,
-                        exc_info=None,
-                    )
-                )
+            self.error_log_shipper.add(error_message)
+
+    def flush_logs(self, timeout: float = 0):
+        """
+        Sends buffered logs to telegram right away.
+        Not a flush() override, StreamHandler calls that after every record.
+        With timeout, waits up to that long for the logs to leave the send queue,
+        to be called before exit.
+        """
+        self.usage_log_shipper.flush()
+        self.error_log_shipper.flush()
+        if timeout > 0 and not self.tg_sender.send_queue.wait_empty(timeout):
+            self._emit_local_error("Could not send all logs to telegram before exit")
+
+    def _capture_sentry_message(self, record: LogRecord, error_message: str):
+        fingerprint = self.sentry_limiter.get_fingerprint(record)
+        should_capture, suppressed_count = self.sentry_limiter.should_capture(
+            fingerprint
+        )
+        if not should_capture:
+            return
+        with push_scope() as scope:
+            # group events the same way they are deduplicated
+            scope.fingerprint = [fingerprint]
+            if suppressed_count:
+                scope.set_extra("suppressed_events", suppressed_count)
+            capture_message(error_message)
 
     def set_muted(self, is_muted: bool):
         self.is_muted = is_muted
+
+    def _emit_local_error(self, message: str):
+        # only to the stream, so that failures to send logs are not sent again
+        super().emit(
+            LogRecord(
+                name=__name__,
+                level=ERROR,
+                pathname=None,
+                lineno=-1,
+                msg=message,
+                args=None,
+                exc_info=None,
+            )
+        )
@@ -0,0 +1,109 @@
+import html
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Tuple
+
+from ..consts import (
+    LOG_SHIPPER_FLUSH_INTERVAL_SEC,
+    LOG_SHIPPER_MAX_BATCH_SIZE,
+    LOG_SHIPPER_MAX_BUFFER_SIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class LogShipper:
+    """
+    Buffers log lines and sends them in batches from a background thread,
+    so that logging never waits for network.
+    Repeated lines are collapsed into one with a counter.
+    When the buffer is full, new lines are dropped and only counted.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[str], None],
+        report_error: Callable[[str], None] = logger.error,
+        flush_interval_sec: float = LOG_SHIPPER_FLUSH_INTERVAL_SEC,
+        max_batch_size: int = LOG_SHIPPER_MAX_BATCH_SIZE,
+        max_buffer_size: int = LOG_SHIPPER_MAX_BUFFER_SIZE,
+    ):
+        self._send = send
+        self._report_error = report_error
+        self.flush_interval_sec = flush_interval_sec
+        self.max_batch_size = max_batch_size
+        self.max_buffer_size = max_buffer_size
+        self._cond = threading.Condition()
+        # line -> (timestamp of first occurrence, count)
+        self._lines: Dict[str, Tuple[str, int]] = OrderedDict()
+        self._dropped_count = 0
+        self._thread = None
+
+    def add(self, line: str, timestamp: str = None):
+        """
+        Never blocks on sending, may drop the line if overloaded.
+        """
+        with self._cond:
+            if line in self._lines:
+                first_timestamp, count = self._lines[line]
+                self._lines[line] = (first_timestamp, count + 1)
+                return
+            if len(self._lines) >= self.max_buffer_size:
+                self._dropped_count += 1
+                return
+            self._lines[line] = (timestamp, 1)
+            self._ensure_thread()
+            if len(self._lines) >= self.max_batch_size:
+                self._cond.notify()
+
+    def flush(self):
+        """
+        Sends all buffered lines right away.
+        """
+        with self._cond:
+            lines, self._lines = self._lines, OrderedDict()
+            dropped_count, self._dropped_count = self._dropped_count, 0
+        if not lines and not dropped_count:
+            return
+        try:
+            self._send(
+                "\n\n".join(self._format_paragraphs(lines.items(), dropped_count))
+            )
+        except Exception as e:
+            # if it can't send a message, still should log it to the stream
+            self._report_error(f"Could not send logs to telegram: {e}")
+
+    def _ensure_thread(self):
+        # started lazily, so that unused shippers don't spawn threads
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._flush_forever, name="log-shipper", daemon=True
+            )
+            self._thread.start()
+
+    def _flush_forever(self):
+        while True:
+            with self._cond:
+                # wait for batch to fill up, but not longer than flush interval
+                self._cond.wait_for(
+                    lambda: len(self._lines) >= self.max_batch_size,
+                    timeout=self.flush_interval_sec,
+                )
+            self.flush()
+
+    @staticmethod
+    def _format_paragraphs(
+        lines: List[Tuple[str, Tuple[str, int]]], dropped_count: int
+    ) -> List[str]:
+        paragraphs = []
+        for line, (timestamp, count) in lines:
+            if timestamp:
+                line = f"{timestamp} - {line}"
+            paragraph = f"<code>{html.escape(line)}</code>"
+            if count > 1:
+                paragraph += f" (x{count})"
+            paragraphs.append(paragraph)
+        if dropped_count:
+            paragraphs.append(f"{dropped_count} more log records dropped")
+        return paragraphs
@@ -0,0 +1,89 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+from ..consts import REPORT_CACHE_TTL_MINUTES
+from .singleton import Singleton
+
+logger = logging.getLogger(__name__)
+
+
+class ReportCache(Singleton):
+    """
+    Stores messages produced by report jobs, so that repeated calls
+    of the same command can be answered without recomputing the report.
+    Entries are keyed by (job name, args, board state version).
+    """
+
+    def __init__(self, ttl_minutes: float = REPORT_CACHE_TTL_MINUTES):
+        if self.was_initialized():
+            return
+
+        self.ttl_minutes = ttl_minutes
+        self._lock = threading.Lock()
+        # key -> (creation timestamp, messages)
+        self._entries: Dict[Hashable, Tuple[float, List[str]]] = {}
+        logger.info("ReportCache successfully initialized")
+
+    def set_ttl(self, ttl_minutes: float):
+        self.ttl_minutes = ttl_minutes
+
+    def get(self, key: Hashable) -> Optional[List[str]]:
+        """
+        Returns cached messages for the key or None if missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            created_ts, messages = entry
+            if time.monotonic() - created_ts > self.ttl_minutes * 60:
+                del self._entries[key]
+                return None
+            return messages
+
+    def set(self, key: Hashable, messages: List[str]):
+        with self._lock:
+            self._drop_expired()
+            self._entries[key] = (time.monotonic(), messages)
+
+    def invalidate(self, job_name: str = None):
+        """
+        Drops cached reports of the given job or all of them.
+        """
+        with self._lock:
+            if job_name is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[0] == job_name]:
+                del self._entries[key]
+
+    def _drop_expired(self):
+        now = time.monotonic()
+        expired_keys = [
+            key
+            for key, (created_ts, _) in self._entries.items()
+            if now - created_ts > self.ttl_minutes * 60
+        ]
+        for key in expired_keys:
+            del self._entries[key]
+
+    @staticmethod
+    def make_key(job_name: str, args: List[str], version: str) -> Tuple:
+        return job_name, tuple(args), version
+
+    @staticmethod
+    def recording_send(
+        send: Callable[[str], None], messages: List[str]
+    ) -> Callable[[str], None]:
+        """
+        Returns a send function that appends every message to messages
+        before passing it to the original send.
+        """
+
+        def wrapper(message: str):
+            messages.append(message)
+            return send(message)
+
+        return wrapper
@@ -0,0 +1,80 @@
+import re
+import threading
+import time
+from collections import Counter
+from logging import LogRecord
+from typing import Dict, Tuple
+
+from ..consts import (
+    DEFAULT_SENTRY_DEDUP_WINDOW_MINUTES,
+    DEFAULT_SENTRY_EVENTS_PER_MINUTE,
+)
+from ..tg.send_queue import TokenBucket
+
+# fingerprints of errors captured long ago are dropped once there are more than that
+MAX_TRACKED_FINGERPRINTS = 1000
+# message words with digits are mostly ids, urls or counters
+VARIABLE_WORD_RE = re.compile(r"\S*\d\S*")
+MAX_FINGERPRINT_MESSAGE_LEN = 100
+
+
+class SentryLimiter:
+    """
+    Decides which error log records are captured by Sentry, so that an error
+    storm (e.g. a failing call inside a loop over cards) produces a few events.
+    Records with the same fingerprint are captured once per dedup window,
+    and no more than events_per_minute records are captured overall.
+    """
+
+    def __init__(
+        self,
+        events_per_minute: float = DEFAULT_SENTRY_EVENTS_PER_MINUTE,
+        dedup_window_minutes: float = DEFAULT_SENTRY_DEDUP_WINDOW_MINUTES,
+    ):
+        self._lock = threading.Lock()
+        self._bucket = TokenBucket(events_per_minute / 60, max(1, events_per_minute))
+        self.dedup_window_sec = dedup_window_minutes * 60
+        # fingerprint -> when it was last captured
+        self._captured_ts: Dict[str, float] = {}
+        # fingerprint -> records suppressed since last capture
+        self._suppressed = Counter()
+
+    @staticmethod
+    def get_fingerprint(record: LogRecord) -> str:
+        """
+        Same logging call failing with the same exception type.
+        Generic calls (e.g. "Could not run job {name}") are shared by many jobs,
+        so message template is a part of it too, with ids and urls masked.
+        """
+        message = VARIABLE_WORD_RE.sub("*", str(record.msg))
+        fingerprint = (
+            f"{record.module}.{record.funcName}:{record.lineno}:"
+            f"{message[:MAX_FINGERPRINT_MESSAGE_LEN]}"
+        )
+        if record.exc_info and record.exc_info[0] is not None:
+            fingerprint += f":{record.exc_info[0].__name__}"
+        return fingerprint
+
+    def should_capture(self, fingerprint: str) -> Tuple[bool, int]:
+        """
+        Returns whether to capture the record and how many records
+        with that fingerprint were suppressed since the previous capture.
+        """
+        with self._lock:
+            now = time.monotonic()
+            captured_ts = self._captured_ts.get(fingerprint)
+            if (
+                captured_ts is not None and now - captured_ts < self.dedup_window_sec
+            ) or self._bucket.ready_at(now) > now:
+                self._suppressed[fingerprint] += 1
+                return False, 0
+            self._bucket.consume(now)
+            if len(self._captured_ts) > MAX_TRACKED_FINGERPRINTS:
+                self._drop_expired(now)
+            self._captured_ts[fingerprint] = now
+            return True, self._suppressed.pop(fingerprint, 0)
+
+    def _drop_expired(self, now: float):
+        for fingerprint, captured_ts in list(self._captured_ts.items()):
+            if now - captured_ts >= self.dedup_window_sec:
+                del self._captured_ts[fingerprint]
@@ -1,4 +1,12 @@
+import json
+from datetime import timedelta
+
 import pytest
+from freezegun import freeze_time
+from utils.sheets_benchmark import SheetsBenchmark
+
+from src.db.db_objects import Rubric
+from src.roles.roles import RoleRules
 
 
 def test_init(mock_db_client):
@@ -26,3 +34,61 @@ def test_find_curators_by_trello_label(mock_db_client, mock_sheets_client):
     curators = mock_db_client.find_curators_by_trello_label("Классицизм")
     assert len(curators) == 1
     assert curators[0].telegram == "@flo"
+
+
+def test_job_checkpoint(mock_db_client):
+    mock_db_client.add_job_checkpoint_item("job", "card_1", [1, "text"])
+    mock_db_client.add_job_checkpoint_item("job", "card_2", None)
+    mock_db_client.add_job_checkpoint_item("other_job", "card_1", "other")
+    checkpoint = mock_db_client.get_job_checkpoint("job", timedelta(hours=1))
+    assert checkpoint == {"card_1": [1, "text"], "card_2": None}
+    mock_db_client.clear_job_checkpoint("job")
+    assert mock_db_client.get_job_checkpoint("job", timedelta(hours=1)) == {}
+    assert mock_db_client.get_job_checkpoint("other_job", timedelta(hours=1)) == {
+        "card_1": "other"
+    }
+
+
+def test_job_checkpoint_stale(mock_db_client):
+    with freeze_time("2020-05-01 12:00:00"):
+        mock_db_client.add_job_checkpoint_item("stale_job", "card_1", "text")
+    with freeze_time("2020-05-03 12:00:00"):
+        assert mock_db_client.get_job_checkpoint("stale_job", timedelta(days=1)) == {}
+
+
+def test_replace_table(mock_db_client):
+    def make_rubric(name):
+        return Rubric.from_dict({"name": name, "vk_tag": f"#{name}", "tg_tag": ""})
+
+    mock_db_client._replace_table(Rubric, [make_rubric("nlp"), make_rubric("art")])
+    assert sorted(r.name for r in mock_db_client.get_rubrics()) == ["art", "nlp"]
+    # duplicate key fails the refresh, the old rows stay
+    with pytest.raises(Exception):
+        mock_db_client._replace_table(
+            Rubric, [make_rubric("history"), make_rubric("history")]
+        )
+    assert sorted(r.name for r in mock_db_client.get_rubrics()) == ["art", "nlp"]
+    mock_db_client._replace_table(Rubric, [])
+    assert mock_db_client.get_rubrics() == []
+
+
+def test_db_sync(monkeypatch):
+    with SheetsBenchmark(20) as benchmark:
+        calculated = []
+        get_roles = RoleRules.get_roles
+
+        def count_roles(rules, member):
+            calculated.append(member.id)
+            return get_roles(rules, member)
+
+        monkeypatch.setattr(RoleRules, "get_roles", count_roles)
+        results = {result.name: result.requests for result in benchmark.run()}
+        # one revision check per spreadsheet
+        assert results["DBSyncJob, unchanged sheets"] == 5
+        # only the edited member is recalculated
+        assert calculated == [1]
+        member = benchmark.db_client.get_member_by_name("Участник 0")
+        assert json.loads(member.roles) == ["frozen_member"]
+        # active, with a curator and a manager
+        member = benchmark.db_client.get_member_by_name("Участник 1")
+        assert json.loads(member.roles) == ["active_member", "author", "redactor"]
@@ -0,0 +1,41 @@
+from src.utils.log_shipper import LogShipper
+
+
+def test_repeated_lines_collapsed():
+    sent = []
+    shipper = LogShipper(sent.append)
+    shipper.add("error", "12:00")
+    shipper.add("other <error>")
+    shipper.add("error", "12:01")
+    shipper.flush()
+
+    assert sent == [
+        "<code>12:00 - error</code> (x2)\n\n<code>other &lt;error&gt;</code>"
+    ]
+    shipper.flush()
+    assert len(sent) == 1
+
+
+def test_lines_dropped_when_overloaded():
+    sent = []
+    shipper = LogShipper(sent.append, max_buffer_size=2)
+    for i in range(5):
+        shipper.add(f"error {i}")
+    shipper.flush()
+
+    assert sent == [
+        "<code>error 0</code>\n\n<code>error 1</code>\n\n3 more log records dropped"
+    ]
+
+
+def test_send_failure_reported():
+    errors = []
+
+    def send(text):
+        raise ValueError("telegram is down")
+
+    shipper = LogShipper(send, report_error=errors.append)
+    shipper.add("error")
+    shipper.flush()
+
+    assert errors == ["Could not send logs to telegram: telegram is down"]
@@ -0,0 +1,34 @@
+from collections import defaultdict
+
+from src.tg.persistence import DBPersistence
+
+
+def test_persistence_roundtrip(mock_db_client, monkeypatch):
+    written = []
+    set_telegram_data = mock_db_client.set_telegram_data
+
+    def record_set_telegram_data(items):
+        written.append(sorted(items))
+        set_telegram_data(items)
+
+    monkeypatch.setattr(mock_db_client, "set_telegram_data", record_set_telegram_data)
+    persistence = DBPersistence(mock_db_client, flush_interval_sec=3600)
+    assert persistence.get_chat_data() == defaultdict(dict)
+
+    persistence.update_chat_data(1, {"step": 1})
+    persistence.update_chat_data(2, {"step": 1})
+    persistence.update_conversation("conv", (1, 2), "state")
+    persistence.flush()
+    persistence.update_chat_data(1, {"step": 2})
+    # unchanged data is not written again
+    persistence.update_chat_data(2, {"step": 1})
+    persistence.flush()
+
+    assert written == [
+        [("chat_data", "1"), ("chat_data", "2"), ("conversation:conv", "[1, 2]")],
+        [("chat_data", "1")],
+    ]
+    persistence = DBPersistence(mock_db_client, flush_interval_sec=3600)
+    assert persistence.get_chat_data() == {1: {"step": 2}, 2: {"step": 1}}
+    assert persistence.get_conversations("conv") == {(1, 2): "state"}
+    assert persistence.get_bot_data() == {}
@@ -0,0 +1,51 @@
+from freezegun import freeze_time
+
+from src.utils.report_cache import ReportCache
+
+
+def _make_cache(ttl_minutes=10):
+    ReportCache.drop_instance()
+    return ReportCache(ttl_minutes=ttl_minutes)
+
+
+def test_cache_hit():
+    cache = _make_cache()
+    key = ReportCache.make_key("job", ["arg"], "2020-05-01T11:00:00.000Z")
+    cache.set(key, ["message 1", "message 2"])
+    assert cache.get(key) == ["message 1", "message 2"]
+
+
+def test_cache_miss_on_other_version_or_args():
+    cache = _make_cache()
+    cache.set(ReportCache.make_key("job", [], "v1"), ["message"])
+    assert cache.get(ReportCache.make_key("job", [], "v2")) is None
+    assert cache.get(ReportCache.make_key("job", ["arg"], "v1")) is None
+    assert cache.get(ReportCache.make_key("other_job", [], "v1")) is None
+
+
+def test_cache_expired():
+    cache = _make_cache(ttl_minutes=1)
+    key = ReportCache.make_key("job", [], "v1")
+    with freeze_time("2020-05-01 12:00:00") as frozen_time:
+        cache.set(key, ["message"])
+        frozen_time.tick(30)
+        assert cache.get(key) == ["message"]
+        frozen_time.tick(60)
+        assert cache.get(key) is None
+
+
+def test_cache_invalidate():
+    cache = _make_cache()
+    cache.set(ReportCache.make_key("job", [], "v1"), ["message"])
+    cache.set(ReportCache.make_key("other_job", [], "v1"), ["message"])
+    cache.invalidate("job")
+    assert cache.get(ReportCache.make_key("job", [], "v1")) is None
+    assert cache.get(ReportCache.make_key("other_job", [], "v1")) == ["message"]
+
+
+def test_recording_send():
+    sent, recorded = [], []
+    send = ReportCache.recording_send(sent.append, recorded)
+    send("first")
+    send("second")
+    assert sent == recorded == ["first", "second"]
@@ -1,6 +1,7 @@
 import datetime
 import logging
 import time
+from types import SimpleNamespace
 
 import pytest
 import schedule
@@ -70,3 +71,233 @@ def test_jobs_executed(mock_config_jobs_manager, mock_sender):
         schedule.run_pending()
 
     assert fake_job.run_counter == 1
+
+
+def _make_job_scheduler(jobs_config, mock_config_jobs_manager, mock_sender, db=None):
+    setattr(jobs, "job", fake_job)
+    mock_config_jobs_manager._latest_jobs_config = jobs_config
+
+    scheduler.schedule.clear()
+    fake_job.reset_run_counter()
+
+    # create singleton instance from scratch
+    scheduler.JobScheduler.drop_instance()
+    job_scheduler = scheduler.JobScheduler()
+    job_scheduler.app_context = SimpleNamespace(db_client=db) if db else None
+    job_scheduler.telegram_sender = mock_sender
+    return job_scheduler
+
+
+@pytest.mark.parametrize(
+    "misfire_policy, run_counter",
+    [("skip", 0), ("run_once", 1), ("coalesce", 1)],
+)
+def test_late_job_misfire_policy(
+    misfire_policy, run_counter, mock_config_jobs_manager, mock_sender
+):
+    job_scheduler = _make_job_scheduler(
+        {
+            "job": {
+                "every": "10 minutes",
+                "misfire_policy": misfire_policy,
+                "misfire_grace_minutes": 1,
+            }
+        },
+        mock_config_jobs_manager,
+        mock_sender,
+    )
+
+    with freeze_time("2020-05-01 12:00:00"):
+        job_scheduler.init_jobs()
+    # scheduler thread was busy for 5 minutes more than expected
+    with freeze_time("2020-05-01 12:15:00"):
+        schedule.run_pending()
+
+    assert fake_job.run_counter == run_counter
+
+
+@pytest.mark.parametrize(
+    "misfire_policy, last_run, run_counter",
+    [
+        ("skip", "2020-04-29 12:00:00", 0),
+        ("run_once", "2020-04-29 11:00:00", 0),
+        ("run_once", "2020-04-30 12:00:00", 1),
+        ("run_once", "2020-05-01 11:00:00", 0),
+        ("coalesce", "2020-04-29 12:00:00", 1),
+        ("coalesce", "2020-05-01 11:00:00", 0),
+    ],
+)
+def test_missed_job_caught_up(
+    misfire_policy,
+    last_run,
+    run_counter,
+    mock_config_jobs_manager,
+    mock_sender,
+    mock_db_client,
+):
+    jobs_config = {
+        "job": {
+            "every": "day",
+            "misfire_policy": misfire_policy,
+            "misfire_grace_minutes": 60,
+        }
+    }
+    job_scheduler = _make_job_scheduler(
+        jobs_config, mock_config_jobs_manager, mock_sender, db=mock_db_client
+    )
+    schedule_key = job_scheduler._make_schedule_key("job", jobs_config["job"])
+    mock_db_client.set_job_last_run(
+        schedule_key, datetime.datetime.fromisoformat(last_run)
+    )
+
+    # bot was down and restarted
+    with freeze_time("2020-05-01 12:30:00"):
+        job_scheduler.init_jobs()
+        schedule.run_pending()
+
+    assert fake_job.run_counter == run_counter
+
+
+def test_jobs_staggered(mock_config_jobs_manager, mock_sender):
+    jobs_config = {
+        "job": [
+            {"every": "day", "at": "10:00", "stagger_seconds": 30, "stagger_order": 1},
+            {"every": "monday", "at": "10:00", "stagger_seconds": 30},
+            {"every": "day", "at": "11:00", "stagger_seconds": 30},
+        ]
+    }
+    job_scheduler = _make_job_scheduler(
+        jobs_config, mock_config_jobs_manager, mock_sender
+    )
+
+    at_offsets = job_scheduler._get_at_offsets(jobs_config)
+
+    assert at_offsets == {("job", 0): 30, ("job", 1): 0, ("job", 2): 0}
+    assert job_scheduler._shift_at_time("10:00", 30) == "10:00:30"
+    assert job_scheduler._shift_at_time("23:59", 90) == "23:59:59"
+    assert job_scheduler._shift_at_time(":30", 90) == ":30"
+
+
+def test_jobs_jitter_within_window(mock_config_jobs_manager, mock_sender):
+    jobs_config = {
+        "job": [{"every": "day", "at": "10:00", "jitter_seconds": 60}] * 10,
+    }
+    job_scheduler = _make_job_scheduler(
+        jobs_config, mock_config_jobs_manager, mock_sender
+    )
+
+    at_offsets = job_scheduler._get_at_offsets(jobs_config)
+
+    assert all(0 <= offset <= 60 for offset in at_offsets.values())
+
+
+def test_reschedule_only_changed_jobs(mock_config_jobs_manager, mock_sender):
+    jobs_config = {
+        "job": [{"every": "day", "at": "10:00"}, {"every": "monday", "at": "11:00"}],
+        "removed_job": {"every": "day", "at": "12:00"},
+    }
+    job_scheduler = _make_job_scheduler(
+        jobs_config, mock_config_jobs_manager, mock_sender
+    )
+    job_scheduler.init_jobs()
+    unchanged_job, changed_job = schedule.jobs[0], schedule.jobs[1]
+
+    mock_config_jobs_manager._latest_jobs_config = {
+        "job": [{"every": "day", "at": "10:00"}, {"every": "monday", "at": "12:00"}],
+    }
+    job_scheduler.reschedule_jobs()
+
+    assert len(schedule.jobs) == 2
+    assert unchanged_job in schedule.jobs
+    assert changed_job not in schedule.jobs
+    assert {job.at_time.hour for job in schedule.jobs} == {10, 12}
+
+
+def test_jittered_job_not_rerun_after_restart(
+    mock_config_jobs_manager, mock_sender, mock_db_client
+):
+    jobs_config = {"job": {"every": "day", "at": "10:00", "jitter_seconds": 1800}}
+    job_scheduler = _make_job_scheduler(
+        jobs_config, mock_config_jobs_manager, mock_sender, db=mock_db_client
+    )
+    with freeze_time("2020-05-01 00:00:00"):
+        job_scheduler.init_jobs()
+    run_time = schedule.jobs[0].next_run
+    with freeze_time(run_time + datetime.timedelta(seconds=1)):
+        schedule.run_pending()
+    assert fake_job.run_counter == 1
+
+    # bot restarted shortly after the run, jitter must not move the slot
+    for _ in range(5):
+        job_scheduler = _make_job_scheduler(
+            jobs_config, mock_config_jobs_manager, mock_sender, db=mock_db_client
+        )
+        with freeze_time(run_time + datetime.timedelta(minutes=5)):
+            job_scheduler.init_jobs()
+            schedule.run_pending()
+        assert schedule.jobs[0].next_run == run_time + datetime.timedelta(days=1)
+
+    assert fake_job.run_counter == 0
+
+
+@pytest.mark.parametrize("misfire_policy, saved", [("skip", False), ("run_once", True)])
+def test_job_last_run_saved(
+    misfire_policy, saved, mock_config_jobs_manager, mock_sender, mock_db_client
+):
+    jobs_config = {"job": {"every": "10 minutes", "misfire_policy": misfire_policy}}
+    job_scheduler = _make_job_scheduler(
+        jobs_config, mock_config_jobs_manager, mock_sender, db=mock_db_client
+    )
+    with freeze_time("2020-05-01 12:00:00"):
+        job_scheduler.init_jobs()
+    with freeze_time("2020-05-01 12:10:00"):
+        schedule.run_pending()
+
+    assert fake_job.run_counter == 1
+    schedule_key = job_scheduler._make_schedule_key("job", jobs_config["job"])
+    assert (schedule_key in mock_db_client.get_job_last_runs()) == saved
+
+
+# caught up if missed within the day, shifted by stagger and jitter within the slot
+JOB_SCHEDULE = {
+    "every": "day",
+    "at": "10:00",
+    "stagger_seconds": 1800,
+    "jitter_seconds": 1800,
+    "misfire_grace_minutes": 24 * 60,
+}
+
+
+@pytest.mark.parametrize(
+    "new_jobs_config",
+    [
+        # changed recipients don't change the jitter
+        {"job": dict(JOB_SCHEDULE, send_to=1)},
+        # job inserted before it in the slot moves it by a stagger
+        {"other_job": {"every": "day", "at": "10:00"}, "job": JOB_SCHEDULE},
+    ],
+)
+def test_job_not_rerun_after_config_change(
+    new_jobs_config, mock_config_jobs_manager, mock_sender, mock_db_client
+):
+    setattr(jobs, "other_job", fake_job)
+    jobs_config = {"job": JOB_SCHEDULE}
+    job_scheduler = _make_job_scheduler(
+        jobs_config, mock_config_jobs_manager, mock_sender, db=mock_db_client
+    )
+    with freeze_time("2020-06-01 00:00:00"):
+        job_scheduler.init_jobs()
+    run_time = schedule.jobs[0].next_run
+    with freeze_time(run_time + datetime.timedelta(seconds=1)):
+        schedule.run_pending()
+    assert fake_job.run_counter == 1
+
+    # bot restarted with a new config after the job ran
+    job_scheduler = _make_job_scheduler(
+        new_jobs_config, mock_config_jobs_manager, mock_sender, db=mock_db_client
+    )
+    with freeze_time(run_time + datetime.timedelta(hours=2)):
+        job_scheduler.init_jobs()
+        schedule.run_pending()
+
+    assert fake_job.run_counter == 0
@@ -0,0 +1,146 @@
+import io
+import time
+from types import SimpleNamespace
+
+import pytest
+import telegram
+
+from src.tg.send_queue import SendQueue, TokenBucket
+from src.tg.sender import ImageMessage, TelegramSender
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=2, capacity=2)
+    now = time.monotonic()
+    bucket.consume(now)
+    assert bucket.ready_at(now) == now
+    bucket.consume(now)
+    assert bucket.ready_at(now) == pytest.approx(now + 0.5)
+    bucket.block_until(now + 10)
+    assert bucket.ready_at(now + 1) == now + 10
+
+
+def test_messages_sent_in_order():
+    queue = SendQueue(chat_messages_per_sec=1000, chat_burst=1000)
+    sent = []
+    futures = [
+        queue.enqueue(chat_id, lambda chat_id=chat_id, i=i: sent.append((chat_id, i)))
+        for i in range(10)
+        for chat_id in (1, 2)
+    ]
+    for future in futures:
+        future.result(timeout=5)
+    for chat_id in (1, 2):
+        assert [i for sent_chat_id, i in sent if sent_chat_id == chat_id] == list(
+            range(10)
+        )
+
+
+def test_chat_rate_limited():
+    queue = SendQueue(chat_messages_per_sec=20, chat_burst=1)
+    start = time.monotonic()
+    futures = [queue.enqueue(1, lambda: True) for _ in range(5)]
+    assert all(future.result(timeout=5) for future in futures)
+    # first message goes at once, then one message per 1/20 sec
+    assert time.monotonic() - start >= 0.2
+
+
+def test_retry_after():
+    queue = SendQueue(chat_messages_per_sec=1000, chat_burst=1000)
+    attempts = []
+
+    def send():
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            raise telegram.error.RetryAfter(0.1)
+        return True
+
+    assert queue.enqueue(1, send).result(timeout=5)
+    assert len(attempts) == 2
+    assert attempts[1] - attempts[0] >= 0.1
+
+
+def test_retry_after_gives_up():
+    queue = SendQueue(chat_messages_per_sec=1000, chat_burst=1000, max_retries=1)
+
+    def send():
+        raise telegram.error.RetryAfter(0)
+
+    with pytest.raises(telegram.error.RetryAfter):
+        queue.enqueue(1, send).result(timeout=5)
+
+
+def test_wait_empty():
+    queue = SendQueue(chat_messages_per_sec=20, chat_burst=1)
+    for _ in range(5):
+        queue.enqueue(1, lambda: True)
+    assert not queue.wait_empty(timeout=0)
+    assert queue.wait_empty(timeout=5)
+    assert queue.pending_count() == 0
+
+
+class FakeBot:
+    def __init__(self, blocked_chat_ids):
+        self.blocked_chat_ids = blocked_chat_ids
+        self.sent = []
+
+    def send_message(self, text, chat_id, **kwargs):
+        if chat_id in self.blocked_chat_ids:
+            raise telegram.error.Unauthorized("Forbidden: bot was blocked by the user")
+        self.sent.append((chat_id, text))
+
+    def send_photo(self, photo, chat_id, **kwargs):
+        if chat_id in self.blocked_chat_ids:
+            raise telegram.error.Unauthorized("Forbidden: bot was blocked by the user")
+        if isinstance(photo, str):
+            self.sent.append((chat_id, photo))
+        else:
+            self.sent.append((chat_id, photo.read()))
+        return SimpleNamespace(photo=[SimpleNamespace(file_id="file_id")])
+
+
+def test_fan_out_delivery_report():
+    bot = FakeBot(blocked_chat_ids=[3])
+    TelegramSender.drop_instance()
+    sender = TelegramSender(bot=bot, tg_config={"chat_messages_per_second": 1000})
+    try:
+        report = sender.fan_out(
+            {1: ["intro", "card"], 2: ["intro"], 3: ["intro"]}, timeout=5
+        )
+    finally:
+        TelegramSender.drop_instance()
+
+    assert report == {1: True, 2: True, 3: False}
+    assert sorted(bot.sent) == [(1, "intro\n\ncard"), (2, "intro")]
+
+
+def test_photo_uploaded_once():
+    bot = FakeBot(blocked_chat_ids=[])
+    TelegramSender.drop_instance()
+    sender = TelegramSender(bot=bot, tg_config={"chat_messages_per_second": 1000})
+    try:
+        for chat_id in (1, 2, 3):
+            assert sender.send_to_chat_id(
+                ImageMessage(io.BytesIO(b"chart")), chat_id, wait=True
+            )
+    finally:
+        TelegramSender.drop_instance()
+
+    assert bot.sent == [(1, b"chart"), (2, "file_id"), (3, "file_id")]
+
+
+def test_queued_send_failure_logged(caplog):
+    bot = FakeBot(blocked_chat_ids=[1])
+    TelegramSender.drop_instance()
+    sender = TelegramSender(bot=bot, tg_config={"chat_messages_per_second": 1000})
+    try:
+        # queued only, photo failure is an exception nobody waits for
+        assert sender.send_to_chat_id(ImageMessage(b"chart"), 1)
+        deadline = time.monotonic() + 5
+        while "Could not send a message to 1" not in caplog.text:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+    finally:
+        TelegramSender.drop_instance()
+
+    assert bot.sent == []
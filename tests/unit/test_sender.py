@@ -0,0 +1,107 @@
+import random
+import re
+import time
+
+import pytest
+
+from src.tg.sender import paragraphs_to_messages, pretty_send, utf16_len
+
+TOKENS = ["word", "слово", "😀", "\n", " ", "<b>", "</b>", '<a href="x">', "&amp;"]
+
+
+def _random_paragraph(rnd: random.Random) -> str:
+    return "".join(rnd.choice(TOKENS) for _ in range(rnd.randint(0, 60)))
+
+
+def _non_space(texts) -> str:
+    return "".join("".join(text.split()) for text in texts)
+
+
+def _strip_tags(texts):
+    return [re.sub(r"<[^<>]*>", "", text) for text in texts]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_paragraphs_to_messages_properties(seed):
+    rnd = random.Random(seed)
+    char_limit = rnd.randint(20, 100)
+    paragraphs = [_random_paragraph(rnd) for _ in range(rnd.randint(0, 30))]
+
+    messages = paragraphs_to_messages(paragraphs, char_limit=char_limit)
+
+    # nothing is lost or reordered, except for whitespace at split points
+    # and tags reopened after them
+    assert _non_space(_strip_tags(messages)) == _non_space(_strip_tags(paragraphs))
+    for message in messages:
+        assert 0 < utf16_len(message) <= char_limit
+        # no tag or entity is cut
+        stripped = re.sub(r"<[^<>]*>|&\w+;", "", message)
+        assert "<" not in stripped and ">" not in stripped and "&" not in stripped
+
+
+def _random_html(rnd: random.Random, depth: int = 0) -> str:
+    parts = []
+    for _ in range(rnd.randint(1, 8)):
+        if depth < 3 and rnd.random() < 0.3:
+            tag = rnd.choice(["b", "i", "code"])
+            parts.append(f"<{tag}>{_random_html(rnd, depth + 1)}</{tag}>")
+        else:
+            parts.append(rnd.choice(["word", "слово", "😀", "\n", " ", "&amp;"]))
+    return "".join(parts)
+
+
+def _is_balanced(message: str) -> bool:
+    open_tags = []
+    for is_closing, name in re.findall(r"<(/?)(\w+)[^<>]*>", message):
+        if not is_closing:
+            open_tags.append(name)
+        elif not open_tags or open_tags.pop() != name:
+            return False
+    return not open_tags
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_paragraphs_to_messages_balance_tags(seed):
+    rnd = random.Random(seed)
+    char_limit = rnd.randint(60, 120)
+    paragraphs = [_random_html(rnd) * rnd.randint(1, 5) for _ in range(10)]
+
+    messages = paragraphs_to_messages(paragraphs, char_limit=char_limit)
+
+    assert _non_space(_strip_tags(messages)) == _non_space(_strip_tags(paragraphs))
+    for message in messages:
+        assert utf16_len(message) <= char_limit
+        assert _is_balanced(message)
+
+
+def test_paragraphs_packed():
+    messages = paragraphs_to_messages(["a" * 5, "b" * 3, "c" * 12, "d"], char_limit=10)
+    assert messages == ["aaaaa\n\nbbb", "cccccccccc", "cc\n\nd"]
+
+
+def test_message_length_in_utf16():
+    # emoji take two UTF-16 code units each
+    assert paragraphs_to_messages(["😀" * 6], char_limit=4) == ["😀😀", "😀😀", "😀😀"]
+
+
+def test_huge_report_packed_fast():
+    report = "\n".join(f"line {i} <b>bold</b> 😀" for i in range(200000))
+    start = time.monotonic()
+    messages = paragraphs_to_messages([report] + report.split("\n"))
+    # quadratic splitting took minutes here
+    assert time.monotonic() - start < 5
+    assert _non_space(messages) == _non_space([report] * 2)
+
+
+def test_pretty_send_streams_generator():
+    sent = []
+
+    def paragraphs():
+        yield "a" * 3000
+        yield "b" * 3000
+        # first message is sent before the rest is generated
+        assert sent == ["a" * 3000]
+        yield "c"
+
+    pretty_send(paragraphs(), sent.append)
+    assert sent == ["a" * 3000, "b" * 3000 + "\n\nc"]
@@ -0,0 +1,48 @@
+import logging
+
+from freezegun import freeze_time
+
+from src.utils.sentry_limiter import SentryLimiter
+
+
+def _make_record(lineno: int, msg: str = "msg") -> logging.LogRecord:
+    return logging.LogRecord("name", logging.ERROR, "module.py", lineno, msg, (), None)
+
+
+def test_same_fingerprint_captured_once_per_window():
+    limiter = SentryLimiter(events_per_minute=100, dedup_window_minutes=10)
+    fingerprint = limiter.get_fingerprint(_make_record(1))
+    other_fingerprint = limiter.get_fingerprint(_make_record(2))
+    assert fingerprint != other_fingerprint
+
+    with freeze_time("2020-05-01 12:00:00") as frozen_time:
+        assert limiter.should_capture(fingerprint) == (True, 0)
+        assert limiter.should_capture(fingerprint) == (False, 0)
+        assert limiter.should_capture(fingerprint) == (False, 0)
+        assert limiter.should_capture(other_fingerprint) == (True, 0)
+        frozen_time.tick(601)
+        # suppressed records are reported with the next capture
+        assert limiter.should_capture(fingerprint) == (True, 2)
+
+
+def test_events_rate_limited():
+    limiter = SentryLimiter(events_per_minute=3, dedup_window_minutes=10)
+    with freeze_time("2020-05-01 12:00:00") as frozen_time:
+        captured = [limiter.should_capture(str(i))[0] for i in range(5)]
+        assert captured == [True, True, True, False, False]
+        frozen_time.tick(20)
+        assert limiter.should_capture("5")[0]
+
+
+def test_fingerprint_message_template():
+    limiter = SentryLimiter()
+    # same call failing in different jobs
+    assert limiter.get_fingerprint(
+        _make_record(1, "Could not run job HRStatusJob")
+    ) != limiter.get_fingerprint(_make_record(1, "Could not run job DBSyncJob"))
+    # ids and urls don't matter
+    assert limiter.get_fingerprint(
+        _make_record(1, "Could not get card 5f3a1b https://trello.com/c/5f3a1b")
+    ) == limiter.get_fingerprint(
+        _make_record(1, "Could not get card 60b2c4 https://trello.com/c/60b2c4")
+    )
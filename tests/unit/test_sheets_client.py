@@ -1,8 +1,16 @@
 import os
+from types import SimpleNamespace
 
 import pytest
 from conftest import SHEETS_TEST_DIR
 from utils.json_loader import JsonLoader
+from utils.sheets_benchmark import NEW_POSTS, SheetsBenchmark
+
+from src.jobs.hr_acquisition_job import HRAcquisitionJob
+from src.sheets.batch_reader import BatchSheetsReader
+from src.sheets.sheet_cache import SheetCache
+from src.sheets.sheets_client import GoogleSheetsClient
+from src.sheets.utils import normalize_trello_url
 
 json_loader = JsonLoader(os.path.join(SHEETS_TEST_DIR, "expected"))
 
@@ -32,3 +40,302 @@ def test_fetch_rubrics(mock_sheets_client):
 @pytest.mark.skip(reason="TODO")
 def test_fill_posts_registry(mock_sheets_client):
     mock_sheets_client.update_posts_registry([])
+
+
+def test_trello_url_index():
+    table = [
+        SimpleNamespace(values=["Post", "https://trello.com/c/AbCd1234/12-post", 1]),
+        SimpleNamespace(values=["Other", None, "see trello.com/c/XyZ98765"]),
+    ]
+    index = GoogleSheetsClient._make_trello_url_index(table)
+
+    assert index == {"AbCd1234", "XyZ98765"}
+    assert normalize_trello_url("https://trello.com/c/AbCd1234/13-renamed") in index
+    assert normalize_trello_url("https://trello.com/c/Other000/1-post") not in index
+
+
+def test_sheet_cache_revisions():
+    cache = SheetCache()
+    fetched = []
+
+    def fetch():
+        fetched.append(1)
+        return len(fetched)
+
+    assert cache.get_or_fetch("key", "tab", "rev1", fetch) == 1
+    assert cache.get_or_fetch("key", "tab", "rev1", fetch) == 1
+    assert cache.get_or_fetch("key", "other tab", "rev1", fetch) == 2
+    assert cache.get_or_fetch("key", "tab", "rev2", fetch) == 3
+    # unknown revision is never served from cache
+    assert cache.get_or_fetch("key", "tab", None, fetch) == 4
+    assert cache.get_or_fetch("key", "tab", "rev2", fetch) == 5
+    cache.invalidate("key")
+    assert cache.get_or_fetch("key", "tab", "rev2", fetch) == 6
+
+
+class FakeRequest:
+    def __init__(self, response):
+        self.response = response
+
+    def execute(self, http=None):
+        return self.response
+
+
+class FakeSheetService:
+    def __init__(self, tabs):
+        # (spreadsheet id, tab title) -> rows, first tab of a spreadsheet has id 0
+        self.tabs = tabs
+        self.requests = []
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def get(self, spreadsheetId, fields):
+        self.requests.append(("get", spreadsheetId))
+        tabs = [
+            (title, rows)
+            for (key, title), rows in self.tabs.items()
+            if key == spreadsheetId
+        ]
+        return FakeRequest(
+            {
+                "sheets": [
+                    {
+                        "properties": {
+                            "sheetId": i,
+                            "title": title,
+                            "gridProperties": {
+                                "rowCount": len(rows) + 10,
+                                "columnCount": max(map(len, rows)),
+                            },
+                        }
+                    }
+                    for i, (title, rows) in enumerate(tabs)
+                ]
+            }
+        )
+
+    def batchGet(self, spreadsheetId, ranges, **kwargs):
+        self.requests.append(("batchGet", spreadsheetId))
+        return FakeRequest(
+            {"valueRanges": [self._get_range(spreadsheetId, a1) for a1 in ranges]}
+        )
+
+    def _get_range(self, spreadsheet_id, a1):
+        title, _, cells = a1.partition("!")
+        rows = self.tabs[(spreadsheet_id, title.strip("'"))]
+        if cells == "1:1":
+            return {"values": rows[:1]}
+        if cells[1:2].isdigit():
+            # rows range like A5:C20
+            first_row = int(cells.split(":")[0][1:])
+            return {"values": rows[first_row - 1:]}
+        if cells:
+            column = ord(cells[0]) - ord("A")
+            # empty cells are omitted by the API
+            values = [
+                [row[column]] if row[column:] and row[column] != "" else []
+                for row in rows
+            ]
+            while values and not values[-1]:
+                values.pop()
+            return {"values": values}
+        return {"values": rows}
+
+
+def test_batch_reader():
+    service = FakeSheetService(
+        {
+            ("a", "Main"): [["Name", "Status"], ["Ann", "active"], [], ["Bob"]],
+            ("a", "Team"): [["Id"], [1]],
+            ("b", "Strings"): [["Id", "Message"]],
+        }
+    )
+    reader = BatchSheetsReader(service)
+    tables = reader.read_many([("a", "Team"), ("b", None), ("a", None)])
+
+    assert sorted(service.requests) == [
+        ("batchGet", "a"),
+        ("batchGet", "b"),
+        ("get", "a"),
+        ("get", "b"),
+    ]
+    main = tables[("a", None)]
+    assert [item.get_field_value("Status") for item in main] == ["active", "", ""]
+    assert main[2].values == ["Bob", ""]
+    assert tables[("a", "Team")][0].get_field_value("Id") == 1
+    assert len(tables[("b", None)]) == 0
+    with pytest.raises(ValueError):
+        main[0].get_field_value("Missing")
+
+
+def test_batch_reader_skips_failed_spreadsheets():
+    service = FakeSheetService({("a", "Main"): [["Name"]]})
+    tables = BatchSheetsReader(service).read_many([("a", "Main"), ("b", "Other")])
+    assert list(tables) == [("a", "Main")]
+
+
+def test_batch_reader_projection():
+    service = FakeSheetService(
+        {
+            ("a", "Posts"): [
+                ["Name", "Date", "Trello", "Views"],
+                ["First", 44000, "t1", 10],
+                ["Second", 44001, "", 20],
+                ["", 44002],
+            ],
+        }
+    )
+    table = BatchSheetsReader(service).read(
+        "a", ["Posts"], columns={"Posts": ["Trello", "Name", "Unknown"]}
+    )["Posts"]
+
+    # one request for headers, one for the columns
+    assert service.requests == [("batchGet", "a"), ("batchGet", "a")]
+    assert table.header == ["Name", "Trello"]
+    assert [item.values for item in table] == [["First", "t1"], ["Second", ""]]
+    with pytest.raises(ValueError):
+        table[0].get_field_value("Date")
+    assert BatchSheetsReader._column_letter(0) == "A"
+    assert BatchSheetsReader._column_letter(27) == "AB"
+
+
+def _update_cells(row, column, value):
+    return {
+        "updateCells": {
+            "range": {
+                "sheetId": 0,
+                "startRowIndex": row,
+                "endRowIndex": row + 1,
+                "startColumnIndex": column,
+                "endColumnIndex": column + 1,
+            },
+            "fields": "userEnteredValue",
+            "rows": [{"values": [{"userEnteredValue": {"stringValue": value}}]}],
+        }
+    }
+
+
+class FakeBatchUpdateService:
+    def __init__(self):
+        self.bodies = []
+
+    def spreadsheets(self):
+        return self
+
+    def batchUpdate(self, spreadsheetId, body):
+        self.bodies.append((spreadsheetId, body))
+        return FakeRequest({})
+
+
+def _make_table(spreadsheet_id, batches):
+    full_range = SimpleNamespace(
+        sheet=SimpleNamespace(spreadsheet=SimpleNamespace(id=spreadsheet_id)),
+    )
+    return SimpleNamespace(full_range=full_range, batches=batches)
+
+
+def test_commit_tables(monkeypatch):
+    monkeypatch.setattr(GoogleSheetsClient, "_update_from_config", lambda self: None)
+    GoogleSheetsClient.drop_instance()
+    client = GoogleSheetsClient({})
+    GoogleSheetsClient.drop_instance()
+    service = FakeBatchUpdateService()
+    client.client = SimpleNamespace(sheet_service=service)
+
+    raw = _make_table(
+        "hr",
+        [
+            _update_cells(1, 5, "draft"),
+            _update_cells(2, 5, "ok"),
+            _update_cells(1, 5, "ok"),
+        ],
+    )
+    processed = _make_table("hr", [_update_cells(10, 0, "new")])
+    other = _make_table("other", [])
+    client.commit_tables(raw, processed, other)
+
+    # one request for the spreadsheet, nothing for unchanged tables
+    assert service.bodies == [
+        (
+            "hr",
+            {
+                "requests": [
+                    _update_cells(2, 5, "ok"),
+                    _update_cells(1, 5, "ok"),
+                    _update_cells(10, 0, "new"),
+                ]
+            },
+        )
+    ]
+    assert raw.batches == processed.batches == []
+
+
+def test_read_rows_and_write_back():
+    service = FakeSheetService(
+        {("hr", "Answers"): [["Name", "Status"], ["Ann", "ok"], ["Bob"], ["Eve", ""]]}
+    )
+    rows = BatchSheetsReader(service).read_rows("hr", "Answers", first_row=3)
+
+    assert [item.values for item in rows] == [["Bob", ""], ["Eve", ""]]
+    assert rows.last_row == 4
+    rows[1].set_field_value("Status", "new")
+    assert rows.changes == {(4, 1): "new"}
+    assert rows.batches[0]["updateCells"]["range"] == {
+        "sheetId": 0,
+        "startRowIndex": 3,
+        "endRowIndex": 4,
+        "startColumnIndex": 1,
+        "endColumnIndex": 2,
+    }
+
+    empty = BatchSheetsReader(service).read_rows("hr", "Answers", first_row=5)
+    assert len(empty) == 0 and empty.last_row == 4
+    assert empty.header == ["Name", "Status"]
+
+
+def test_benchmark_new_answers():
+    requests = []
+    for rows in (20, 200):
+        with SheetsBenchmark(rows) as benchmark:
+            results = {result.name: result for result in benchmark.run()}
+            hr_tabs = benchmark.emulator.spreadsheets["hr"]
+            statuses = [row[7] for row in hr_tabs["Ответы на форму"][1:]]
+            assert all(statuses)
+            # old answers and accepted new ones are in the processed tab
+            assert len(hr_tabs["Анкеты"]) == 1 + statuses.count("Обработано")
+            # cards not yet in the registry are added by FillPostsListJob
+            registry = benchmark.emulator.spreadsheets["post_registry"]["Реестр"]
+            assert len(registry) == 1 + rows + NEW_POSTS
+        requests.append(results["HRAcquisitionJob, new answers"].requests)
+        assert results["HRStatusJob, unchanged sheet"].requests == 1
+    # reading new answers doesn't depend on the number of old ones
+    assert requests[0] == requests[1]
+
+
+@pytest.mark.parametrize("deleted_rows, new_answers", [(0, 1), (1, 1), (2, 1), (2, 3)])
+def test_hr_acquisition_after_rows_changed(deleted_rows, new_answers):
+    with SheetsBenchmark(20) as benchmark:
+        emulator = benchmark.emulator
+        raw_tab = emulator.spreadsheets["hr"]["Ответы на форму"]
+
+        def send(message):
+            pass
+
+        HRAcquisitionJob._execute(benchmark.app_context, send)
+        benchmark.append_hr_answers(range(20, 21))
+        HRAcquisitionJob._execute(benchmark.app_context, send)
+        assert all(row[7] for row in raw_tab[1:])
+
+        # processed answers deleted by hand, then new ones come
+        emulator.delete_rows("hr", "Ответы на форму", 5, deleted_rows)
+        benchmark.append_hr_answers(range(30, 30 + new_answers))
+        HRAcquisitionJob._execute(benchmark.app_context, send)
+
+        assert all(row[7] for row in raw_tab[1:])
+        processed_names = {row[1] for row in emulator.spreadsheets["hr"]["Анкеты"]}
+        for row in raw_tab[-new_answers:]:
+            assert (row[1] in processed_names) == (row[7] == "Обработано")
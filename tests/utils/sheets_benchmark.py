@@ -0,0 +1,548 @@
+"""
+Runs sheet-heavy jobs against SheetsEmulator with generated spreadsheets,
+reporting wall time and number of API requests of each step.
+
+Usage, from the repo root:
+    python -m tests.utils.sheets_benchmark --rows 1000 5000 --latency-ms 100
+"""
+
+import argparse
+import logging
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Any, Callable, List
+
+from src.consts import VK_POST_LINK, TrelloCardColor, TrelloListAlias
+from src.db.db_client import DBClient
+from src.db.db_objects import Author
+from src.jobs.db_sync_job import DBSyncJob
+from src.jobs.fill_posts_list_job import FillPostsListJob
+from src.jobs.hr_acquisition_job import HRAcquisitionJob
+from src.jobs.hr_status_job import HRStatusJob
+from src.jobs.vk_analytics_report_job import VkAnalyticsReportJob
+from src.roles.role_manager import RoleManager
+from src.sheets.sheets_client import GoogleSheetsClient
+from src.sheets.sheets_objects import HRPersonProcessed, HRPersonRaw, RegistryPost
+from src.strings import StringsDBClient
+from src.trello.trello_objects import (
+    CardCustomFields,
+    TrelloCard,
+    TrelloCardLabel,
+    TrelloList,
+)
+from src.vk.vk_objects import VkGroup, VkGroupStats, VkPost, VkPostStats
+
+from .sheets_emulator import SheetsEmulator
+
+SHEETS_CONFIG = {
+    "api_key_path": "",
+    "authors_sheet_key": "authors",
+    "curators_sheet_key": "curators",
+    "hr_sheet_key": "hr",
+    "hr_pt_sheet_key": "hr_pt",
+    "post_registry_sheet_key": "post_registry",
+    "rubrics_registry_sheet_key": "rubrics",
+    "strings_sheet_key": "strings",
+}
+DB_URI = "sqlite:///:memory:"
+# form questions not used by the bot, they make the form tab wide as in real life
+EXTRA_FORM_COLUMNS = 15
+NEW_ANSWERS = 10
+NEW_POSTS = 10
+# 01.05.2021 in Excel serial date format
+FIRST_ANSWER_DATE = 44317
+NUM_CURATORS = 10
+VK_GROUP = {"id": 1, "name": "Sysblok", "screen_name": "sysblok", "members_count": 1}
+TEAM_TAB = "Команда (с заморозкой)"
+
+TEAM_COLUMNS = [
+    "sheets__team__id",
+    "sheets__team__name",
+    "sheets__team__status",
+    "sheets__team__curator",
+    "sheets__team__manager",
+    "sheets__team__telegram",
+    "sheets__team__trello",
+]
+CURATOR_COLUMNS = [
+    "sheets__name",
+    "sheets__telegram",
+    "sheets__team",
+    "sheets__role",
+    "sheets__rubric",
+    "sheets__rubric_trello_name",
+]
+RUBRIC_COLUMNS = ["sheets__rubric_name", "sheets__vk_tag", "sheets__tg_tag"]
+
+VK_LINK_COLUMN = "Ссылка (ВК)"
+STRINGS = {
+    "sheets__hr__raw__status_rejection": "Отказ",
+    "sheets__hr__raw__status_double": "Дубль",
+    "sheets__hr__raw__status_processed": "Обработано",
+    "sheets__hr__processed__status__new_form": "Новая анкета",
+    "sheets__hr__processed__status__trial": "Испытательный срок",
+    "sheets__hr__processed__source__form": "Форма",
+    "sheets__post_registry__column_name": RegistryPost.key_title_map["name"],
+    "sheets__post_registry__column_trello": RegistryPost.key_title_map["trello"],
+    "sheets__post_registry__column_vk_link": VK_LINK_COLUMN,
+    "sheets__team__status__newbie": "Новичок",
+    "sheets__team__status__active": "Активный",
+    "sheets__team__status__frozen": "Заморожен",
+    "sheets__team__manager__redactor": "Редактор",
+    "sheets__team__manager__illustrator": "Иллюстратор",
+    "sheets__team__manager__editor": "Выпускающий редактор",
+    "sheets__team__manager__director": "Директор",
+    "sheets__team__manager__swe": "Разработчик",
+}
+# messages are not checked, they only have to exist
+MESSAGE_IDS = [
+    "hr_acquisition_job__hello",
+    "hr_acquisition_job__name",
+    "hr_acquisition_job__interests",
+    "hr_acquisition_job__about",
+    "hr_acquisition_job__other_contacts",
+    "hr_acquisition_job__person",
+    "hr_status_job__header",
+    "hr_status_job__new_members_title",
+    "hr_status_job__new_member",
+    "hr_status_job__trial_members_title",
+    "hr_status_job__trial_member",
+    "hr_status_job__other_contacts",
+    "hr_status_job__footer",
+    "common_trello_label__main_post",
+    "common_trello_label__archive",
+    "fill_posts_list_job__progress_registry",
+    "fill_posts_list_job__success",
+    "fill_posts_list_job__unchanged",
+    "vk_analytics_report_job__text_with_top",
+]
+
+BenchmarkResult = namedtuple("BenchmarkResult", ["name", "rows", "seconds", "requests"])
+
+
+class SheetsBenchmark:
+    """
+    Sets up emulated spreadsheets of the given size, in-memory DBs
+    filled from them as on bot start, and fresh client singletons,
+    restoring the previous ones on exit.
+    """
+
+    def __init__(self, rows: int, latency_sec: float = 0):
+        self.rows = rows
+        self.emulator = SheetsEmulator(latency_sec)
+        self._saved_instances = {}
+
+    def __enter__(self) -> "SheetsBenchmark":
+        for cls in (GoogleSheetsClient, DBClient, StringsDBClient, RoleManager):
+            self._saved_instances[cls] = cls._instance
+            cls.drop_instance()
+        self.emulator.add_spreadsheet("strings", {"Strings": self._make_strings()})
+        self.emulator.add_spreadsheet(
+            "hr",
+            {
+                "Анкеты": self._make_hr_processed(),
+                "Ответы на форму": self._make_hr_raw(range(self.rows), processed=True),
+                TEAM_TAB: self._make_team(),
+            },
+        )
+        self.emulator.add_spreadsheet(
+            "post_registry", {"Реестр": self._make_post_registry()}
+        )
+        self.emulator.add_spreadsheet(
+            "authors", {"Кураторы и контакты": self._make_authors()}
+        )
+        self.emulator.add_spreadsheet(
+            "curators",
+            {
+                "Кураторы": self._make_tab(
+                    CURATOR_COLUMNS,
+                    [
+                        [f"Куратор {i}", f"@curator{i}", "Авторы", f"Роль {i}", "", ""]
+                        for i in range(NUM_CURATORS)
+                    ],
+                )
+            },
+        )
+        self.emulator.add_spreadsheet(
+            "rubrics",
+            {
+                "Рубрики": self._make_tab(
+                    RUBRIC_COLUMNS,
+                    [
+                        [f"Рубрика {i}", f"#rubric{i}", f"#rubric{i}"]
+                        for i in range(NUM_CURATORS)
+                    ],
+                )
+            },
+        )
+        with self.emulator.patch_sheets_client():
+            self.sheets_client = GoogleSheetsClient(SHEETS_CONFIG)
+        self.db_client = DBClient({"uri": DB_URI})
+        self.strings_db_client = StringsDBClient({"uri": DB_URI})
+        self.role_manager = RoleManager(self.db_client)
+        self.strings_db_client.fetch_strings_sheet(self.sheets_client)
+        self.db_client.fetch_all(self.sheets_client)
+        self.role_manager.calculate_db_roles()
+        self.app_context = SimpleNamespace(
+            sheets_client=self.sheets_client,
+            db_client=self.db_client,
+            strings_db_client=self.strings_db_client,
+            role_manager=self.role_manager,
+            # half of the cards and posts are already in the registry
+            trello_client=_TrelloStub(
+                range(self.rows - NEW_POSTS, self.rows + NEW_POSTS)
+            ),
+            vk_client=_VkStub(range(self.rows - NEW_POSTS, self.rows + NEW_POSTS)),
+        )
+        return self
+
+    def __exit__(self, *exc_info):
+        for cls, instance in self._saved_instances.items():
+            cls._instance = instance
+
+    def run(self) -> List[BenchmarkResult]:
+        def send(message):
+            pass
+
+        results = [
+            self.measure(
+                "HRAcquisitionJob, first run",
+                lambda: HRAcquisitionJob._execute(self.app_context, send),
+            )
+        ]
+        self.append_hr_answers(range(self.rows, self.rows + NEW_ANSWERS))
+        results += [
+            self.measure(
+                "HRAcquisitionJob, new answers",
+                lambda: HRAcquisitionJob._execute(self.app_context, send),
+            ),
+            self.measure(
+                "HRStatusJob", lambda: HRStatusJob._execute(self.app_context, send)
+            ),
+            self.measure(
+                "HRStatusJob, unchanged sheet",
+                lambda: HRStatusJob._execute(self.app_context, send),
+            ),
+            self.measure(
+                "FillPostsListJob",
+                lambda: FillPostsListJob._execute(self.app_context, send),
+            ),
+            self.measure(
+                "VkAnalyticsReportJob",
+                lambda: VkAnalyticsReportJob._execute(self.app_context, send),
+            ),
+            # HR jobs have changed the spreadsheet with the team tab
+            self.measure(
+                "DBSyncJob, HR sheet changed",
+                lambda: DBSyncJob._execute(self.app_context, send),
+            ),
+            self.measure(
+                "DBSyncJob, unchanged sheets",
+                lambda: DBSyncJob._execute(self.app_context, send),
+            ),
+        ]
+        self.emulator.set_cell(
+            "hr", TEAM_TAB, 1, 2, STRINGS["sheets__team__status__frozen"]
+        )
+        results.append(
+            self.measure(
+                "DBSyncJob, team member changed",
+                lambda: DBSyncJob._execute(self.app_context, send),
+            )
+        )
+        return results
+
+    def append_hr_answers(self, numbers: range):
+        """
+        New form answers, as the form appends them.
+        """
+        self.emulator.append_rows("hr", "Ответы на форму", self._make_hr_raw(numbers))
+
+    def measure(self, name: str, step: Callable[[], Any]) -> BenchmarkResult:
+        requests_before = self.emulator.get_total_requests()
+        start = time.perf_counter()
+        step()
+        return BenchmarkResult(
+            name,
+            self.rows,
+            time.perf_counter() - start,
+            self.emulator.get_total_requests() - requests_before,
+        )
+
+    @staticmethod
+    def _make_strings() -> List[List[str]]:
+        strings = dict(STRINGS)
+        for item_class in (HRPersonRaw, HRPersonProcessed):
+            for string_id in item_class.field_alias.values():
+                strings.setdefault(string_id, string_id)
+        for string_id in (
+            list(Author.sheet_field_alias.values())
+            + TEAM_COLUMNS
+            + CURATOR_COLUMNS
+            + RUBRIC_COLUMNS
+        ):
+            strings.setdefault(string_id, string_id)
+        for string_id in MESSAGE_IDS:
+            strings[string_id] = string_id
+        return [["Id", "Message"]] + [list(item) for item in strings.items()]
+
+    def _make_hr_raw(self, numbers: range, processed=False) -> List[List[Any]]:
+        header = [
+            STRINGS.get(alias, alias) for alias in HRPersonRaw.field_alias.values()
+        ]
+        extra_header = [f"Вопрос {i + 1}" for i in range(EXTRA_FORM_COLUMNS)]
+        rows = [] if numbers.start else [header + extra_header]
+        for i in numbers:
+            person = {
+                "ts": FIRST_ANSWER_DATE + i / 24,
+                "name": f"Участник {i}",
+                "interests": "Лингвистика, история",
+                "other_contacts": f"person{i}@example.com" if i % 5 == 0 else "",
+                "about": "Немного о себе. " * 20,
+                "email": f"person{i}@example.com",
+                # some people fill the form twice
+                "telegram": f"@person{i // 2 if i % 10 == 1 else i}" if i % 7 else "",
+                "status": STRINGS["sheets__hr__raw__status_processed"]
+                if processed
+                else "",
+            }
+            rows.append(
+                [person[name] for name in HRPersonRaw.field_alias]
+                + ["Ответ на вопрос"] * EXTRA_FORM_COLUMNS
+            )
+        return rows
+
+    def _make_hr_processed(self) -> List[List[Any]]:
+        statuses = [
+            STRINGS["sheets__hr__processed__status__new_form"],
+            STRINGS["sheets__hr__processed__status__trial"],
+            "В команде",
+            "Отказ",
+        ]
+        rows = [
+            [
+                STRINGS.get(alias, alias)
+                for alias in HRPersonProcessed.field_alias.values()
+            ]
+        ]
+        for i in range(self.rows):
+            person = {
+                "id": i + 2,
+                "name": f"Участник {i}",
+                "interests": "Лингвистика, история",
+                "other_contacts": "",
+                "about": "Немного о себе. " * 20,
+                "hr_name": "Эйчар",
+                "date_submitted": "01.05.2021 12:00:00",
+                "telegram": f"@person{i}",
+                "status": statuses[i % len(statuses)],
+                "status_novice": "",
+                "source": STRINGS["sheets__hr__processed__source__form"],
+                "curator": "Куратор",
+            }
+            rows.append([person[name] for name in HRPersonProcessed.field_alias])
+        return rows
+
+    def _make_team(self) -> List[List[Any]]:
+        statuses = [
+            STRINGS["sheets__team__status__active"],
+            STRINGS["sheets__team__status__active"],
+            STRINGS["sheets__team__status__newbie"],
+            STRINGS["sheets__team__status__frozen"],
+        ]
+        managers = [
+            "",
+            STRINGS["sheets__team__manager__redactor"],
+            STRINGS["sheets__team__manager__illustrator"],
+        ]
+        return self._make_tab(
+            TEAM_COLUMNS,
+            [
+                [
+                    # ids are numbers in the sheet
+                    i + 1,
+                    f"Участник {i}",
+                    statuses[i % len(statuses)],
+                    f"Куратор {i % NUM_CURATORS}" if i % 2 else "",
+                    managers[i % len(managers)],
+                    f"@person{i}",
+                    f"@person{i}",
+                ]
+                for i in range(self.rows)
+            ],
+        )
+
+    def _make_authors(self) -> List[List[Any]]:
+        return self._make_tab(
+            list(Author.sheet_field_alias.values()),
+            [
+                [
+                    f"Автор {i}",
+                    f"Роль {i % NUM_CURATORS}",
+                    STRINGS["sheets__team__status__active"],
+                    f"@author{i}",
+                    f"@author{i}",
+                ]
+                for i in range(self.rows)
+            ],
+        )
+
+    @staticmethod
+    def _make_tab(string_ids: List[str], rows: List[List[Any]]) -> List[List[Any]]:
+        return [[STRINGS.get(string_id, string_id) for string_id in string_ids]] + rows
+
+    def _make_post_registry(self) -> List[List[Any]]:
+        header = list(RegistryPost.key_title_map.values()) + [VK_LINK_COLUMN]
+        rows = [header]
+        for i in range(self.rows):
+            post = {
+                RegistryPost.key_title_map["name"]: f"Пост {i}",
+                RegistryPost.key_title_map["author"]: "Автор",
+                RegistryPost.key_title_map["trello"]: _make_trello_url(i),
+                VK_LINK_COLUMN: _make_vk_url(i),
+            }
+            rows.append([post.get(column, "") for column in header])
+        return rows
+
+
+class _TrelloStub:
+    """
+    Serves the given posts as cards ready for the post registry.
+    """
+
+    def __init__(self, numbers: range):
+        self.lists_config = {TrelloListAlias.EDITED_NEXT_WEEK: "edited_next_week"}
+        lst = TrelloList()
+        lst.id = "done"
+        lst.name = "Готово"
+        self._cards = []
+        self._custom_fields = {}
+        for number in numbers:
+            label = TrelloCardLabel()
+            label.name = f"Рубрика {number % NUM_CURATORS}"
+            label.color = TrelloCardColor.GREEN
+            card = TrelloCard()
+            card.id = f"card{number}"
+            card.name = f"Пост {number}"
+            card.url = _make_trello_url(number)
+            card.due = datetime(2021, 5, 1) + timedelta(days=number)
+            card.labels = [label]
+            card.lst = lst
+            fields = CardCustomFields(card.id)
+            fields.title = card.name
+            fields.google_doc = f"https://docs.google.com/document/d/doc{number}"
+            fields.authors = ["Автор"]
+            fields.editors = ["Редактор"]
+            fields.illustrators = ["Иллюстратор"]
+            fields.cover = f"https://drive.google.com/drive/folders/cover{number}"
+            self._cards.append(card)
+            self._custom_fields[card.id] = fields
+
+    def get_list_id_from_aliases(self, list_aliases):
+        return ["done"]
+
+    def get_cards(self, list_ids=None, board_id=None):
+        return list(self._cards)
+
+    def get_custom_fields(self, card_id: str) -> CardCustomFields:
+        return self._custom_fields[card_id]
+
+
+class _VkStub:
+    """
+    Serves the given posts as posts of the week.
+    """
+
+    def __init__(self, numbers: range):
+        self._posts = [
+            VkPost.from_dict(
+                {
+                    "id": number,
+                    "text": f"Пост {number}",
+                    "date": datetime(2021, 5, 1).timestamp(),
+                    "comments": {"count": number % 3},
+                    "likes": {"count": number % 5},
+                    "reposts": {"count": number % 7},
+                },
+                group_id=VK_GROUP["id"],
+                group_alias=VK_GROUP["screen_name"],
+            )
+            for number in numbers
+        ]
+
+    def get_group_info(self) -> VkGroup:
+        return VkGroup.from_dict(VK_GROUP)
+
+    def get_group_stats(self, group_id, period) -> VkGroupStats:
+        return VkGroupStats.from_dict(
+            {
+                "activity": {
+                    "comments": 1,
+                    "likes": 1,
+                    "subscribed": 1,
+                    "unsubscribed": 1,
+                    "copies": 1,
+                },
+                "reach": {"reach": 1, "reach_subscribers": 1, "mobile_reach": 1},
+                "visitors": {"views": 1, "visitors": 1},
+            }
+        )
+
+    def get_posts(self, group_id, count=100) -> List[VkPost]:
+        return self._posts[-count:]
+
+    def get_posts_per_period(self, posts, since, until) -> List[VkPost]:
+        return posts
+
+    def get_post_stats(self, group_id, posts, period) -> List[VkPostStats]:
+        return [
+            VkPostStats.from_dict(
+                {
+                    "reach_total": post.id,
+                    "reach_subscribers": 1,
+                    "reach_ads": 1,
+                    "reach_viral": 1,
+                    "report": 1,
+                    "hide": 1,
+                    "unsubscribe": 1,
+                    "links": 1,
+                },
+                post,
+            )
+            for post in posts
+        ]
+
+
+def _make_trello_url(number: int) -> str:
+    return f"https://trello.com/c/card{number}/{number}-post"
+
+
+def _make_vk_url(number: int) -> str:
+    return VK_POST_LINK.format(
+        group_id=VK_GROUP["id"], post_id=number, group_alias=VK_GROUP["screen_name"]
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument(
+        "--latency-ms", type=float, default=100, help="latency of every API request"
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    print(f"{'step':40} {'rows':>6} {'seconds':>8} {'requests':>8}")
+    for rows in args.rows:
+        with SheetsBenchmark(rows, args.latency_ms / 1000) as benchmark:
+            for result in benchmark.run():
+                print(
+                    f"{result.name:40} {result.rows:6} "
+                    f"{result.seconds:8.2f} {result.requests:8}"
+                )
+
+
+if __name__ == "__main__":
+    main()
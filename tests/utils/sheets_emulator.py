@@ -0,0 +1,332 @@
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from unittest import mock
+
+from sheetfu import SpreadsheetApp
+
+from src.sheets.batch_reader import BatchSheetsReader
+from src.sheets.sheets_client import GoogleSheetsClient
+
+CELLS_RE = re.compile(r"^([A-Z]*)(\d*)$")
+BASE_MODIFIED_TIME = datetime(2021, 1, 1)
+# real sheets have some empty rows below the data
+EXTRA_GRID_ROWS = 100
+
+
+class EmulatedRequest:
+    def __init__(self, emulator: "SheetsEmulator", name: str, handler):
+        self._emulator = emulator
+        self._name = name
+        self._handler = handler
+
+    def execute(self, http=None):
+        return self._emulator.handle(self._name, self._handler)
+
+
+class SheetsEmulator:
+    """
+    In-process stand-in for Google Sheets v4 and Drive v3 services,
+    serving spreadsheets from memory with a fixed latency per request.
+    Only requests made by sheetfu and src/sheets are supported.
+    """
+
+    def __init__(self, latency_sec: float = 0):
+        self.latency_sec = latency_sec
+        # spreadsheet id -> tab title -> rows
+        self.spreadsheets: Dict[str, Dict[str, List[List[Any]]]] = {}
+        self.revisions = Counter()
+        self.request_counts = Counter()
+        self._lock = threading.Lock()
+
+    def add_spreadsheet(self, spreadsheet_id: str, tabs: Dict[str, List[List[Any]]]):
+        self.spreadsheets[spreadsheet_id] = OrderedDict(
+            (title, [list(row) for row in rows]) for title, rows in tabs.items()
+        )
+
+    def append_rows(self, spreadsheet_id: str, title: str, rows: List[List[Any]]):
+        with self._lock:
+            self.spreadsheets[spreadsheet_id][title] += [list(row) for row in rows]
+            self.revisions[spreadsheet_id] += 1
+
+    def delete_rows(self, spreadsheet_id: str, title: str, row: int, count: int = 1):
+        """
+        Deletes rows as done by hand, row is 0-based.
+        """
+        with self._lock:
+            del self.spreadsheets[spreadsheet_id][title][row:row + count]
+            self.revisions[spreadsheet_id] += 1
+
+    def set_cell(
+        self, spreadsheet_id: str, title: str, row: int, column: int, value: Any
+    ):
+        """
+        Edits a cell, row and column are 0-based.
+        """
+        with self._lock:
+            self.spreadsheets[spreadsheet_id][title][row][column] = value
+            self.revisions[spreadsheet_id] += 1
+
+    def get_total_requests(self) -> int:
+        return sum(self.request_counts.values())
+
+    def handle(self, name: str, handler) -> dict:
+        if self.latency_sec:
+            time.sleep(self.latency_sec)
+        with self._lock:
+            self.request_counts[name] += 1
+            return handler()
+
+    @contextmanager
+    def patch_sheets_client(self):
+        """
+        GoogleSheetsClient created inside talks to the emulator.
+        """
+
+        def _authorize(client: GoogleSheetsClient):
+            app = SpreadsheetApp.__new__(SpreadsheetApp)
+            app.sheet_service = EmulatedSheetsService(self)
+            app.drive_service = EmulatedDriveService(self)
+            app.batches = []
+            client.client = app
+            client._make_http = lambda: None
+            client._batch_reader = BatchSheetsReader(app.sheet_service)
+
+        with mock.patch.object(GoogleSheetsClient, "_authorize", _authorize):
+            yield
+
+    # request handlers, called under the lock
+
+    def _get_metadata(self, spreadsheet_id: str) -> dict:
+        return {
+            "sheets": [
+                {
+                    "properties": {
+                        "sheetId": sheet_id,
+                        "title": title,
+                        "gridProperties": {
+                            "rowCount": len(rows) + EXTRA_GRID_ROWS,
+                            "columnCount": max(map(len, rows), default=1),
+                        },
+                    }
+                }
+                for sheet_id, (title, rows) in enumerate(
+                    self.spreadsheets[spreadsheet_id].items()
+                )
+            ]
+        }
+
+    def _get_grid_data(self, spreadsheet_id: str, a1: str) -> dict:
+        values = self._get_values(spreadsheet_id, a1)
+        return {
+            "sheets": [
+                {
+                    "data": [
+                        {
+                            "rowData": [
+                                {"values": [self._to_cell(value) for value in row]}
+                                for row in values
+                            ]
+                        }
+                    ]
+                }
+            ]
+        }
+
+    def _get_value_range(self, spreadsheet_id: str, a1: str) -> dict:
+        title = self._parse_range(a1)[0]
+        values = self._get_values(spreadsheet_id, a1)
+        value_range = {
+            "range": "'{}'!A1:{}{}".format(
+                title,
+                BatchSheetsReader._column_letter(max(map(len, values), default=1) - 1),
+                max(len(values), 1),
+            )
+        }
+        if values:
+            value_range["values"] = values
+        return value_range
+
+    def _get_values(self, spreadsheet_id: str, a1: str) -> List[List[Any]]:
+        """
+        Cells of the range, trimmed of empty cells on the right
+        and empty rows on the bottom like the API does.
+        """
+        title, first_row, first_column, last_row, last_column = self._parse_range(a1)
+        rows = self._find_tab(spreadsheet_id, title)[first_row:last_row]
+        values = []
+        for row in rows:
+            row = list(row[first_column:last_column])
+            while row and row[-1] in ("", None):
+                row.pop()
+            values.append(row)
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def _batch_update(self, spreadsheet_id: str, requests: List) -> dict:
+        tabs = list(self.spreadsheets[spreadsheet_id].values())
+        for request in self._flatten(requests):
+            update = request["updateCells"]
+            grid_range = update["range"]
+            rows = tabs[grid_range["sheetId"]]
+            for i, row_data in enumerate(update["rows"]):
+                row_index = grid_range["startRowIndex"] + i
+                while len(rows) <= row_index:
+                    rows.append([])
+                for j, cell in enumerate(row_data["values"]):
+                    column_index = grid_range["startColumnIndex"] + j
+                    row = rows[row_index]
+                    row += [""] * (column_index + 1 - len(row))
+                    row[column_index] = self._from_cell(cell)
+        self.revisions[spreadsheet_id] += 1
+        return {"replies": []}
+
+    def _get_modified_time(self, spreadsheet_id: str) -> dict:
+        modified_time = BASE_MODIFIED_TIME + timedelta(
+            seconds=self.revisions[spreadsheet_id]
+        )
+        return {"modifiedTime": modified_time.isoformat() + "Z"}
+
+    def _find_tab(self, spreadsheet_id: str, title: str) -> List[List[Any]]:
+        # sheetfu looks tabs up ignoring case
+        for tab_title, rows in self.spreadsheets[spreadsheet_id].items():
+            if tab_title.lower() == title.lower():
+                return rows
+        raise KeyError(f"No tab {title} in {spreadsheet_id}")
+
+    @staticmethod
+    def _parse_range(
+        a1: str,
+    ) -> Tuple[str, int, int, Optional[int], Optional[int]]:
+        """
+        Returns tab title and 0-based bounds, None for unbounded ones.
+        Supports whole tabs, rows (1:1), columns (C:C) and cell ranges (A2:D10).
+        """
+        if "!" not in a1:
+            return a1.strip("'").replace("''", "'"), 0, 0, None, None
+        title, cells = a1.rsplit("!", 1)
+        title = title[1:-1].replace("''", "'") if title.startswith("'") else title
+        start, _, end = cells.partition(":")
+        end = end or start
+        start_column, start_row = CELLS_RE.match(start).groups()
+        end_column, end_row = CELLS_RE.match(end).groups()
+        return (
+            title,
+            int(start_row) - 1 if start_row else 0,
+            SheetsEmulator._column_index(start_column) if start_column else 0,
+            int(end_row) if end_row else None,
+            SheetsEmulator._column_index(end_column) + 1 if end_column else None,
+        )
+
+    @staticmethod
+    def _column_index(letters: str) -> int:
+        index = 0
+        for letter in letters:
+            index = index * 26 + ord(letter) - ord("A") + 1
+        return index - 1
+
+    @staticmethod
+    def _to_cell(value: Any) -> dict:
+        if value in ("", None):
+            return {}
+        if isinstance(value, bool):
+            return {"effectiveValue": {"boolValue": value}}
+        if isinstance(value, (int, float)):
+            return {"effectiveValue": {"numberValue": value}}
+        return {"effectiveValue": {"stringValue": value}}
+
+    @staticmethod
+    def _from_cell(cell: dict) -> Any:
+        value = cell.get("userEnteredValue", {})
+        for value_type in ("stringValue", "numberValue", "boolValue"):
+            if value_type in value:
+                return value[value_type]
+        return ""
+
+    @staticmethod
+    def _flatten(requests: List) -> List[dict]:
+        # sheetfu Table.commit sends its batches as a nested list
+        flat = []
+        for request in requests:
+            if isinstance(request, list):
+                flat += SheetsEmulator._flatten(request)
+            else:
+                flat.append(request)
+        return flat
+
+
+class EmulatedSheetsService:
+    def __init__(self, emulator: SheetsEmulator):
+        self._emulator = emulator
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return EmulatedValuesResource(self._emulator)
+
+    def get(self, spreadsheetId, includeGridData=False, ranges=None, fields=None):
+        emulator = self._emulator
+        if includeGridData:
+            return EmulatedRequest(
+                emulator,
+                "spreadsheets.get(grid)",
+                lambda: emulator._get_grid_data(spreadsheetId, ranges[0]),
+            )
+        return EmulatedRequest(
+            emulator,
+            "spreadsheets.get",
+            lambda: emulator._get_metadata(spreadsheetId),
+        )
+
+    def batchUpdate(self, spreadsheetId, body):
+        emulator = self._emulator
+        return EmulatedRequest(
+            emulator,
+            "spreadsheets.batchUpdate",
+            lambda: emulator._batch_update(spreadsheetId, body["requests"]),
+        )
+
+
+class EmulatedValuesResource:
+    def __init__(self, emulator: SheetsEmulator):
+        self._emulator = emulator
+
+    def get(self, spreadsheetId, range, **kwargs):
+        emulator = self._emulator
+        return EmulatedRequest(
+            emulator,
+            "values.get",
+            lambda: emulator._get_value_range(spreadsheetId, range),
+        )
+
+    def batchGet(self, spreadsheetId, ranges, **kwargs):
+        emulator = self._emulator
+        return EmulatedRequest(
+            emulator,
+            "values.batchGet",
+            lambda: {
+                "valueRanges": [
+                    emulator._get_value_range(spreadsheetId, a1) for a1 in ranges
+                ]
+            },
+        )
+
+
+class EmulatedDriveService:
+    def __init__(self, emulator: SheetsEmulator):
+        self._emulator = emulator
+
+    def files(self):
+        return self
+
+    def get(self, fileId, fields=None):
+        emulator = self._emulator
+        return EmulatedRequest(
+            emulator, "drive.files.get", lambda: emulator._get_modified_time(fileId)
+        )